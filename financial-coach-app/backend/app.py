@@ -97,7 +97,8 @@ def init_db():
 
 # Initialize the analyzers and controllers (import from app_portfolio)
 try:
-    from app_portfolio import Analyzer, sentiment_analyzer, investment_controller
+    from app_portfolio import (Analyzer, sentiment_analyzer, investment_controller, strategy_scheduler,
+                               start_background_services)
     logger.info("Successfully imported portfolio components")
 except ImportError as e:
     logger.warning(f"Could not import portfolio components: {e}")
@@ -108,6 +109,8 @@ except ImportError as e:
             return {'error': 'Portfolio analyzer not available', 'strategies': [], 'metadata': {'timestamp': '', 'tickers': tickers}}
     
     Analyzer = DummyAnalyzer()
+    start_background_services = None
+    strategy_scheduler = None
     sentiment_analyzer = None
     investment_controller = None
 
@@ -167,7 +170,7 @@ def api_health():
         'status': 'healthy',
         'database': db_status,
         'services': services,
-        'analyzer_running': Analyzer.is_running if hasattr(Analyzer, 'is_running') else False
+        'analyzer_running': strategy_scheduler.active_count() > 0 if strategy_scheduler else False
     })
 
 @app.route('/api/investment/portfolio')
@@ -250,6 +253,10 @@ if __name__ == '__main__':
     # Initialize database
     init_db()
     
+    # Start warming market data before the first request arrives
+    if start_background_services is not None:
+        start_background_services()
+    
     # Configuration based on environment
     ENV = os.getenv('FLASK_ENV', 'development')
     
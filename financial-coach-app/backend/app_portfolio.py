@@ -1,7 +1,7 @@
-from flask import jsonify, Flask, request
+from flask import jsonify, Flask, request, session
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO, emit, join_room, leave_room
 import yfinance as yf
 import threading 
 import time
@@ -13,15 +13,31 @@ import numpy as np
 import pandas as pd
 from services.sentiment import SentimentalAnalysis
 from controllers.investment_controller import InvestmentController
+from services.backtest_service import BacktestService
+from services.analysis_jobs import AnalysisJobManager
+from services.strategy_scheduler import StrategyScheduler
+from services.market_regime_service import MarketRegimeService, MARKET_INDICATORS
+from services.prefetch_service import PrefetchService
+from services.options_service import HEDGE_SYMBOLS
+from services.monte_carlo_service import MonteCarloService
 import os
 from dotenv import load_dotenv
 from contextlib import contextmanager
 import signal
 import sys
 from utils.yfinance_utils import yf_wrapper  # Import our wrapper
-from utils.cache_manager import cached, cache
-from utils.async_handler import run_async, run_cpu_bound, cleanup as async_cleanup
+from utils.cache_manager import cached, cache, LRUCache
+from utils.async_handler import run_async, run_cpu_bound, cpu_executor, get_process_executor, cleanup as async_cleanup
 from utils.rate_limiter import rate_limited, general_api_limiter, yfinance_limiter
+from utils.portfolio_optimizer import (
+    compute_moments, mv_objective, mv_gradient, sharpe_objective, sharpe_gradient,
+    sum_to_one_constraint, efficient_frontier, multi_start_solve,
+    FactorCovariance, projected_gradient_solve, hrp_weights
+)
+from utils.series_encoding import format_analysis_series
+from utils.risk_metrics import risk_report
+from utils.trading_calendar import AdaptiveRefresh
+from utils.data_providers import provider_from_env
 
 # Load environment variables from config directory
 config_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config')
@@ -41,6 +57,9 @@ logging.getLogger('yfinance').setLevel(logging.WARNING)
 app = Flask(__name__)
 
 # Database configuration with connection pooling
+# Signs the session cookie that identifies a caller's live strategies
+app.config['SECRET_KEY'] = os.getenv('SECRET_KEY') or os.urandom(32).hex()
+
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///instance/stocks.db")
 app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
@@ -75,39 +94,42 @@ socketio = SocketIO(app,
                     max_http_buffer_size=1000000,
                     ping_interval=25)
 
-# Thread-safe analyzer instance management
-analyzer_lock = threading.Lock()
-active_threads = []
-
 # Enhanced Portfolio Analyzer with error handling
 class PortfolioAnalyzer:
-    def __init__(self):
-        self.is_running = False
-        self.time_update = 30
-        self._stop_event = threading.Event()
-        
-    def get_current_market_data(self, tickers):
-        """Fetch market data with retry logic"""
+    def __init__(self, market_regime=None):
+        # Live refreshes follow the US/JSE sessions and speed up on volatility spikes
+        self.refresh_policy = AdaptiveRefresh(
+            min_interval=int(os.getenv('STRATEGY_MIN_INTERVAL', '5')),
+            post_close_delay=int(os.getenv('POST_CLOSE_REFRESH_DELAY', '900'))
+        )
+        # 'moments' evaluates objectives on a pre-computed mean/covariance with
+        # analytic gradients; 'returns' uses the legacy full-history criteria
+        self.optimizer_mode = 'moments'
+        # Multi-start mode: run n_starts seeded SLSQP starts on the process pool
+        self.n_starts = int(os.getenv('PORTFOLIO_MULTI_START', '1'))
+        self.multi_start_seed = int(os.getenv('PORTFOLIO_MULTI_START_SEED', '0'))
+        # Baskets wider than this use the factor-model covariance and structured solver
+        self.large_universe_threshold = int(os.getenv('LARGE_UNIVERSE_THRESHOLD', '50'))
+        self.factor_count = int(os.getenv('FACTOR_MODEL_FACTORS', '10'))
+        # Finished analyses keyed by ticker set and the as-of bar of their data
+        self._analysis_cache = LRUCache(max_entries=int(os.getenv('ANALYSIS_CACHE_SIZE', '128')))
+        # Market regime is published by a shared service instead of refetched per request
+        self.market_regime = market_regime or MarketRegimeService()
+        
+    def get_price_panel(self, tickers, start='2012-01-01'):
+        """Fetch daily close prices as a float32 PricePanel with retry logic"""
         max_retries = 3
         retry_delay = 1
         
         for attempt in range(max_retries):
             try:
-                end_date = datetime.now()
-                # Use our cached wrapper
-                database = yf_wrapper.download_data(tickers, start='2012-01-01', end=end_date, 
-                                     interval='1d', progress=False, auto_adjust=True)
+                # Served from the on-disk price store; only missing bars hit the network
+                panel = yf_wrapper.get_price_panel(tickers, start=start)
                 
-                if database.empty:
+                if len(panel) == 0:
                     raise ValueError("No data retrieved from yfinance")
                 
-                database = database['Close']
-                data = database.dropna().pct_change(1).dropna()
-                
-                if data.empty:
-                    raise ValueError("Insufficient data after processing")
-                
-                return data
+                return panel
                 
             except Exception as e:
                 logger.warning(f"Attempt {attempt + 1} failed: {str(e)}")
@@ -117,6 +139,28 @@ class PortfolioAnalyzer:
                 else:
                     raise
     
+    def get_price_history(self, tickers, start='2012-01-01'):
+        """Daily close prices as a frame over the cached panel's memory"""
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        return self.get_price_panel(tickers, start=start).to_frame()
+        
+    def get_current_market_data(self, tickers):
+        """Fetch market data with retry logic"""
+        panel = self.get_price_panel(tickers)
+        
+        # Drop tickers with no data at all so one bad symbol cannot empty a large basket
+        panel, empty_columns = panel.drop_empty()
+        if empty_columns:
+            logger.warning(f"No price data for {empty_columns}, excluding from analysis")
+        
+        data = panel.returns()
+        
+        if data.empty:
+            raise ValueError("Insufficient data after processing")
+        
+        return data
+    
     def Sharpe_Ratio_Criterion(self, weight, data):
         try:
             portfolio_return = np.multiply(data, np.transpose(weight))
@@ -163,16 +207,55 @@ class PortfolioAnalyzer:
             logger.error(f"Error in MV criterion calculation: {str(e)}")
             return 1e6  # Return large positive value to discourage this solution
         
-    def mv_Criterion_weights(self, data):
+    def _criterion_setup(self, criterion, data, moments=None):
+        """Return (objective, args, jacobian) for the configured optimizer mode"""
+        if self.optimizer_mode == 'moments':
+            if moments is None:
+                moments = compute_moments(data)
+            if criterion == 'mv':
+                return mv_objective, moments, mv_gradient
+            return sharpe_objective, moments, sharpe_gradient
+        
+        if criterion == 'mv':
+            return self.mv_Criterion, (data,), None
+        return self.Sharpe_Ratio_Criterion, (data,), None
+        
+    def _initial_guess(self, n, x0=None):
+        """Warm-start weights when provided, otherwise random weights that sum to 1"""
+        if x0 is not None and len(x0) == n and np.all(np.isfinite(x0)):
+            x0 = np.clip(np.asarray(x0, dtype=float), 0.001, 0.999)
+            return x0 / np.sum(x0)
+        
+        x0 = np.random.random(n)
+        return x0 / np.sum(x0)  # Normalize to sum to 1
+        
+    def _multi_start_weights(self, criterion, moments, solver_stats=None):
+        """Best feasible weights over seeded parallel starts, or None if all failed"""
+        mu, cov = moments
+        weights, stats = multi_start_solve(criterion, mu, cov, n_starts=self.n_starts,
+                                           seed=self.multi_start_seed,
+                                           executor=get_process_executor())
+        if solver_stats is not None:
+            solver_stats[criterion] = stats
+        logger.info(f"{criterion.upper()} multi-start: {stats['feasible']}/{stats['starts']} feasible "
+                    f"in {stats['wall_time']:.3f}s")
+        return weights
+        
+    def mv_Criterion_weights(self, data, moments=None, x0=None, solver_stats=None):
         try:
             n = data.shape[1]
+            objective, args, jac = self._criterion_setup('mv', data, moments)
             
-            # Better initial guess - use random weights that sum to 1
-            x0 = np.random.random(n)
-            x0 = x0 / np.sum(x0)  # Normalize to sum to 1
+            if self.n_starts > 1 and self.optimizer_mode == 'moments' and x0 is None:
+                weights = self._multi_start_weights('mv', args, solver_stats)
+                if weights is not None:
+                    return weights
+            
+            # Warm start from previous weights or use random weights that sum to 1
+            x0 = self._initial_guess(n, x0)
             
             # Fixed constraint - weights should sum to 1, not absolute sum
-            cons = ({'type': 'eq', 'fun': lambda x: np.sum(x) - 1})
+            cons = sum_to_one_constraint()
             bounds = [(0.001, 0.999) for i in range(0, n)]  # Avoid exact 0 or 1 for numerical stability
             
             # Try optimization with different methods if first one fails
@@ -180,7 +263,7 @@ class PortfolioAnalyzer:
             
             for method in methods:
                 try:
-                    res = minimize(self.mv_Criterion, x0, args=(data,), method=method,
+                    res = minimize(objective, x0, args=args, jac=jac, method=method,
                                   constraints=cons, bounds=bounds, 
                                   options={'disp': False, 'maxiter': 2000, 'ftol': 1e-9})
                     
@@ -213,17 +296,23 @@ class PortfolioAnalyzer:
             logger.error(f"Error in MV weight optimization: {str(e)}")
             return np.ones(data.shape[1]) / data.shape[1]
     
-    def sr_Criterion_weights(self, data):
+    def sr_Criterion_weights(self, data, moments=None, x0=None, solver_stats=None):
         try:
             n = data.shape[1]
-            x0 = np.random.random(n)
-            x0 = x0 / np.sum(x0)  # Better initial guess
+            objective, args, jac = self._criterion_setup('sr', data, moments)
+            
+            if self.n_starts > 1 and self.optimizer_mode == 'moments' and x0 is None:
+                weights = self._multi_start_weights('sr', args, solver_stats)
+                if weights is not None:
+                    return weights
+            
+            x0 = self._initial_guess(n, x0)  # Warm start or random initial guess
             
             # Fixed constraint - weights should sum to 1
-            cons = ({'type': 'eq', 'fun': lambda x: np.sum(x) - 1})
+            cons = sum_to_one_constraint()
             bounds = [(0.001, 0.999) for i in range(0, n)]  # Avoid exact boundaries
             
-            res = minimize(self.Sharpe_Ratio_Criterion, x0, args=(data,), method="SLSQP",
+            res = minimize(objective, x0, args=args, jac=jac, method="SLSQP",
                           constraints=cons, bounds=bounds, 
                           options={'disp': False, 'maxiter': 2000, 'ftol': 1e-9})
             
@@ -241,15 +330,83 @@ class PortfolioAnalyzer:
             logger.error(f"Error in SR weight optimization: {str(e)}")
             return np.ones(data.shape[1]) / data.shape[1]
         
-    def execute_trade(self, data):
+    def large_universe_weights(self, data, previous_weights=None, factor_model=None, solver_stats=None):
+        """
+        MV and Sharpe weights for wide baskets: a PCA factor covariance keeps
+        memory at O(n*k) and a projected-gradient solver works on that form directly
+        """
+        if factor_model is None:
+            factor_model = FactorCovariance.from_returns(data, n_factors=self.factor_count)
+        mu, factor_cov = factor_model
+        previous_weights = previous_weights or [None, None]
+        
+        weights = []
+        for criterion, x0 in zip(['mv', 'sr'], previous_weights[:2]):
+            result = projected_gradient_solve(criterion, mu, factor_cov, x0=x0)
+            if solver_stats is not None:
+                solver_stats[criterion] = {
+                    'criterion': criterion,
+                    'solver': 'projected_gradient',
+                    'factors': factor_cov.loadings.shape[1],
+                    'iterations': result['nit'],
+                    'function_evaluations': result['nfev'],
+                    'converged': result['success'],
+                    'wall_time': result['elapsed']
+                }
+            if result['feasible']:
+                weights.append(result['weights'])
+            else:
+                logger.warning(f"Large-universe {criterion.upper()} solve failed, using equal weights")
+                weights.append(np.ones(data.shape[1]) / data.shape[1])
+        
+        logger.info(f"Large-universe optimization for {data.shape[1]} tickers complete")
+        return weights
+        
+    def hrp_Criterion_weights(self, data, moments=None, cov=None, solver_stats=None):
+        """Hierarchical risk parity weights: clustering and bisection, no solver"""
+        start_time = time.time()
+        if cov is None:
+            cov = moments[1] if moments is not None else compute_moments(data)[1]
+        weights = hrp_weights(cov)
+        if solver_stats is not None:
+            solver_stats['hrp'] = {
+                'criterion': 'hrp',
+                'solver': 'hierarchical_risk_parity',
+                'converged': True,
+                'wall_time': time.time() - start_time
+            }
+        return weights
+        
+    def execute_trade(self, data, moments=None, previous_weights=None, solver_stats=None):
+        """
+        MV, Sharpe and HRP weights for a return matrix
+
+        Pass a dict as solver_stats to have each strategy's solver statistics
+        written into it; they are per call, never kept on the shared analyzer.
+        """
+        if data.shape[1] > self.large_universe_threshold:
+            factor_model = FactorCovariance.from_returns(data, n_factors=self.factor_count)
+            weight = self.large_universe_weights(data, previous_weights, factor_model=factor_model,
+                                                 solver_stats=solver_stats)
+            # HRP on the same factor model, never the dense n x n covariance
+            weight.append(self.hrp_Criterion_weights(data, cov=factor_model[1], solver_stats=solver_stats))
+            return weight
+        
         weight = []
-        optimum_weights_mv_criterion = self.mv_Criterion_weights(data)
-        optimum_weights_sr_criterion = self.sr_Criterion_weights(data)
+        # Compute the moments once and share them between all three strategies
+        if moments is None and self.optimizer_mode == 'moments':
+            moments = compute_moments(data)
+        previous_weights = previous_weights or [None, None]
+        optimum_weights_mv_criterion = self.mv_Criterion_weights(data, moments=moments, x0=previous_weights[0],
+                                                                 solver_stats=solver_stats)
+        optimum_weights_sr_criterion = self.sr_Criterion_weights(data, moments=moments, x0=previous_weights[1],
+                                                                 solver_stats=solver_stats)
         weight.append(optimum_weights_mv_criterion)
         weight.append(optimum_weights_sr_criterion)
+        weight.append(self.hrp_Criterion_weights(data, moments=moments, solver_stats=solver_stats))
         return weight
     
-    def get_strategy_recommendation(self, strategies):
+    def get_strategy_recommendation(self, strategies, market_conditions=None):
         """Determine which strategy to recommend based on metrics"""
         if not strategies:
             return "No recommendation available"
@@ -258,8 +415,9 @@ class PortfolioAnalyzer:
             # Get the best strategy based on Sharpe ratio
             best_strategy = max(strategies, key=lambda x: x['metrics']['sharpe_ratio'])
             
-            # Get market conditions
-            market_conditions = self.get_market_conditions()
+            # Get market conditions unless the caller already has them
+            if market_conditions is None:
+                market_conditions = self.get_market_conditions()
             
             # Make recommendation based on market conditions and strategy performance
             if market_conditions['condition'] == 'bear':
@@ -278,215 +436,148 @@ class PortfolioAnalyzer:
             return "Unable to generate recommendation"
     
     def get_market_conditions(self):
-        """Analyze current market conditions with error handling"""
-        try:
-            # Define key market indicators
-            market_indicators = {
-                '^GSPC': {'name': 'S&P 500', 'weight': 0.3},
-                '^DJI': {'name': 'Dow Jones', 'weight': 0.2},
-                '^IXIC': {'name': 'NASDAQ', 'weight': 0.2},
-                '^VIX': {'name': 'VIX', 'weight': 0.3}
+        """Current market regime from the shared background snapshot"""
+        return self.market_regime.snapshot()
+    
+    def _analysis_cache_key(self, data):
+        """Key an analysis by its sorted ticker set, last bar date and last bar values"""
+        columns = tuple(sorted(data.columns))
+        last_bar = data[list(columns)].iloc[-1].to_numpy(dtype=float)
+        return (columns, data.index[-1].isoformat(), hash(last_bar.tobytes()))
+    
+    def _cached_analysis(self, cache_key, tickers, market_conditions):
+        """Return a per-request copy of a cached analysis, or None on a miss"""
+        cached_result = self._analysis_cache.get(cache_key)
+        if cached_result is None:
+            return None
+        
+        logger.info(f"Analysis cache hit for {list(cache_key[0])} as of {cache_key[1]}")
+        result = dict(cached_result)
+        result['metadata'] = {
+            **cached_result['metadata'],
+            'timestamp': datetime.now().isoformat(),
+            'tickers': tickers,
+            'market_conditions': market_conditions,
+            'cached': True
+        }
+        result['comparison'] = {
+            **cached_result['comparison'],
+            'recommendation': self.get_strategy_recommendation(cached_result['strategies'],
+                                                               market_conditions)
+        }
+        return result
+    
+    def _store_analysis(self, cache_key, result):
+        """Cache an analysis, dropping entries for the same tickers on older bars"""
+        self._analysis_cache.invalidate(lambda key: key[0] == cache_key[0] and key != cache_key)
+        self._analysis_cache.set(cache_key, result)
+    
+    def build_analysis(self, tickers, data, market_conditions=None, series_format='json', resolution='daily'):
+        """Optimize and score every strategy on an already-fetched return matrix"""
+        strategy_names = ["Mean Variance Criterion", "Sharpe Ratio Criterion", "Hierarchical Risk Parity"]
+        
+        if data.empty:
+            raise ValueError("No valid data for analysis")
+        
+        if market_conditions is None:
+            market_conditions = self.get_market_conditions()
+        
+        cache_key = self._analysis_cache_key(data)
+        cached_result = self._cached_analysis(cache_key, tickers, market_conditions)
+        if cached_result is not None:
+            return format_analysis_series(cached_result, series_format, resolution)
+        
+        solver_stats = {}
+        weights = self.execute_trade(data, solver_stats=solver_stats)
+        columns = list(data.columns)
+        
+        # Tail and drawdown risk for every strategy in one pass over the stacked returns;
+        # they need at least two returns, so shorter histories get the basic metrics only
+        strategy_returns = data.to_numpy(dtype=float) @ np.column_stack(weights)
+        risk = (risk_report(strategy_returns, names=strategy_names[:len(weights)])
+                if len(strategy_returns) >= 2 else {})
+        
+        optimum_return = {
+            'strategies': [],
+            'metadata': {
+                'timestamp': datetime.now().isoformat(),
+                'tickers': tickers,
+                'market_conditions': market_conditions,  # bull/bear/neutral
+                'solver_stats': solver_stats
             }
-            
-            market_scores = []
-            vix_level = None
-            
-            for symbol, info in market_indicators.items():
-                try:
-                    # Use our cached wrapper
-                    hist = yf_wrapper.get_history(symbol, period="1mo")  # Get 1 month of data
-                    
-                    if hist.empty:
-                        continue
-                    
-                    # Calculate various timeframe returns
-                    daily_return = ((hist['Close'].iloc[-1] - hist['Close'].iloc[-2]) / hist['Close'].iloc[-2]) * 100 if len(hist) > 1 else 0
-                    weekly_return = ((hist['Close'].iloc[-1] - hist['Close'].iloc[-5]) / hist['Close'].iloc[-5]) * 100 if len(hist) > 5 else 0
-                    monthly_return = ((hist['Close'].iloc[-1] - hist['Close'].iloc[0]) / hist['Close'].iloc[0]) * 100 if len(hist) > 0 else 0
-                    
-                    # Special handling for VIX (inverse relationship)
-                    if symbol == '^VIX':
-                        vix_level = hist['Close'].iloc[-1]
-                        # VIX scoring: High VIX = bearish, Low VIX = bullish
-                        if vix_level > 30:
-                            score = -2  # Very bearish
-                        elif vix_level > 25:
-                            score = -1.5  # Bearish
-                        elif vix_level > 20:
-                            score = -0.5  # Slightly bearish
-                        elif vix_level > 15:
-                            score = 0  # Neutral
-                        else:
-                            score = 1  # Bullish
-                        market_scores.append(score * info['weight'])
-                    else:
-                        # For other indices, positive returns = bullish
-                        if monthly_return > 5:
-                            score = 2  # Very bullish
-                        elif monthly_return > 2:
-                            score = 1.5  # Bullish
-                        elif monthly_return > 0:
-                            score = 0.5  # Slightly bullish
-                        elif monthly_return > -2:
-                            score = -0.5  # Slightly bearish
-                        elif monthly_return > -5:
-                            score = -1.5  # Bearish
-                        else:
-                            score = -2  # Very bearish
-                        
-                        market_scores.append(score * info['weight'])
-                        
-                except Exception as e:
-                    logger.warning(f"Error fetching {symbol}: {str(e)}")
+        }
+        
+        for strategy_idx, weight in enumerate(weights):
+            try:
+                strategy_name = strategy_names[strategy_idx]
+                portfolio_return = np.multiply(data, np.transpose(weight))
+                portfolio_return = portfolio_return.sum(axis=1)
+                
+                # Calculate additional metrics
+                returns_array = portfolio_return.flatten() if len(portfolio_return.shape) > 1 else portfolio_return
+                
+                # Ensure we have valid data
+                if len(returns_array) == 0:
+                    logger.warning(f"No returns data for {strategy_name}")
                     continue
-            
-            # Calculate weighted average market score
-            if market_scores:
-                avg_score = sum(market_scores)
                 
-                # Determine market condition based on score
-                if avg_score > 1:
-                    condition = "bull"
-                    description = "Strong Bullish"
-                    confidence = min(abs(avg_score) / 2 * 100, 100)
-                elif avg_score > 0.3:
-                    condition = "bull"
-                    description = "Bullish"
-                    confidence = min(abs(avg_score) / 2 * 100, 100)
-                elif avg_score >= -0.3:
-                    condition = "neutral"
-                    description = "Neutral"
-                    confidence = 50 + (abs(avg_score) * 50)
-                elif avg_score >= -1:
-                    condition = "bear"
-                    description = "Bearish"
-                    confidence = min(abs(avg_score) / 2 * 100, 100)
-                else:
-                    condition = "bear"
-                    description = "Strong Bearish"
-                    confidence = min(abs(avg_score) / 2 * 100, 100)
+                cumulative_returns = (1 + returns_array).cumprod() - 1
+                total_return_value = cumulative_returns.iloc[-1] if len(cumulative_returns) > 0 else 0
                 
-                # Additional market analysis
-                momentum = "positive" if avg_score > 0 else "negative"
-                volatility_status = "high" if vix_level and vix_level > 25 else "moderate" if vix_level and vix_level > 18 else "low"
+                n_days = len(returns_array)
+                n_years = n_days / 252 
+                annualized_return = (1 + total_return_value) ** (1/n_years) - 1 if n_years > 0 else 0
                 
-                return {
-                    'condition': condition,  # bull/bear/neutral as required
-                    'description': description,
-                    'score': round(avg_score, 2),
-                    'confidence': round(confidence, 1),
-                    'momentum': momentum,
-                    'volatility': volatility_status,
-                    'vix_level': round(vix_level, 2) if vix_level else None,
-                    'analysis_date': datetime.now().isoformat()
-                }
-            else:
-                # Default return if analysis fails
-                return {
-                    'condition': 'neutral',
-                    'description': 'Unable to determine',
-                    'score': 0,
-                    'confidence': 0,
-                    'momentum': 'neutral',
-                    'volatility': 'moderate',
-                    'vix_level': None,
-                    'analysis_date': datetime.now().isoformat()
+                # FIXED: Calculate annualized Sharpe ratio (assuming 252 trading days)
+                daily_sharpe = np.mean(returns_array) / np.std(returns_array) if np.std(returns_array) != 0 else 0
+                annualized_sharpe = daily_sharpe * np.sqrt(252)
+                
+                strategy_data = {
+                    'name': strategy_name,
+                    'portfolio_return': portfolio_return,  # encoded per request on the way out
+                    'metrics': {
+                        'total_return': float(total_return_value),  # FIXED: Compounded return
+                        'annualized_return': float(annualized_return), 
+                        'avg_daily_return': float(np.mean(returns_array)),
+                        'volatility': float(np.std(returns_array)),
+                        'sharpe_ratio': float(annualized_sharpe),  # FIXED: Annualized Sharpe ratio
+                        'years_analyzed': round(n_years, 1),
+                        **risk.get(strategy_name, {})
+                    },
+                    'ticker_allocation': {ticker: float(w) for ticker, w in zip(columns, weight)}
                 }
                 
-        except Exception as e:
-            logger.error(f"Error in get_market_conditions: {str(e)}")
-            # Return default neutral condition on error
-            return {
-                'condition': 'neutral',
-                'description': 'Analysis Error',
-                'score': 0,
-                'confidence': 0,
-                'momentum': 'neutral',
-                'volatility': 'moderate',
-                'vix_level': None,
-                'analysis_date': datetime.now().isoformat(),
-                'error': str(e)
+                optimum_return['strategies'].append(strategy_data)
+            
+            except Exception as e:
+                logger.error(f"Error processing {strategy_name}: {str(e)}")
+                continue
+        
+        if optimum_return['strategies']:
+            optimum_return['comparison'] = {
+                'best_performer': max(optimum_return['strategies'], key=lambda x: x['metrics']['total_return'])['name'],
+                'lowest_risk': min(optimum_return['strategies'], key=lambda x: x['metrics']['volatility'])['name'],
+                'recommendation': self.get_strategy_recommendation(optimum_return['strategies'],
+                                                                    market_conditions)
             }
-    
-    def stock_analysis(self, tickers):
+        else:
+            optimum_return['comparison'] = {
+                'best_performer': 'N/A',
+                'lowest_risk': 'N/A',
+                'recommendation': 'Insufficient data for analysis'
+            }
+            return optimum_return
+        
+        self._store_analysis(cache_key, optimum_return)
+        # Hand out an encoded copy so callers can add keys without touching the cache
+        return format_analysis_series(optimum_return, series_format, resolution)
+
+    def stock_analysis(self, tickers, series_format='json', resolution='daily'):
         """Perform stock analysis with comprehensive error handling"""
         try:
-            strategy_names = ["Mean Variance Criterion", "Sharpe Ratio Criterion"]
             data = self.get_current_market_data(tickers)
-            
-            if data.empty:
-                raise ValueError("No valid data for analysis")
-            
-            weights = self.execute_trade(data)
-            
-            optimum_return = {
-                'strategies': [],
-                'metadata': {
-                    'timestamp': datetime.now().isoformat(),
-                    'tickers': tickers,
-                    'market_conditions': self.get_market_conditions()  # bull/bear/neutral
-                }
-            }
-            
-            for strategy_idx, weight in enumerate(weights):
-                try:
-                    strategy_name = strategy_names[strategy_idx]
-                    portfolio_return = np.multiply(data, np.transpose(weight))
-                    portfolio_return = portfolio_return.sum(axis=1)
-                    
-                    # Calculate additional metrics
-                    returns_array = portfolio_return.flatten() if len(portfolio_return.shape) > 1 else portfolio_return
-                    
-                    # Ensure we have valid data
-                    if len(returns_array) == 0:
-                        logger.warning(f"No returns data for {strategy_name}")
-                        continue
-                    
-                    cumulative_returns = (1 + returns_array).cumprod() - 1
-                    total_return_value = cumulative_returns.iloc[-1] if len(cumulative_returns) > 0 else 0
-                    
-                    n_days = len(returns_array)
-                    n_years = n_days / 252 
-                    annualized_return = (1 + total_return_value) ** (1/n_years) - 1 if n_years > 0 else 0
-                    
-                    # FIXED: Calculate annualized Sharpe ratio (assuming 252 trading days)
-                    daily_sharpe = np.mean(returns_array) / np.std(returns_array) if np.std(returns_array) != 0 else 0
-                    annualized_sharpe = daily_sharpe * np.sqrt(252)
-                    
-                    strategy_data = {
-                        'name': strategy_name,
-                        'portfolio_return': portfolio_return.tolist(),
-                        'metrics': {
-                            'total_return': float(total_return_value),  # FIXED: Compounded return
-                            'annualized_return': float(annualized_return), 
-                            'avg_daily_return': float(np.mean(returns_array)),
-                            'volatility': float(np.std(returns_array)),
-                            'sharpe_ratio': float(annualized_sharpe),  # FIXED: Annualized Sharpe ratio
-                            'years_analyzed': round(n_years, 1)
-                        },
-                        'ticker_allocation': {ticker: float(w) for ticker, w in zip(tickers, weight)}
-                    }
-                    
-                    optimum_return['strategies'].append(strategy_data)
-                    
-                except Exception as e:
-                    logger.error(f"Error processing {strategy_name}: {str(e)}")
-                    continue
-            
-            if optimum_return['strategies']:
-                optimum_return['comparison'] = {
-                    'best_performer': max(optimum_return['strategies'], key=lambda x: x['metrics']['total_return'])['name'],
-                    'lowest_risk': min(optimum_return['strategies'], key=lambda x: x['metrics']['volatility'])['name'],
-                    'recommendation': self.get_strategy_recommendation(optimum_return['strategies'])
-                }
-            else:
-                optimum_return['comparison'] = {
-                    'best_performer': 'N/A',
-                    'lowest_risk': 'N/A',
-                    'recommendation': 'Insufficient data for analysis'
-                }
-        
-            return optimum_return
+            return self.build_analysis(tickers, data, series_format=series_format,
+                                       resolution=resolution)
             
         except Exception as e:
             logger.error(f"Error in stock_analysis: {str(e)}")
@@ -505,70 +596,172 @@ class PortfolioAnalyzer:
                 }
             }
             
-    def run_strategy(self, tickers):
-        """Run strategy with proper thread management"""
-        logger.info(f"Initializing the strategy with tickers: {tickers}")
-        self.is_running = True
-        self._stop_event.clear()
-        
-        strategy_names = ["Mean Variance Criterion", "Sharpe Ratio Criterion"]
-        consecutive_errors = 0
-        max_consecutive_errors = 5
-        
-        while self.is_running and not self._stop_event.is_set():
+    def batch_analysis(self, baskets, series_format='json', resolution='daily'):
+        """
+        Analyze many ticker baskets with one price download and one market
+        conditions lookup, running the optimizations concurrently
+        """
+        union = sorted({ticker for basket in baskets for ticker in basket})
+        # The panel has a column for every requested ticker; all-NaN ones had no data
+        panel, empty = self.get_price_panel(union).drop_empty()
+        market_conditions = self.get_market_conditions()
+        
+        def analyze_basket(basket):
             try:
-                data = self.get_current_market_data(tickers)
-                weights_list = self.execute_trade(data)
+                missing = [ticker for ticker in basket if ticker in empty or ticker not in panel]
+                if missing:
+                    raise ValueError(f"No data retrieved for {', '.join(missing)}")
                 
-                result = {
-                    'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'strategies': []
-                }
-                
-                for strategy_idx, weights in enumerate(weights_list):
-                    strategy_name = strategy_names[strategy_idx]
-                    formatted_weights = {ticker: float(weight) for ticker, weight in zip(tickers, weights)}
-                    result['strategies'].append({
-                        'name': strategy_name,
-                        'weights': formatted_weights
-                    })
-                
-                # Emit to all connected clients
-                socketio.emit('strategy_update', result, namespace='/')
-                logger.info(f"Strategy update emitted successfully")
-                
-                # Reset error counter on success
-                consecutive_errors = 0
+                # Slice before dropping gaps so each basket keeps its own full history
+                data = panel.select(basket).returns()
+                return self.build_analysis(basket, data, market_conditions,
+                                           series_format=series_format, resolution=resolution)
+            except Exception as e:
+                logger.error(f"Error analyzing basket {basket}: {str(e)}")
+                return {'error': str(e), 'strategies': [], 'metadata': {'tickers': basket}}
+        
+        futures = [cpu_executor.submit(analyze_basket, basket) for basket in baskets]
+        return {
+            'results': [future.result() for future in futures],
+            'metadata': {
+                'timestamp': datetime.now().isoformat(),
+                'baskets': len(baskets),
+                'unique_tickers': len(union),
+                'market_conditions': market_conditions
+            }
+        }
             
-                # Wait for next update or stop signal
-                self._stop_event.wait(self.time_update)
+    def backtest(self, tickers, window='expanding', lookback=252, rebalance='monthly',
+                 cost_bps=0.0, series_format='json', resolution='daily'):
+        """Walk-forward out-of-sample backtest of every strategy"""
+        backtester = BacktestService(window=window, lookback=lookback,
+                                     rebalance=rebalance, cost_bps=cost_bps)
+        data = self.get_current_market_data(tickers)
+        
+        result = backtester.run(data)
+        result['metadata'].update({
+            'timestamp': datetime.now().isoformat(),
+            'tickers': list(data.columns)
+        })
+        return format_analysis_series(result, series_format, resolution)
             
-            except Exception as e:
-                consecutive_errors += 1
-                logger.error(f"Error in strategy execution ({consecutive_errors}/{max_consecutive_errors}): {str(e)}")
-                
-                if consecutive_errors >= max_consecutive_errors:
-                    logger.error("Too many consecutive errors, stopping strategy")
-                    self.is_running = False
-                    break
-                
-                # Exponential backoff on errors
-                self._stop_event.wait(min(10 * (2 ** consecutive_errors), 300))
-        
-        self.is_running = False
-        logger.info("Strategy execution stopped")
-                
-    def stop_strategy(self):
-        """Gracefully stop the strategy"""
-        self.is_running = False
-        self._stop_event.set()
-        logger.info("Stop signal sent to strategy")
+    def frontier_analysis(self, tickers, n_points=50):
+        """Compute the efficient frontier for a ticker set in one pass"""
+        data = self.get_current_market_data(tickers)
+        
+        if data.empty:
+            raise ValueError("No valid data for analysis")
+        
+        mu, cov = compute_moments(data)
+        frontier = efficient_frontier(mu, cov, n_points=n_points)
+        
+        annual_returns = frontier['returns'] * 252
+        annual_volatility = frontier['volatility'] * np.sqrt(252)
+        sharpe = np.divide(annual_returns, annual_volatility,
+                           out=np.zeros_like(annual_returns), where=annual_volatility > 0)
+        
+        # One row per frontier point: [return, volatility, sharpe, weight_1, ..., weight_n]
+        points = np.column_stack([annual_returns, annual_volatility, sharpe, frontier['weights']])
+        columns = list(data.columns) if isinstance(data, pd.DataFrame) else list(tickers)
+        
+        return {
+            'columns': ['annualized_return', 'annualized_volatility', 'sharpe_ratio'] + columns,
+            'points': np.round(points, 6).tolist(),
+            'converged': int(frontier['converged'].sum()),
+            'metadata': {
+                'timestamp': datetime.now().isoformat(),
+                'tickers': columns,
+                'n_points': len(points),
+                'observations': len(data)
+            }
+        }
+            
+    def projection(self, tickers, years=10, n_paths=10000, method='moments',
+                   initial_value=10000.0, seed=None):
+        """Monte Carlo projection of each optimized strategy's portfolio value"""
+        simulator = MonteCarloService(n_paths=n_paths, years=years, method=method, seed=seed,
+                                      memory_budget_mb=int(os.getenv('MONTE_CARLO_MEMORY_MB', '64')))
+        data = self.get_current_market_data(tickers)
+        
+        if data.empty:
+            raise ValueError("No valid data for analysis")
+        
+        strategy_names = ["Mean Variance Criterion", "Sharpe Ratio Criterion", "Hierarchical Risk Parity"]
+        weights_list = self.execute_trade(data)
+        
+        strategies = []
+        for name, weights in zip(strategy_names, weights_list):
+            projection = simulator.simulate(data, weights, initial_value=initial_value)
+            projection['name'] = name
+            projection['weights'] = {ticker: float(w) for ticker, w in zip(data.columns, weights)}
+            strategies.append(projection)
+        
+        return {
+            'strategies': strategies,
+            'metadata': {
+                'timestamp': datetime.now().isoformat(),
+                'tickers': list(data.columns),
+                'observations': len(data)
+            }
+        }
 
 # Create an instance of the analyzer and controllers
-Analyzer = PortfolioAnalyzer()
-sentiment_analyzer = SentimentalAnalysis(api_key=os.getenv("ALPHA_VANTAGE_API_KEY"))
+market_regime_service = MarketRegimeService(
+    refresh_interval=int(os.getenv('MARKET_REGIME_REFRESH_SECONDS', '300'))
+)
+Analyzer = PortfolioAnalyzer(market_regime=market_regime_service)
+analysis_jobs = AnalysisJobManager(
+    Analyzer,
+    emit=socketio.emit,
+    max_workers=int(os.getenv('ANALYSIS_JOB_WORKERS', '4')),
+    per_user_limit=int(os.getenv('ANALYSIS_JOBS_PER_USER', '2'))
+)
+strategy_scheduler = StrategyScheduler(
+    Analyzer,
+    emit=socketio.emit,
+    max_workers=int(os.getenv('STRATEGY_WORKERS', '4')),
+    refresh_policy=Analyzer.refresh_policy
+)
+# MARKET_DATA_PROVIDER=replay serves prices and news from recorded/synthetic files
+sentiment_analyzer = SentimentalAnalysis(api_key=os.getenv("ALPHA_VANTAGE_API_KEY"),
+                                         provider=provider_from_env())
 investment_controller = InvestmentController()
 
+def stock_table_tickers():
+    """Tickers saved in the Stock table"""
+    with app.app_context():
+        return [ticker for (ticker,) in db.session.query(Stock.ticker).distinct()]
+
+prefetch_service = PrefetchService(
+    seed_sources=[lambda: list(MARKET_INDICATORS), lambda: list(HEDGE_SYMBOLS), stock_table_tickers],
+    interval=int(os.getenv('PREFETCH_INTERVAL_SECONDS', '60')),
+    batch_size=int(os.getenv('PREFETCH_BATCH_SIZE', '20')),
+    hot_size=int(os.getenv('PREFETCH_HOT_TICKERS', '40'))
+)
+
+_background_lock = threading.Lock()
+_background_started = False
+
+def start_background_services():
+    """
+    Start the market regime refresher and the market data prefetcher, once per process
+
+    Called at boot by the entry points and on the first request by the
+    portfolio blueprint, so WSGI imports of either app get them too.
+    BACKGROUND_SERVICES=false turns them off (e.g. under test).
+    """
+    global _background_started
+    if _background_started or os.getenv('BACKGROUND_SERVICES', 'true').lower() != 'true':
+        return
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+        # Publish the market regime in the background from startup
+        market_regime_service.start()
+        # Warm hot tickers and keep them refreshed
+        prefetch_service.start()
+
 
 # Context manager for database sessions
 @contextmanager
@@ -610,81 +803,21 @@ app.register_blueprint(sentiment_bp)
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
-    try:
-        # Check database connectivity
-        db.session.execute('SELECT 1')
-        db_status = 'healthy'
-    except Exception as e:
-        db_status = f'unhealthy: {str(e)}'
-    
-    return jsonify({
-        'status': 'ok',
-        'timestamp': datetime.now().isoformat(),
-        'database': db_status,
-        'analyzer_running': Analyzer.is_running
-    })
+    """Health check endpoint - delegates to the portfolio blueprint"""
+    from routes.portfolio import health_check as portfolio_health_check
+    return portfolio_health_check()
 
 @app.route('/api/start', methods=['POST'])
 def start():
-    """Start the strategy with thread management"""
-    try:
-        data = request.get_json()
-        tickers = data.get('tickers', [])
-        
-        if not tickers:
-            return jsonify({'error': 'No tickers found'}), 400
-        
-        # Clean and validate tickers
-        tickers = [ticker.strip().upper() for ticker in tickers if ticker.strip()]
-        
-        with analyzer_lock:
-            if Analyzer.is_running:
-                return jsonify({'message': 'Strategy is already running'}), 200
-            
-            # Clean up old threads
-            global active_threads
-            active_threads = [t for t in active_threads if t.is_alive()]
-            
-            # Start new thread
-            thread = threading.Thread(
-                target=Analyzer.run_strategy, 
-                args=(tickers,),
-                name=f"StrategyThread-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            )
-            thread.daemon = True
-            thread.start()
-            active_threads.append(thread)
-        
-        return jsonify({
-            'message': 'Strategy started successfully',
-            'tickers': tickers
-        }), 200
-        
-    except Exception as e:
-        logger.error(f"Error starting strategy: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+    """Start a live strategy - delegates to the portfolio blueprint"""
+    from routes.portfolio import start as portfolio_start
+    return portfolio_start()
 
 @app.route('/api/stop', methods=['POST'])
 def stop():
-    """Stop the strategy gracefully"""
-    try:
-        with analyzer_lock:
-            if not Analyzer.is_running:
-                return jsonify({'message': 'Strategy is not running'}), 200
-            
-            Analyzer.stop_strategy()
-            
-            # Wait for thread to finish (with timeout)
-            for thread in active_threads:
-                if thread.is_alive():
-                    thread.join(timeout=5)
-        
-        return jsonify({'message': 'Strategy has been stopped'}), 200
-        
-    except Exception as e:
-        logger.error(f"Error stopping strategy: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+    """Stop live strategies - delegates to the portfolio blueprint"""
+    from routes.portfolio import stop as portfolio_stop
+    return portfolio_stop()
 
 @app.route('/api/stocks', methods=['GET'])
 def get_stocks():
@@ -1245,26 +1378,8 @@ def get_stock_prices_batch():
         if not ticker_list:
             return jsonify([]), 200
             
-        results = []
-        for ticker in ticker_list:
-            try:
-                # Use the cached wrapper
-                stock_data = yf_wrapper.get_stock_info(ticker)
-                results.append({
-                    'ticker': ticker,
-                    'price': stock_data['currentPrice'] if 'currentPrice' in stock_data else None,
-                    'change': stock_data['change'] if 'change' in stock_data else None,
-                    'change_percent': stock_data['changePercent'] if 'changePercent' in stock_data else None,
-                })
-            except Exception as e:
-                logger.error(f"Error fetching data for {ticker}: {e}")
-                results.append({
-                    'ticker': ticker,
-                    'price': None,
-                    'change': None,
-                    'change_percent': None,
-                    'error': str(e)
-                })
+        # One multi-ticker download covers every uncached ticker
+        results = yf_wrapper.get_price_rows(ticker_list)
                 
         return jsonify(results), 200
         
@@ -1294,6 +1409,55 @@ def handle_disconnect(sid=None):
     except Exception as e:
         logger.error(f"Error in handle_disconnect: {str(e)}")
     
+@socketio.on('join_strategy')
+def handle_join_strategy(data):
+    """Subscribe this socket to a live strategy's updates"""
+    try:
+        strategy = strategy_scheduler.get((data or {}).get('strategy_id'))
+        # Only the caller that started a strategy may subscribe to it
+        if strategy is None or strategy.owner != session.get('caller_id'):
+            emit('strategy_error', {'error': 'Strategy not found'})
+            return
+        join_room(strategy.room)
+        emit('strategy_joined', {'strategy_id': strategy.id, 'room': strategy.room})
+    except Exception as e:
+        logger.error(f"Error in handle_join_strategy: {str(e)}")
+
+@socketio.on('leave_strategy')
+def handle_leave_strategy(data):
+    """Unsubscribe this socket from a live strategy's updates"""
+    try:
+        strategy = strategy_scheduler.get((data or {}).get('strategy_id'))
+        if strategy is not None:
+            leave_room(strategy.room)
+    except Exception as e:
+        logger.error(f"Error in handle_leave_strategy: {str(e)}")
+
+@socketio.on('join_analysis')
+def handle_join_analysis(data):
+    """Subscribe this socket to an analysis job's progress"""
+    try:
+        job = analysis_jobs.get((data or {}).get('job_id'))
+        # Only the caller that submitted a job may subscribe to it
+        if job is None or job.owner != session.get('caller_id'):
+            emit('analysis_error', {'error': 'Job not found'})
+            return
+        join_room(job.room)
+        # Current state, so events sent before joining are not missed
+        emit('analysis_joined', job.to_dict())
+    except Exception as e:
+        logger.error(f"Error in handle_join_analysis: {str(e)}")
+
+@socketio.on('leave_analysis')
+def handle_leave_analysis(data):
+    """Unsubscribe this socket from an analysis job's progress"""
+    try:
+        job = analysis_jobs.get((data or {}).get('job_id'))
+        if job is not None:
+            leave_room(job.room)
+    except Exception as e:
+        logger.error(f"Error in handle_leave_analysis: {str(e)}")
+
 @socketio.on('ping')
 def handle_ping():
     """Handle ping requests for connection monitoring"""
@@ -1392,14 +1556,17 @@ if __name__ == '__main__':
         """Handle shutdown signals gracefully"""
         logger.info('Shutting down gracefully...')
         
-        # Stop the analyzer if running
-        if Analyzer.is_running:
-            Analyzer.stop_strategy()
+        # Stop every live strategy and the scheduler thread
+        strategy_scheduler.stop()
+        strategy_scheduler.shutdown()
+        market_regime_service.shutdown()
+        prefetch_service.shutdown()
         
         # Give threads time to finish
         time.sleep(2)
         
         # Cleanup resources
+        analysis_jobs.shutdown()
         cache.shutdown()
         async_cleanup()
         
@@ -1409,6 +1576,9 @@ if __name__ == '__main__':
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
     
+    # Start warming market data before the first request arrives
+    start_background_services()
+    
     # Configuration based on environment
     ENV = os.getenv('FLASK_ENV', 'development')
     
@@ -1436,4 +1606,4 @@ if __name__ == '__main__':
     async_cleanup()
 
 # Export key components for testing
-__all__ = ['app', 'db', 'socketio', 'Stock', 'PortfolioAnalyzer']
\ No newline at end of file
+__all__ = ['app', 'db', 'socketio', 'Stock', 'PortfolioAnalyzer', 'strategy_scheduler']
\ No newline at end of file
@@ -5,6 +5,7 @@ Handles options trading strategies with FIX protocol integration
 
 from flask import Blueprint, request, jsonify
 from services.options_service import OptionsService
+from utils.risk_metrics import risk_report
 import logging
 import numpy as np
 from datetime import datetime, timedelta
@@ -269,12 +270,18 @@ def get_historical_analysis():
         
         # Calculate summary statistics
         returns = historical_data['Returns'].dropna()
+        # Tail and downside metrics need at least two returns
+        risk = risk_report(returns, names=[symbol])[symbol] if len(returns) >= 2 else None
         summary_stats = {
             'total_return': ((historical_data['Close'].iloc[-1] / historical_data['Close'].iloc[0]) - 1) * 100,
             'annualized_return': (((historical_data['Close'].iloc[-1] / historical_data['Close'].iloc[0]) ** (252 / len(historical_data))) - 1) * 100,
             'volatility': returns.std() * np.sqrt(252) * 100,
             'sharpe_ratio': (returns.mean() / returns.std()) * np.sqrt(252) if returns.std() > 0 else 0,
             'max_drawdown': ((historical_data['Close'] / historical_data['Close'].cummax()) - 1).min() * 100,
+            'var_95': risk['historical_var'] * 100 if risk else None,
+            'cvar_95': risk['historical_cvar'] * 100 if risk else None,
+            'sortino_ratio': risk['sortino_ratio'] if risk else None,
+            'calmar_ratio': risk['calmar_ratio'] if risk else None,
             'data_points': len(historical_data),
             'start_date': historical_data.index[0].strftime('%Y-%m-%d'),
             'end_date': historical_data.index[-1].strftime('%Y-%m-%d')
@@ -38,61 +38,73 @@ def get_market_insights():
         logger.error(f"Error getting market insights: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@cached(ttl=300, hard_ttl=1800)
+def _market_index_rows():
+    """
+    Latest value and daily change of the headline indices
+
+    Cached as plain data rather than a response, so a stale result can be
+    served while it is refreshed in the background. Returns None when no
+    index could be fetched, which is not cached.
+    """
+    indices = {
+        '^GSPC': 'S&P 500',
+        '^IXIC': 'NASDAQ',
+        '^DJI': 'Dow Jones',
+        '^VIX': 'VIX'
+    }
+    
+    market_data = []
+    
+    for symbol, name in indices.items():
+        try:
+            # Use our cached wrapper
+            hist = yf_wrapper.get_history(symbol, period="2d")
+            
+            if not hist.empty:
+                current_price = hist['Close'].iloc[-1]
+                
+                # Calculate change if we have at least 2 data points
+                if len(hist) >= 2:
+                    previous_price = hist['Close'].iloc[-2]
+                    change = ((current_price - previous_price) / previous_price) * 100
+                else:
+                    # For single-day data (like VIX sometimes), try to get intraday change
+                    try:
+                        # Get more historical data to calculate daily change
+                        extended_hist = yf_wrapper.get_history(symbol, period="5d")
+                        if len(extended_hist) >= 2:
+                            previous_price = extended_hist['Close'].iloc[-2]
+                            change = ((current_price - previous_price) / previous_price) * 100
+                        else:
+                            # Fall back to open vs close for intraday change
+                            open_price = hist['Open'].iloc[-1]
+                            change = ((current_price - open_price) / open_price) * 100
+                    except:
+                        change = 0.0  # Default to 0 if we can't calculate change
+                
+                market_data.append({
+                    'symbol': symbol,
+                    'name': name,
+                    'value': round(current_price, 2),
+                    'change': round(change, 2),
+                    'timestamp': datetime.now().isoformat()
+                })
+            else:
+                logger.warning(f"No data available for {symbol}")
+                
+        except Exception as e:
+            logger.error(f"Error fetching {symbol}: {str(e)}")
+            continue
+    
+    return market_data or None
+
 @investment_bp.route('/market-indices', methods=['GET'])
-@cached(ttl=300)  # Cache for 5 minutes
 @rate_limited(general_api_limiter)
 def get_market_indices():
     """Get current market indices data"""
     try:
-        indices = {
-            '^GSPC': 'S&P 500',
-            '^IXIC': 'NASDAQ',
-            '^DJI': 'Dow Jones',
-            '^VIX': 'VIX'
-        }
-        
-        market_data = []
-        
-        for symbol, name in indices.items():
-            try:
-                # Use our cached wrapper
-                hist = yf_wrapper.get_history(symbol, period="2d")
-                
-                if not hist.empty:
-                    current_price = hist['Close'].iloc[-1]
-                    
-                    # Calculate change if we have at least 2 data points
-                    if len(hist) >= 2:
-                        previous_price = hist['Close'].iloc[-2]
-                        change = ((current_price - previous_price) / previous_price) * 100
-                    else:
-                        # For single-day data (like VIX sometimes), try to get intraday change
-                        try:
-                            # Get more historical data to calculate daily change
-                            extended_hist = yf_wrapper.get_history(symbol, period="5d")
-                            if len(extended_hist) >= 2:
-                                previous_price = extended_hist['Close'].iloc[-2]
-                                change = ((current_price - previous_price) / previous_price) * 100
-                            else:
-                                # Fall back to open vs close for intraday change
-                                open_price = hist['Open'].iloc[-1]
-                                change = ((current_price - open_price) / open_price) * 100
-                        except:
-                            change = 0.0  # Default to 0 if we can't calculate change
-                    
-                    market_data.append({
-                        'symbol': symbol,
-                        'name': name,
-                        'value': round(current_price, 2),
-                        'change': round(change, 2),
-                        'timestamp': datetime.now().isoformat()
-                    })
-                else:
-                    logger.warning(f"No data available for {symbol}")
-                    
-            except Exception as e:
-                logger.error(f"Error fetching {symbol}: {str(e)}")
-                continue
+        market_data = _market_index_rows() or []
         
         return jsonify({
             'success': True,
@@ -119,26 +131,8 @@ def get_stock_prices_batch():
         if not ticker_list:
             return jsonify([]), 200
             
-        results = []
-        for ticker in ticker_list:
-            try:
-                # Use the cached wrapper
-                stock_data = yf_wrapper.get_stock_info(ticker)
-                results.append({
-                    'ticker': ticker,
-                    'price': stock_data['currentPrice'] if 'currentPrice' in stock_data else None,
-                    'change': stock_data['change'] if 'change' in stock_data else None,
-                    'change_percent': stock_data['changePercent'] if 'changePercent' in stock_data else None,
-                })
-            except Exception as e:
-                logger.error(f"Error fetching data for {ticker}: {e}")
-                results.append({
-                    'ticker': ticker,
-                    'price': None,
-                    'change': None,
-                    'change_percent': None,
-                    'error': str(e)
-                })
+        # One multi-ticker download covers every uncached ticker
+        results = yf_wrapper.get_price_rows(ticker_list)
                 
         return jsonify(results), 200
         
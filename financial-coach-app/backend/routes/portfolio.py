@@ -1,18 +1,18 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, session
+import uuid
 import logging
-import threading
 from contextlib import contextmanager
 from datetime import datetime
 from flask_socketio import SocketIO
 from models.portfolio_models import Stock, db
+from utils.series_encoding import SERIES_FORMATS, SERIES_RESOLUTIONS
 
 logger = logging.getLogger(__name__)
 
 portfolio_bp = Blueprint('portfolio', __name__, url_prefix='/api')
 
-# Thread-safe analyzer instance management
-analyzer_lock = threading.Lock()
-active_threads = []
+# Baskets above the optimizer's large-universe threshold use the factor-model path
+MAX_ANALYSIS_TICKERS = 500
 
 # Context manager for database sessions
 @contextmanager
@@ -28,6 +28,31 @@ def get_db_session():
     finally:
         db.session.close()
 
+def caller_id():
+    """Server-issued id of the calling client, kept in its signed session cookie"""
+    if 'caller_id' not in session:
+        session['caller_id'] = uuid.uuid4().hex
+    return session['caller_id']
+
+def get_series_options(data):
+    """Read the opt-in return series encoding options from a request body"""
+    series_format = data.get('series_format', 'json')
+    resolution = data.get('resolution', 'daily')
+    
+    if series_format not in SERIES_FORMATS:
+        raise ValueError(f"series_format must be one of: {', '.join(SERIES_FORMATS)}")
+    if resolution not in SERIES_RESOLUTIONS:
+        raise ValueError(f"resolution must be one of: {', '.join(SERIES_RESOLUTIONS)}")
+    
+    return series_format, resolution
+
+@portfolio_bp.before_app_request
+def ensure_background_services():
+    """Start prefetching and the market regime refresher under any entry point"""
+    # Import here to avoid circular imports
+    from app_portfolio import start_background_services
+    start_background_services()
+
 @portfolio_bp.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -39,18 +64,34 @@ def health_check():
         db_status = f'unhealthy: {str(e)}'
     
     # Import here to avoid circular imports
-    from app_portfolio import Analyzer
+    from app_portfolio import strategy_scheduler, prefetch_service
+    from utils.market_data import market_data_gateway
+    from utils.cache_manager import cache
     
     return jsonify({
         'status': 'ok',
         'timestamp': datetime.now().isoformat(),
         'database': db_status,
-        'analyzer_running': Analyzer.is_running
+        'analyzer_running': strategy_scheduler.active_count() > 0,
+        'active_strategies': strategy_scheduler.active_count(),
+        'market_data': market_data_gateway.metrics(),
+        'cache': cache.stats(),
+        'ready': prefetch_service.ready.is_set(),
+        'prefetch': prefetch_service.status()
     })
 
+@portfolio_bp.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 503 until the startup market data warm-up has finished"""
+    # Import here to avoid circular imports
+    from app_portfolio import prefetch_service
+    
+    status = prefetch_service.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
 @portfolio_bp.route('/start', methods=['POST'])
 def start():
-    """Start the strategy with thread management"""
+    """Start a live strategy on the shared scheduler"""
     try:
         data = request.get_json()
         tickers = data.get('tickers', [])
@@ -61,29 +102,21 @@ def start():
         # Clean and validate tickers
         tickers = [ticker.strip().upper() for ticker in tickers if ticker.strip()]
         
+        interval = data.get('interval', 30)
+        if not isinstance(interval, (int, float)) or interval < 5:
+            return jsonify({'error': 'interval must be a number of seconds >= 5'}), 400
+        
         # Import here to avoid circular imports
-        from app_portfolio import Analyzer, active_threads
+        from app_portfolio import strategy_scheduler
         
-        with analyzer_lock:
-            if Analyzer.is_running:
-                return jsonify({'message': 'Strategy is already running'}), 200
-            
-            # Clean up old threads
-            active_threads = [t for t in active_threads if t.is_alive()]
-            
-            # Start new thread
-            thread = threading.Thread(
-                target=Analyzer.run_strategy, 
-                args=(tickers,),
-                name=f"StrategyThread-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            )
-            thread.daemon = True
-            thread.start()
-            active_threads.append(thread)
+        # Updates go to a room named after the strategy; only this caller may join it
+        strategy = strategy_scheduler.start_strategy(tickers, interval=interval, owner=caller_id())
         
         return jsonify({
             'message': 'Strategy started successfully',
-            'tickers': tickers
+            'tickers': tickers,
+            'strategy_id': strategy.id,
+            'room': strategy.room
         }), 200
         
     except Exception as e:
@@ -92,28 +125,46 @@ def start():
 
 @portfolio_bp.route('/stop', methods=['POST'])
 def stop():
-    """Stop the strategy gracefully"""
+    """Stop one of the caller's strategies by id, or every strategy the caller owns"""
     try:
+        data = request.get_json(silent=True) or {}
+        
         # Import here to avoid circular imports
-        from app_portfolio import Analyzer, active_threads
+        from app_portfolio import strategy_scheduler
         
-        with analyzer_lock:
-            if not Analyzer.is_running:
+        owner = caller_id()
+        strategy_id = data.get('strategy_id')
+        if strategy_id:
+            strategy = strategy_scheduler.get(strategy_id)
+            if strategy is None or strategy.owner != owner:
                 return jsonify({'message': 'Strategy is not running'}), 200
-            
-            Analyzer.stop_strategy()
-            
-            # Wait for thread to finish (with timeout)
-            for thread in active_threads:
-                if thread.is_alive():
-                    thread.join(timeout=5)
+            strategy_scheduler.stop_strategy(strategy_id)
+            return jsonify({'message': 'Strategy has been stopped', 'strategy_id': strategy_id}), 200
         
-        return jsonify({'message': 'Strategy has been stopped'}), 200
+        stopped = strategy_scheduler.stop(owner=owner)
+        if not stopped:
+            return jsonify({'message': 'Strategy is not running'}), 200
+        
+        return jsonify({
+            'message': 'Strategy has been stopped',
+            'stopped': stopped
+        }), 200
         
     except Exception as e:
         logger.error(f"Error stopping strategy: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@portfolio_bp.route('/strategies', methods=['GET'])
+def list_strategies():
+    """List the caller's live strategies"""
+    # Import here to avoid circular imports
+    from app_portfolio import strategy_scheduler
+    
+    return jsonify({
+        'success': True,
+        'data': [strategy.to_dict() for strategy in strategy_scheduler.list_strategies(owner=caller_id())]
+    })
+
 @portfolio_bp.route('/stocks', methods=['GET'])
 def get_stocks():
     """Get all stocks"""
@@ -173,14 +224,20 @@ def get_analysis():
         tickers = [ticker.strip().upper() for ticker in tickers if ticker.strip()]
         
         # Limit number of tickers to prevent abuse
-        if len(tickers) > 20:
-            return jsonify({'error': 'Maximum 20 tickers allowed'}), 400
+        if len(tickers) > MAX_ANALYSIS_TICKERS:
+            return jsonify({'error': f'Maximum {MAX_ANALYSIS_TICKERS} tickers allowed'}), 400
+        
+        try:
+            series_format, resolution = get_series_options(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Import here to avoid circular imports
         from app_portfolio import Analyzer
         
         # Get the analysis
-        optimum_portfolio = Analyzer.stock_analysis(tickers)
+        optimum_portfolio = Analyzer.stock_analysis(tickers, series_format=series_format,
+                                                    resolution=resolution)
         
         # Check for errors in analysis
         if 'error' in optimum_portfolio:
@@ -211,6 +268,318 @@ def get_analysis():
             'message': 'Failed to analyze portfolio'
         }), 500
 
+@portfolio_bp.route('/analysis/jobs', methods=['POST'])
+def submit_analysis_job():
+    """Queue a portfolio analysis and return its job id immediately"""
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+            
+        tickers = data.get('tickers', [])
+        
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        
+        # Clean and validate tickers
+        tickers = [ticker.strip().upper() for ticker in tickers if ticker.strip()]
+        
+        if not tickers:
+            return jsonify({'error': 'No tickers provided'}), 400
+        
+        if len(tickers) > MAX_ANALYSIS_TICKERS:
+            return jsonify({'error': f'Maximum {MAX_ANALYSIS_TICKERS} tickers allowed'}), 400
+        
+        try:
+            series_format, resolution = get_series_options(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Import here to avoid circular imports
+        from app_portfolio import analysis_jobs
+        
+        # Jobs belong to the server-issued caller id; progress goes to the job's room,
+        # which only this caller may join
+        try:
+            job = analysis_jobs.submit(tickers, caller_id(),
+                                       series_format=series_format, resolution=resolution)
+        except RuntimeError as e:
+            return jsonify({'success': False, 'error': str(e)}), 429
+        
+        return jsonify({
+            'success': True,
+            'data': job.to_dict(include_result=False)
+        }), 202
+    
+    except Exception as e:
+        logger.error(f"Error submitting analysis job: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Failed to queue analysis'
+        }), 500
+
+@portfolio_bp.route('/analysis/jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    """Poll an analysis job's status and result"""
+    # Import here to avoid circular imports
+    from app_portfolio import analysis_jobs
+    
+    job = analysis_jobs.get(job_id, owner=caller_id())
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    return jsonify({
+        'success': True,
+        'data': job.to_dict()
+    })
+
+@portfolio_bp.route('/analysis/jobs/<job_id>', methods=['DELETE'])
+def cancel_analysis_job(job_id):
+    """Cancel a queued or running analysis job"""
+    # Import here to avoid circular imports
+    from app_portfolio import analysis_jobs
+    
+    job = analysis_jobs.cancel(job_id, owner=caller_id())
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    return jsonify({
+        'success': True,
+        'data': job.to_dict(include_result=False)
+    })
+
+@portfolio_bp.route('/analysis/batch', methods=['POST'])
+def get_batch_analysis():
+    """Analyze many ticker baskets sharing one price download"""
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        baskets = data.get('baskets', [])
+        
+        if not baskets or not isinstance(baskets, list):
+            return jsonify({'error': 'No baskets provided'}), 400
+        
+        # Limit batch size to prevent abuse
+        if len(baskets) > 50:
+            return jsonify({'error': 'Maximum 50 baskets allowed'}), 400
+        
+        cleaned_baskets = []
+        for tickers in baskets:
+            if isinstance(tickers, str):
+                tickers = [tickers]
+            tickers = [ticker.strip().upper() for ticker in tickers if ticker.strip()]
+            
+            if not tickers:
+                return jsonify({'error': 'Each basket needs at least one ticker'}), 400
+            if len(tickers) > MAX_ANALYSIS_TICKERS:
+                return jsonify({'error': f'Maximum {MAX_ANALYSIS_TICKERS} tickers allowed per basket'}), 400
+            cleaned_baskets.append(tickers)
+        
+        try:
+            series_format, resolution = get_series_options(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Import here to avoid circular imports
+        from app_portfolio import Analyzer
+        
+        batch = Analyzer.batch_analysis(cleaned_baskets, series_format=series_format,
+                                        resolution=resolution)
+        
+        for result in batch['results']:
+            if 'error' not in result:
+                result['insights'] = {
+                    'portfolio_size': len(result['metadata']['tickers']),
+                    'recommendations': get_portfolio_recommendations(result)
+                }
+        
+        return jsonify({
+            'success': True,
+            'data': batch
+        })
+    
+    except Exception as e:
+        logger.error(f"Error getting batch analysis: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Failed to analyze baskets'
+        }), 500
+
+@portfolio_bp.route('/backtest', methods=['POST'])
+def get_backtest():
+    """Walk-forward backtest of the MV, Sharpe and HRP strategies"""
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+            
+        tickers = data.get('tickers', [])
+        
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        
+        # Clean and validate tickers
+        tickers = [ticker.strip().upper() for ticker in tickers if ticker.strip()]
+        
+        if not tickers:
+            return jsonify({'error': 'No tickers provided'}), 400
+        
+        if len(tickers) > 20:
+            return jsonify({'error': 'Maximum 20 tickers allowed'}), 400
+        
+        try:
+            series_format, resolution = get_series_options(data)
+            lookback = int(data.get('lookback', 252))
+            cost_bps = float(data.get('cost_bps', 0))
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Import here to avoid circular imports
+        from app_portfolio import Analyzer
+        
+        try:
+            result = Analyzer.backtest(tickers,
+                                       window=data.get('window', 'expanding'),
+                                       lookback=lookback,
+                                       rebalance=data.get('rebalance', 'monthly'),
+                                       cost_bps=cost_bps,
+                                       series_format=series_format,
+                                       resolution=resolution)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+    
+    except Exception as e:
+        logger.error(f"Error running backtest: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Failed to run backtest'
+        }), 500
+
+@portfolio_bp.route('/frontier', methods=['POST'])
+def get_frontier():
+    """Get the efficient frontier for a ticker set in a single call"""
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+            
+        tickers = data.get('tickers', [])
+        
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        
+        # Clean and validate tickers
+        tickers = [ticker.strip().upper() for ticker in tickers if ticker.strip()]
+        
+        if len(tickers) < 2:
+            return jsonify({'error': 'At least 2 tickers required'}), 400
+        
+        if len(tickers) > 20:
+            return jsonify({'error': 'Maximum 20 tickers allowed'}), 400
+        
+        n_points = data.get('points', 50)
+        if not isinstance(n_points, int) or not 2 <= n_points <= 200:
+            return jsonify({'error': 'points must be an integer between 2 and 200'}), 400
+        
+        # Import here to avoid circular imports
+        from app_portfolio import Analyzer
+        
+        frontier = Analyzer.frontier_analysis(tickers, n_points=n_points)
+        
+        return jsonify({
+            'success': True,
+            'data': frontier
+        })
+    
+    except Exception as e:
+        logger.error(f"Error computing frontier: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Failed to compute efficient frontier'
+        }), 500
+
+@portfolio_bp.route('/projection', methods=['POST'])
+def get_projection():
+    """Monte Carlo projection of the optimized portfolios over 1 to 30 years"""
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+            
+        tickers = data.get('tickers', [])
+        
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        
+        # Clean and validate tickers
+        tickers = [ticker.strip().upper() for ticker in tickers if ticker.strip()]
+        
+        if not tickers:
+            return jsonify({'error': 'No tickers provided'}), 400
+        
+        if len(tickers) > 20:
+            return jsonify({'error': 'Maximum 20 tickers allowed'}), 400
+        
+        try:
+            years = int(data.get('years', 10))
+            n_paths = int(data.get('paths', 10000))
+            initial_value = float(data.get('initial_value', 10000))
+            seed = data.get('seed')
+            seed = int(seed) if seed is not None else None
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if not 1 <= years <= 30:
+            return jsonify({'error': 'years must be between 1 and 30'}), 400
+        
+        if not 1000 <= n_paths <= 100000:
+            return jsonify({'error': 'paths must be between 1000 and 100000'}), 400
+        
+        if initial_value <= 0:
+            return jsonify({'error': 'initial_value must be positive'}), 400
+        
+        # Import here to avoid circular imports
+        from app_portfolio import Analyzer
+        
+        try:
+            result = Analyzer.projection(tickers,
+                                         years=years,
+                                         n_paths=n_paths,
+                                         method=data.get('method', 'moments'),
+                                         initial_value=initial_value,
+                                         seed=seed)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+    
+    except Exception as e:
+        logger.error(f"Error running projection: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Failed to run projection'
+        }), 500
+
 def get_portfolio_recommendations(analysis):
     """Generate recommendations based on analysis results"""
     try:
@@ -333,26 +702,8 @@ def get_stock_prices_batch():
         if not ticker_list:
             return jsonify([]), 200
             
-        results = []
-        for ticker in ticker_list:
-            try:
-                # Use the cached wrapper
-                stock_data = yf_wrapper.get_stock_info(ticker.strip())
-                results.append({
-                    'ticker': ticker.strip(),
-                    'price': stock_data.get('currentPrice'),
-                    'change': stock_data.get('change'),
-                    'change_percent': stock_data.get('changePercent'),
-                })
-            except Exception as e:
-                logger.error(f"Error fetching data for {ticker}: {e}")
-                results.append({
-                    'ticker': ticker.strip(),
-                    'price': None,
-                    'change': None,
-                    'change_percent': None,
-                    'error': str(e)
-                })
+        # One multi-ticker download covers every uncached ticker
+        results = yf_wrapper.get_price_rows(ticker_list)
                 
         return jsonify(results), 200
         
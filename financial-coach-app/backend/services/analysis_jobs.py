@@ -0,0 +1,183 @@
+import uuid
+import time
+import logging
+import threading
+import concurrent.futures
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker when its job has been cancelled"""
+
+
+class AnalysisJob:
+    """State of a single queued portfolio analysis"""
+    def __init__(self, tickers, owner, options=None):
+        self.id = uuid.uuid4().hex
+        self.tickers = tickers
+        self.owner = owner
+        # Socket.IO room for this job's events; sockets join it only as the owner
+        self.room = self.id
+        self.options = options or {}
+        self.status = 'queued'
+        self.progress = 0
+        self.stage = 'queued'
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.future = None
+        self.cancel_event = threading.Event()
+
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed', 'cancelled')
+
+    def to_dict(self, include_result=True):
+        data = {
+            'job_id': self.id,
+            'room': self.room,
+            'status': self.status,
+            'stage': self.stage,
+            'progress': self.progress,
+            'tickers': self.tickers,
+            'created_at': datetime.fromtimestamp(self.created_at).isoformat(),
+            'finished_at': datetime.fromtimestamp(self.finished_at).isoformat() if self.finished_at else None
+        }
+        if self.error:
+            data['error'] = self.error
+        if include_result and self.result is not None:
+            data['result'] = self.result
+        return data
+
+
+class AnalysisJobManager:
+    """
+    Runs stock analyses on a bounded worker pool so request threads return
+    immediately with a job id
+
+    Progress and completion are pushed through the supplied emit callable
+    (``socketio.emit``) as ``analysis_progress`` / ``analysis_done`` events to
+    the job's room, and can also be polled by job id. Jobs belong to the
+    server-issued id of the caller that submitted them, which is also what
+    the per-user concurrency limit counts.
+    """
+    def __init__(self, analyzer, emit=None, max_workers=4, per_user_limit=2, retention=3600):
+        self.analyzer = analyzer
+        self.emit = emit
+        self.per_user_limit = per_user_limit
+        self.retention = retention
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="analysis_job"
+        )
+        self._jobs = {}
+        self._lock = threading.RLock()
+
+    def _active_count(self, owner):
+        return sum(1 for job in self._jobs.values()
+                   if job.owner == owner and not job.is_finished)
+
+    def _prune(self):
+        """Forget finished jobs older than the retention window"""
+        cutoff = time.time() - self.retention
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.is_finished and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def submit(self, tickers, owner, **options):
+        """
+        Queue an analysis
+
+        Raises:
+            RuntimeError: if the user already has per_user_limit active jobs
+        """
+        with self._lock:
+            self._prune()
+            if self._active_count(owner) >= self.per_user_limit:
+                raise RuntimeError(f"Maximum {self.per_user_limit} concurrent analyses per user")
+
+            job = AnalysisJob(tickers, owner, options=options)
+            self._jobs[job.id] = job
+            job.future = self._executor.submit(self._run, job)
+
+        logger.info(f"Queued analysis job {job.id} for {tickers}")
+        return job
+
+    def get(self, job_id, owner=None):
+        """The job, or None if it does not exist or belongs to another owner"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or (owner is not None and job.owner != owner):
+            return None
+        return job
+
+    def cancel(self, job_id, owner=None):
+        """Cancel a queued job outright or signal a running one to stop at its next stage"""
+        with self._lock:
+            job = self.get(job_id, owner=owner)
+            if job is None or job.is_finished:
+                return job
+
+            job.cancel_event.set()
+            if job.future is not None and job.future.cancel():
+                self._finish(job, 'cancelled')
+        return job
+
+    def _notify(self, event, payload, job):
+        if self.emit is None:
+            return
+        try:
+            self.emit(event, payload, to=job.room, namespace='/')
+        except Exception as e:
+            logger.warning(f"Failed to emit {event} for job {job.id}: {str(e)}")
+
+    def _update(self, job, stage, progress):
+        if job.cancel_event.is_set():
+            raise JobCancelled()
+        job.stage = stage
+        job.progress = progress
+        self._notify('analysis_progress', job.to_dict(include_result=False), job)
+
+    def _finish(self, job, status, result=None, error=None):
+        job.status = status
+        job.stage = status
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        if status == 'done':
+            job.progress = 100
+        self._notify('analysis_done', job.to_dict(), job)
+
+    def _run(self, job):
+        job.status = 'running'
+        try:
+            self._update(job, 'fetching_data', 10)
+            data = self.analyzer.get_current_market_data(job.tickers)
+
+            self._update(job, 'market_conditions', 40)
+            market_conditions = self.analyzer.get_market_conditions()
+
+            self._update(job, 'optimizing', 60)
+            result = self.analyzer.build_analysis(job.tickers, data, market_conditions, **job.options)
+
+            if job.cancel_event.is_set():
+                raise JobCancelled()
+            self._finish(job, 'done', result=result)
+
+        except JobCancelled:
+            logger.info(f"Analysis job {job.id} cancelled")
+            self._finish(job, 'cancelled')
+        except Exception as e:
+            logger.error(f"Analysis job {job.id} failed: {str(e)}")
+            self._finish(job, 'failed', error=str(e))
+
+    def shutdown(self):
+        """Cancel everything pending and stop the worker pool"""
+        with self._lock:
+            for job in self._jobs.values():
+                job.cancel_event.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,186 @@
+import logging
+import numpy as np
+import pandas as pd
+from utils.portfolio_optimizer import solve_weights, hrp_weights
+from utils.risk_metrics import risk_report
+
+logger = logging.getLogger(__name__)
+
+REBALANCE_PERIODS = {
+    'weekly': 'W',
+    'monthly': 'M',
+    'quarterly': 'Q'
+}
+
+STRATEGY_NAMES = {
+    'mv': "Mean Variance Criterion",
+    'sr': "Sharpe Ratio Criterion",
+    'hrp': "Hierarchical Risk Parity"
+}
+
+
+class BacktestService:
+    """
+    Walk-forward backtester for the MV, Sharpe and HRP strategies
+
+    Window moments come from block prefix sums of r and r r^T taken only at
+    the indices the walk actually needs, so each re-optimization costs O(n^2)
+    to set up instead of a pass over the whole window. Holdings drift
+    buy-and-hold between rebalances and every out-of-sample period is
+    evaluated as one matrix product.
+    """
+    def __init__(self, window='expanding', lookback=252, rebalance='monthly',
+                 cost_bps=0.0, maxiter=500):
+        if window not in ('expanding', 'rolling'):
+            raise ValueError("window must be 'expanding' or 'rolling'")
+        if rebalance not in REBALANCE_PERIODS:
+            raise ValueError(f"rebalance must be one of: {', '.join(REBALANCE_PERIODS)}")
+        if lookback < 20:
+            raise ValueError("lookback must be at least 20 trading days")
+
+        self.window = window
+        self.lookback = lookback
+        self.rebalance = rebalance
+        self.cost_bps = cost_bps
+        self.maxiter = maxiter
+
+    def _rebalance_indices(self, index):
+        """Row positions of the first trading day of each period after the warm-up"""
+        periods = index.to_period(REBALANCE_PERIODS[self.rebalance])
+        starts = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+        return starts[starts >= self.lookback]
+
+    def _window_moments(self, returns, rebalance_idx):
+        """Yield (mu, cov) of the estimation window ending before each rebalance"""
+        starts = (rebalance_idx - self.lookback if self.window == 'rolling'
+                  else np.zeros_like(rebalance_idx))
+        needed = np.unique(np.r_[starts, rebalance_idx])
+
+        # Prefix sums only at the needed positions, accumulated block by block
+        s1 = {}
+        s2 = {}
+        n = returns.shape[1]
+        running1 = np.zeros(n)
+        running2 = np.zeros((n, n))
+        previous = 0
+        for position in needed:
+            block = returns[previous:position]
+            running1 = running1 + block.sum(axis=0)
+            running2 = running2 + block.T @ block
+            s1[position], s2[position] = running1, running2
+            previous = position
+
+        for start, end in zip(starts, rebalance_idx):
+            count = end - start
+            mu = (s1[end] - s1[start]) / count
+            cov = (s2[end] - s2[start]) / count - np.outer(mu, mu)
+            yield mu, cov
+
+    def _simulate(self, returns, rebalance_idx, weights):
+        """Out-of-sample daily returns, turnover per rebalance and costs for one strategy"""
+        bounds = np.r_[rebalance_idx, len(returns)]
+        period_returns = []
+        turnover = np.zeros(len(rebalance_idx))
+        drifted = None
+
+        for k, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+            target = weights[k]
+            turnover[k] = 0.5 * np.abs(target - drifted).sum() if drifted is not None else 0.5
+            growth = np.cumprod(1 + returns[start:end], axis=0)
+            value = growth @ target
+            daily = np.diff(np.r_[1.0, value]) / np.r_[1.0, value[:-1]]
+            daily[0] -= turnover[k] * self.cost_bps / 10000
+            period_returns.append(daily)
+            drifted = target * growth[-1] / value[-1]
+
+        return np.concatenate(period_returns), turnover
+
+    def _metrics(self, daily, turnover, years, risk):
+        equity = np.cumprod(1 + daily)
+        volatility = daily.std()
+        return {
+            'total_return': float(equity[-1] - 1),
+            'annualized_return': float(equity[-1] ** (1 / years) - 1) if years > 0 else 0.0,
+            'volatility': float(volatility),
+            'sharpe_ratio': float(daily.mean() / volatility * np.sqrt(252)) if volatility > 0 else 0.0,
+            **risk,
+            'average_turnover': float(turnover[1:].mean()) if len(turnover) > 1 else 0.0,
+            'annual_turnover': float(turnover[1:].sum() / years) if years > 0 else 0.0
+        }
+
+    def run(self, data, criteria=('mv', 'sr', 'hrp')):
+        """
+        Run the walk-forward backtest
+
+        Args:
+            data: T x n DataFrame of daily returns indexed by date
+            criteria: strategies to evaluate ('mv', 'sr', 'hrp')
+
+        Returns:
+            dict: per-strategy out-of-sample return series (pandas Series),
+                  metrics and the weights chosen at each rebalance
+        """
+        returns = data.to_numpy(dtype=float)
+        index = pd.DatetimeIndex(data.index)
+        rebalance_idx = self._rebalance_indices(index)
+        if len(rebalance_idx) == 0:
+            raise ValueError("Not enough history for the requested lookback")
+
+        n = returns.shape[1]
+        weights = {criterion: np.empty((len(rebalance_idx), n)) for criterion in criteria}
+        previous = {criterion: np.ones(n) / n for criterion in criteria}
+        failures = {criterion: 0 for criterion in criteria}
+
+        for k, (mu, cov) in enumerate(self._window_moments(returns, rebalance_idx)):
+            for criterion in criteria:
+                if criterion == 'hrp':
+                    # Closed-form allocation, nothing to warm start or fail
+                    weights[criterion][k] = hrp_weights(cov)
+                    continue
+                # Warm start from the previous rebalance's weights
+                result = solve_weights(criterion, mu, cov, previous[criterion], maxiter=self.maxiter)
+                if result['feasible']:
+                    previous[criterion] = result['weights']
+                else:
+                    failures[criterion] += 1
+                weights[criterion][k] = previous[criterion]
+
+        oos_index = index[rebalance_idx[0]:]
+        years = len(oos_index) / 252
+        simulated = {criterion: self._simulate(returns, rebalance_idx, weights[criterion])
+                     for criterion in criteria}
+        # Drawdown and tail risk for every strategy in one pass
+        risk = risk_report(np.column_stack([simulated[criterion][0] for criterion in criteria]),
+                           names=list(criteria))
+
+        strategies = []
+        for criterion in criteria:
+            daily, turnover = simulated[criterion]
+            metrics = self._metrics(daily, turnover, years, risk[criterion])
+            metrics['solver_failures'] = failures[criterion]
+            strategies.append({
+                'name': STRATEGY_NAMES[criterion],
+                'portfolio_return': pd.Series(daily, index=oos_index),
+                'metrics': metrics,
+                'rebalances': [
+                    {
+                        'date': index[position].strftime('%Y-%m-%d'),
+                        'weights': {ticker: round(float(w), 6)
+                                    for ticker, w in zip(data.columns, weights[criterion][k])}
+                    }
+                    for k, position in enumerate(rebalance_idx)
+                ]
+            })
+
+        return {
+            'strategies': strategies,
+            'metadata': {
+                'window': self.window,
+                'lookback': self.lookback,
+                'rebalance': self.rebalance,
+                'cost_bps': self.cost_bps,
+                'rebalance_count': int(len(rebalance_idx)),
+                'out_of_sample_start': oos_index[0].strftime('%Y-%m-%d'),
+                'out_of_sample_end': oos_index[-1].strftime('%Y-%m-%d')
+            }
+        }
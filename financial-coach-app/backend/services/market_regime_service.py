@@ -0,0 +1,194 @@
+import time
+import logging
+import threading
+import pandas as pd
+from datetime import datetime
+from utils.yfinance_utils import yf_wrapper
+
+logger = logging.getLogger(__name__)
+
+# Key market indicators and their weight in the regime score
+MARKET_INDICATORS = {
+    '^GSPC': {'name': 'S&P 500', 'weight': 0.3},
+    '^DJI': {'name': 'Dow Jones', 'weight': 0.2},
+    '^IXIC': {'name': 'NASDAQ', 'weight': 0.2},
+    '^VIX': {'name': 'VIX', 'weight': 0.3}
+}
+
+
+def _default_conditions(description, error=None):
+    conditions = {
+        'condition': 'neutral',
+        'description': description,
+        'score': 0,
+        'confidence': 0,
+        'momentum': 'neutral',
+        'volatility': 'moderate',
+        'vix_level': None,
+        'analysis_date': datetime.now().isoformat()
+    }
+    if error is not None:
+        conditions['error'] = error
+    return conditions
+
+
+def score_market(closes):
+    """
+    Score the market regime from one month of index closes
+
+    Args:
+        closes: dict of symbol -> pandas Series of daily closes
+
+    Returns:
+        dict: bull/bear/neutral condition with score, confidence and VIX level
+    """
+    market_scores = []
+    vix_level = None
+
+    for symbol, info in MARKET_INDICATORS.items():
+        close = closes.get(symbol)
+        if close is None or close.empty:
+            continue
+
+        monthly_return = ((close.iloc[-1] - close.iloc[0]) / close.iloc[0]) * 100
+
+        # Special handling for VIX (inverse relationship)
+        if symbol == '^VIX':
+            vix_level = close.iloc[-1]
+            # VIX scoring: High VIX = bearish, Low VIX = bullish
+            if vix_level > 30:
+                score = -2  # Very bearish
+            elif vix_level > 25:
+                score = -1.5  # Bearish
+            elif vix_level > 20:
+                score = -0.5  # Slightly bearish
+            elif vix_level > 15:
+                score = 0  # Neutral
+            else:
+                score = 1  # Bullish
+        else:
+            # For other indices, positive returns = bullish
+            if monthly_return > 5:
+                score = 2  # Very bullish
+            elif monthly_return > 2:
+                score = 1.5  # Bullish
+            elif monthly_return > 0:
+                score = 0.5  # Slightly bullish
+            elif monthly_return > -2:
+                score = -0.5  # Slightly bearish
+            elif monthly_return > -5:
+                score = -1.5  # Bearish
+            else:
+                score = -2  # Very bearish
+
+        market_scores.append(score * info['weight'])
+
+    if not market_scores:
+        return _default_conditions('Unable to determine')
+
+    avg_score = sum(market_scores)
+
+    # Determine market condition based on score
+    if avg_score > 1:
+        condition, description = "bull", "Strong Bullish"
+        confidence = min(abs(avg_score) / 2 * 100, 100)
+    elif avg_score > 0.3:
+        condition, description = "bull", "Bullish"
+        confidence = min(abs(avg_score) / 2 * 100, 100)
+    elif avg_score >= -0.3:
+        condition, description = "neutral", "Neutral"
+        confidence = 50 + (abs(avg_score) * 50)
+    elif avg_score >= -1:
+        condition, description = "bear", "Bearish"
+        confidence = min(abs(avg_score) / 2 * 100, 100)
+    else:
+        condition, description = "bear", "Strong Bearish"
+        confidence = min(abs(avg_score) / 2 * 100, 100)
+
+    momentum = "positive" if avg_score > 0 else "negative"
+    volatility_status = "high" if vix_level and vix_level > 25 else "moderate" if vix_level and vix_level > 18 else "low"
+
+    return {
+        'condition': condition,  # bull/bear/neutral as required
+        'description': description,
+        'score': round(avg_score, 2),
+        'confidence': round(confidence, 1),
+        'momentum': momentum,
+        'volatility': volatility_status,
+        'vix_level': round(float(vix_level), 2) if vix_level else None,
+        'analysis_date': datetime.now().isoformat()
+    }
+
+
+class MarketRegimeService:
+    """
+    Background market-regime publisher
+
+    A refresh downloads all indicator indices in one batched call, scores the
+    regime and atomically replaces the published snapshot. Readers get a copy
+    of the latest snapshot in O(1); only if no background thread is keeping it
+    fresh does a read trigger a synchronous refresh once the snapshot is stale.
+    """
+    def __init__(self, refresh_interval=300):
+        self.refresh_interval = refresh_interval
+        self._snapshot = None
+        self._published_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _fetch_closes(self):
+        """One multi-ticker download for every indicator"""
+        data = yf_wrapper.download_data(list(MARKET_INDICATORS), period='1mo', interval='1d',
+                                        progress=False, auto_adjust=True)
+        if data is None or data.empty:
+            raise ValueError("No index data retrieved")
+
+        closes = data['Close']
+        if isinstance(closes, pd.Series):
+            closes = closes.to_frame(name=list(MARKET_INDICATORS)[0])
+        return {symbol: closes[symbol].dropna() for symbol in MARKET_INDICATORS if symbol in closes}
+
+    def refresh(self):
+        """Recompute and publish the regime snapshot"""
+        with self._refresh_lock:
+            try:
+                snapshot = score_market(self._fetch_closes())
+            except Exception as e:
+                logger.error(f"Error refreshing market regime: {str(e)}")
+                if self._snapshot is not None:
+                    # Keep serving the last good regime rather than an error
+                    return self._snapshot
+                snapshot = _default_conditions('Analysis Error', error=str(e))
+
+            self._snapshot = snapshot
+            self._published_at = time.time()
+            logger.info(f"Market regime refreshed: {snapshot['condition']} ({snapshot['score']})")
+            return snapshot
+
+    def snapshot(self):
+        """Return a copy of the latest published regime"""
+        snapshot = self._snapshot
+        is_background = self._thread is not None and self._thread.is_alive()
+        stale = time.time() - self._published_at > self.refresh_interval
+        if snapshot is None or (stale and not is_background):
+            snapshot = self.refresh()
+        return dict(snapshot)
+
+    def _worker(self):
+        while not self._stop_event.is_set():
+            self.refresh()
+            self._stop_event.wait(self.refresh_interval)
+
+    def start(self):
+        """Start refreshing in the background"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._worker, name="MarketRegime", daemon=True)
+            self._thread.start()
+
+    def shutdown(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
@@ -98,19 +98,24 @@ class LongStrapPosition:
     max_loss: float
     profit_potential: str
 
+US_SYMBOLS = (
+    'AAPL', 'MSFT', 'GOOGL', 'AMZN', 'TSLA',
+    'NVDA', 'META', 'NFLX', 'AMD', 'ORCL'
+)
+
+# South African symbols (JSE)
+SA_SYMBOLS = (
+    'NPN.JO', 'PRX.JO', 'SHP.JO', 'ABG.JO', 'FSR.JO',
+    'BTI.JO', 'CFR.JO', 'SOL.JO', 'MTN.JO', 'VOD.JO'
+)
+
+# Every symbol the hedge strategies cover, readable without building a service
+HEDGE_SYMBOLS = US_SYMBOLS + SA_SYMBOLS
+
 class OptionsService:
     def __init__(self):
-        self.us_symbols = [
-            'AAPL', 'MSFT', 'GOOGL', 'AMZN', 'TSLA',
-            'NVDA', 'META', 'NFLX', 'AMD', 'ORCL'
-        ]
-        
-        # South African symbols (JSE)
-        self.sa_symbols = [
-            'NPN.JO', 'PRX.JO', 'SHP.JO', 'ABG.JO', 'FSR.JO',
-            'BTI.JO', 'CFR.JO', 'SOL.JO', 'MTN.JO', 'VOD.JO'
-        ]
-        
+        self.us_symbols = list(US_SYMBOLS)
+        self.sa_symbols = list(SA_SYMBOLS)
         self.all_symbols = self.us_symbols + self.sa_symbols
         
         # Initialize FIX client
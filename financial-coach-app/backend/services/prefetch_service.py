@@ -0,0 +1,124 @@
+import time
+import logging
+import threading
+from datetime import datetime
+from utils.yfinance_utils import yf_wrapper
+from utils.rate_limiter import yfinance_limiter
+
+logger = logging.getLogger(__name__)
+
+
+class PrefetchService:
+    """
+    Warms and keeps refreshed the market data users are likely to ask for
+
+    The target set is the union of fixed seed sources (callables returning
+    tickers, e.g. index symbols, hedge symbols, the Stock table) and the
+    tickers with the highest recent request frequency. Each pass fetches
+    quotes and daily history in batches. Every upstream call a batch makes
+    (the quote download and each price store fetch) first takes a slot from
+    ``limiter``, and only while more than ``reserve`` slots are free, so user
+    requests are never queued behind prefetching. ``ready`` is set once the
+    first pass (the boot warm-up) has finished.
+    """
+    def __init__(self, seed_sources=(), wrapper=yf_wrapper, limiter=yfinance_limiter,
+                 interval=60, batch_size=20, hot_size=40, reserve=1, history_start='2012-01-01'):
+        self.seed_sources = list(seed_sources)
+        self.wrapper = wrapper
+        self.limiter = limiter
+        self.interval = interval
+        self.batch_size = batch_size
+        self.hot_size = hot_size
+        self.reserve = reserve
+        self.history_start = history_start
+        self.ready = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._status = {
+            'passes': 0,
+            'tickers': 0,
+            'hot_tickers': [],
+            'failed_batches': 0,
+            'last_run': None,
+            'last_duration': None
+        }
+
+    def seed_tickers(self):
+        """Tickers from every seed source; a failing source is skipped"""
+        tickers = []
+        for source in self.seed_sources:
+            try:
+                tickers.extend(source())
+            except Exception as e:
+                logger.error(f"Error reading prefetch seed tickers: {str(e)}")
+        return tickers
+
+    def targets(self):
+        """Seed tickers followed by the current hot set, deduplicated"""
+        hot = self.wrapper.demand.top(self.hot_size)
+        tickers = [t.strip().upper() for t in self.seed_tickers() + hot if t and t.strip()]
+        return list(dict.fromkeys(tickers)), hot
+
+    def _acquire(self):
+        """Slot for one upstream call, leaving ``reserve`` slots to user requests"""
+        self.limiter.acquire(self.reserve)
+
+    def _warm_batch(self, batch):
+        self.wrapper.get_quotes(batch, track=False, acquire=self._acquire)
+        self.wrapper.sync_daily_history(batch, start=self.history_start, acquire=self._acquire)
+
+    def run_once(self):
+        """One prefetch pass over every target ticker"""
+        start_time = time.time()
+        tickers, hot = self.targets()
+        failed = 0
+
+        for i in range(0, len(tickers), self.batch_size):
+            if self._stop_event.is_set():
+                break
+            batch = tickers[i:i + self.batch_size]
+            try:
+                self._warm_batch(batch)
+            except Exception as e:
+                failed += 1
+                logger.error(f"Error prefetching {batch}: {str(e)}")
+
+        duration = time.time() - start_time
+        self._status.update({
+            'passes': self._status['passes'] + 1,
+            'tickers': len(tickers),
+            'hot_tickers': hot,
+            'failed_batches': self._status['failed_batches'] + failed,
+            'last_run': datetime.now().isoformat(),
+            'last_duration': round(duration, 2)
+        })
+        if not self.ready.is_set():
+            self.ready.set()
+            logger.info(f"Market data warm-up finished: {len(tickers)} tickers in {duration:.1f}s")
+        return tickers
+
+    def _worker(self):
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Error in prefetch pass: {str(e)}")
+            self._stop_event.wait(self.interval)
+
+    def start(self):
+        """Warm up in the background, then keep refreshing on the interval"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._worker, name="Prefetch", daemon=True)
+            self._thread.start()
+
+    def status(self):
+        status = dict(self._status)
+        status['ready'] = self.ready.is_set()
+        return status
+
+    def shutdown(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
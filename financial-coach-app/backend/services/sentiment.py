@@ -15,6 +15,7 @@ from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
 from enum import Enum
 import logging
+from utils.data_providers import AlphaVantageProvider
 
 
 logging.basicConfig(level=logging.INFO)
@@ -43,12 +44,14 @@ class SentimentInterpretation:
     icon: str 
 
 class SentimentalAnalysis:
-    def __init__(self, api_key: Optional[str] = None, cache_duration: int = 30):
+    def __init__(self, api_key: Optional[str] = None, cache_duration: int = 30, provider=None):
         """
         Initialize Sentiment Analysis class
+
+        provider supplies the news feed; by default Alpha Vantage, which needs an API key.
         """
         self.api_key = api_key or ALPHA_VANTAGE_API_KEY
-        if not self.api_key:
+        if not self.api_key and provider is None:
             raise ValueError("API key not provided. Set ALPHA_VANTAGE_API_KEY environment variable or pass api_key parameter.")
         
         self.cache_duration = cache_duration
@@ -57,6 +60,7 @@ class SentimentalAnalysis:
         
         
         self.session = self._create_session()
+        self.provider = provider or AlphaVantageProvider(self.api_key, self.session)
         
     def _create_session(self):
         """Create a requests session with retry logic"""
@@ -105,19 +109,8 @@ class SentimentalAnalysis:
             try:
                 logger.info(f"Fetching sentiment data for {ticker} (attempt {attempt + 1}/{len(timeouts)}, timeout={timeout}s)")
                 
-                # Make API request with session (includes retry logic)
-                url = 'https://www.alphavantage.co/query'
-                params = {
-                    'function': 'NEWS_SENTIMENT',
-                    'tickers': ticker,
-                    'apikey': self.api_key,
-                    'limit': 50  # Limit to reduce response size and time
-                }
-                
-                response = self.session.get(url, params=params, timeout=timeout)
-                response.raise_for_status()
-                
-                data = response.json()
+                # Limit to reduce response size and time; the session retries
+                data = self.provider.news_sentiment(ticker, limit=50, timeout=timeout)
                 
                 # Check for API errors
                 if 'Error Message' in data:
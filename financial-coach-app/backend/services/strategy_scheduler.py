@@ -0,0 +1,269 @@
+import uuid
+import time
+import heapq
+import logging
+import threading
+import concurrent.futures
+from datetime import datetime, timedelta
+from utils.streaming_moments import StreamingMoments
+from utils.trading_calendar import AdaptiveRefresh, realized_volatility_ratio
+
+logger = logging.getLogger(__name__)
+
+STRATEGY_NAMES = ["Mean Variance Criterion", "Sharpe Ratio Criterion", "Hierarchical Risk Parity"]
+
+
+class LiveStrategy:
+    """A live strategy hosted by the scheduler"""
+    def __init__(self, tickers, interval, room=None, owner=None):
+        self.id = uuid.uuid4().hex
+        self.tickers = tickers
+        self.key = tuple(sorted(tickers))
+        self.interval = interval
+        self.room = room or self.id
+        self.owner = owner
+        self.weights = None
+        self.next_run = 0.0
+        self.last_run = None
+        self.volatility_ratio = None
+        self.consecutive_errors = 0
+        self.last_update = None
+        self.created_at = datetime.now()
+        self.active = True
+
+    def to_dict(self):
+        return {
+            'strategy_id': self.id,
+            'tickers': self.tickers,
+            'interval': self.interval,
+            'room': self.room,
+            'owner': self.owner,
+            'last_update': self.last_update,
+            'next_run': datetime.fromtimestamp(self.next_run).isoformat() if self.next_run else None,
+            'consecutive_errors': self.consecutive_errors,
+            'created_at': self.created_at.isoformat()
+        }
+
+
+class StrategyScheduler:
+    """
+    Hosts many live strategies on a single scheduler thread
+
+    While their exchanges are in session, strategies become due on a
+    wall-clock grid of their interval (shortened during volatility spikes) so
+    that strategies with the same interval tick together; when the markets
+    are closed the refresh policy parks them until the next session. Each tick fetches the
+    union of the due strategies' tickers once, folds the tail bars into one
+    shared StreamingMoments state per ticker set, re-solves every due strategy
+    on a small worker pool (warm-started from its previous weights) and emits
+    ``strategy_update`` only to that strategy's Socket.IO room.
+    """
+    def __init__(self, analyzer, emit=None, max_workers=4, max_consecutive_errors=5,
+                 refresh_policy=None):
+        self.analyzer = analyzer
+        self.emit = emit
+        self.refresh_policy = refresh_policy or AdaptiveRefresh()
+        self.max_consecutive_errors = max_consecutive_errors
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="strategy_worker"
+        )
+        self._strategies = {}
+        self._states = {}  # ticker set -> StreamingMoments shared by its strategies
+        self._heap = []
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._loop, name="StrategyScheduler", daemon=True)
+            self._thread.start()
+
+    def _schedule(self, strategy, delay=None):
+        if delay is None:
+            strategy.next_run = self.refresh_policy.next_run(strategy.tickers, strategy.interval,
+                                                             last_run=strategy.last_run,
+                                                             volatility_ratio=strategy.volatility_ratio)
+        else:
+            strategy.next_run = time.time() + delay
+        heapq.heappush(self._heap, (strategy.next_run, strategy.id))
+        self._wakeup.set()
+
+    def start_strategy(self, tickers, interval=30, room=None, owner=None):
+        """Register a live strategy; its first update runs on the next tick"""
+        strategy = LiveStrategy(tickers, interval, room=room, owner=owner)
+        with self._lock:
+            self._strategies[strategy.id] = strategy
+            self._schedule(strategy, delay=0)
+        self._ensure_thread()
+        logger.info(f"Started strategy {strategy.id} for {tickers} every {interval}s")
+        return strategy
+
+    def stop_strategy(self, strategy_id):
+        """Remove a strategy; returns it, or None if unknown"""
+        with self._lock:
+            strategy = self._strategies.pop(strategy_id, None)
+            if strategy is None:
+                return None
+            strategy.active = False
+            if not any(s.key == strategy.key for s in self._strategies.values()):
+                self._states.pop(strategy.key, None)
+        logger.info(f"Stopped strategy {strategy_id}")
+        return strategy
+
+    def stop(self, owner=None):
+        """Stop every strategy, or every strategy of one owner; returns the stopped ids"""
+        stopped = [strategy.id for strategy in self.list_strategies(owner=owner)]
+        for strategy_id in stopped:
+            self.stop_strategy(strategy_id)
+        return stopped
+
+    def get(self, strategy_id):
+        with self._lock:
+            return self._strategies.get(strategy_id)
+
+    def list_strategies(self, owner=None):
+        with self._lock:
+            return [s for s in self._strategies.values() if owner is None or s.owner == owner]
+
+    def active_count(self):
+        with self._lock:
+            return len(self._strategies)
+
+    def _pop_due(self):
+        """Pop every strategy whose next run has arrived, or return the wait time"""
+        now = time.time()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                run_at, strategy_id = heapq.heappop(self._heap)
+                strategy = self._strategies.get(strategy_id)
+                # Skip stale heap entries for stopped or rescheduled strategies
+                if strategy is not None and strategy.next_run == run_at:
+                    due.append(strategy)
+            wait = self._heap[0][0] - now if self._heap else None
+        return due, wait
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            due, wait = self._pop_due()
+            if due:
+                self._run_tick(due)
+                continue
+            self._wakeup.clear()
+            self._wakeup.wait(timeout=min(wait, 60) if wait is not None else 60)
+
+    def _refresh_states(self, due):
+        """One seed download and one tail download cover every due ticker set"""
+        with self._lock:
+            keys = {s.key for s in due}
+            missing = [key for key in keys if key not in self._states]
+            existing = [key for key in keys if key in self._states]
+
+        failed = set()
+        if missing:
+            union = sorted({ticker for key in missing for ticker in key})
+            try:
+                closes = self.analyzer.get_price_history(union)
+                for key in missing:
+                    try:
+                        state = StreamingMoments(closes.reindex(columns=list(key)))
+                        with self._lock:
+                            self._states[key] = state
+                    except Exception as e:
+                        logger.error(f"Error seeding state for {list(key)}: {str(e)}")
+                        failed.add(key)
+            except Exception as e:
+                logger.error(f"Error fetching history for new strategies: {str(e)}")
+                failed.update(missing)
+
+        if existing:
+            with self._lock:
+                states = {key: self._states[key] for key in existing if key in self._states}
+            if states:
+                union = sorted({ticker for key in states for ticker in key})
+                start = min(state.last_date for state in states.values()) - timedelta(days=5)
+                try:
+                    closes = self.analyzer.get_price_history(union, start=start.strftime('%Y-%m-%d'))
+                    for key, state in states.items():
+                        state.update(closes.reindex(columns=state.columns))
+                except Exception as e:
+                    logger.error(f"Error fetching tail bars: {str(e)}")
+                    failed.update(states)
+
+        return failed
+
+    def _solve(self, strategy, state):
+        moments = state.moments()
+        strategy.weights = self.analyzer.execute_trade(
+            state.returns,
+            moments=moments if self.analyzer.optimizer_mode == 'moments' else None,
+            previous_weights=strategy.weights
+        )
+        strategy.volatility_ratio = realized_volatility_ratio(state.returns.iloc[-1], strategy.weights,
+                                                              moments[1])
+        strategy.last_run = time.time()
+        result = {
+            'strategy_id': strategy.id,
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'strategies': [
+                {
+                    'name': name,
+                    'weights': {ticker: float(w) for ticker, w in zip(state.columns, weights)}
+                }
+                for name, weights in zip(STRATEGY_NAMES, strategy.weights)
+            ]
+        }
+        if self.emit is not None:
+            self.emit('strategy_update', result, to=strategy.room, namespace='/')
+        strategy.last_update = result['timestamp']
+
+    def _handle_error(self, strategy, error):
+        strategy.consecutive_errors += 1
+        logger.error(f"Error in strategy {strategy.id} "
+                     f"({strategy.consecutive_errors}/{self.max_consecutive_errors}): {error}")
+        if strategy.consecutive_errors >= self.max_consecutive_errors:
+            logger.error(f"Too many consecutive errors, stopping strategy {strategy.id}")
+            self.stop_strategy(strategy.id)
+            return False
+        return True
+
+    def _run_tick(self, due):
+        failed = self._refresh_states(due)
+
+        futures = {}
+        for strategy in due:
+            with self._lock:
+                state = self._states.get(strategy.key)
+            if strategy.key in failed or state is None:
+                futures[strategy] = None
+                continue
+            futures[strategy] = self._executor.submit(self._solve, strategy, state)
+
+        for strategy, future in futures.items():
+            try:
+                if future is None:
+                    raise RuntimeError("Market data unavailable")
+                future.result()
+                strategy.consecutive_errors = 0
+                delay = None
+            except Exception as e:
+                if not self._handle_error(strategy, str(e)):
+                    continue
+                # Exponential backoff on errors
+                delay = min(10 * (2 ** strategy.consecutive_errors), 300)
+
+            with self._lock:
+                if strategy.active:
+                    self._schedule(strategy, delay)
+
+    def shutdown(self):
+        """Stop the scheduler thread and worker pool"""
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,46 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Backend modules import each other from the backend root (utils.x, services.x)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Keep tests offline, without background threads, and away from the real database and price store
+_scratch = tempfile.mkdtemp(prefix='backend-tests-')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_scratch, 'app.db')}")
+os.environ.setdefault('PRICE_STORE_PATH', os.path.join(_scratch, 'price_store.db'))
+os.environ['MARKET_DATA_PROVIDER'] = 'replay'
+os.environ['BACKGROUND_SERVICES'] = 'false'
+os.environ.setdefault('REPLAY_DATA_PATH', os.path.join(_scratch, 'replay'))
+os.environ.setdefault('REPLAY_END', '2024-12-31')
+
+
+@pytest.fixture
+def wrapper(tmp_path, monkeypatch):
+    """YFinanceWrapper over a recording replay provider, with its own cache, limiter and store"""
+    from utils import yfinance_utils
+    from utils.cache_manager import CacheManager
+    from utils.data_providers import ReplayProvider
+    from utils.market_data import MarketDataGateway
+    from utils.price_store import PriceStore
+    from utils.rate_limiter import RateLimiter
+
+    class RecordingProvider(ReplayProvider):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.downloads = []
+
+        def download(self, tickers, **kwargs):
+            self.downloads.append(([tickers] if isinstance(tickers, str) else list(tickers), kwargs))
+            return super().download(tickers, **kwargs)
+
+    cache = CacheManager()
+    monkeypatch.setattr(yfinance_utils, 'cache', cache)
+    wrapper = yfinance_utils.YFinanceWrapper()
+    wrapper.provider = RecordingProvider(str(tmp_path / 'replay'), synthetic_end='2024-12-31')
+    wrapper.gateway = MarketDataGateway(limiter=RateLimiter(1000, 1), cache=cache, provider=wrapper.provider)
+    wrapper.price_store = PriceStore(str(tmp_path / 'bars.db'))
+    wrapper.cache = cache
+    return wrapper
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def analyzer():
+    from app_portfolio import PortfolioAnalyzer
+    analyzer = PortfolioAnalyzer()
+    analyzer.get_market_conditions = lambda: {'regime': 'neutral'}
+    solves = []
+    execute_trade = analyzer.execute_trade
+
+    def counting_execute_trade(data, *args, **kwargs):
+        solves.append(list(data.columns))
+        return execute_trade(data, *args, **kwargs)
+
+    analyzer.execute_trade = counting_execute_trade
+    analyzer.solves = solves
+    return analyzer
+
+
+@pytest.fixture
+def returns():
+    rng = np.random.default_rng(6)
+    dates = pd.bdate_range('2023-01-02', periods=250)
+    return pd.DataFrame(rng.normal(0.0004, 0.01, size=(250, 3)), index=dates, columns=['AAA', 'BBB', 'CCC'])
+
+
+def test_same_tickers_and_bar_hit_the_cache(analyzer, returns):
+    first = analyzer.build_analysis(['AAA', 'BBB', 'CCC'], returns)
+    # Any ordering of the same tickers shares the entry
+    second = analyzer.build_analysis(['CCC', 'AAA', 'BBB'], returns[['CCC', 'AAA', 'BBB']])
+
+    assert len(analyzer.solves) == 1
+    assert second['metadata']['cached'] is True
+    assert 'cached' not in first['metadata']
+    assert second['metadata']['tickers'] == ['CCC', 'AAA', 'BBB']
+    assert second['strategies'][0]['metrics'] == first['strategies'][0]['metrics']
+
+
+def test_new_or_revised_bar_recomputes_and_replaces_entry(analyzer, returns):
+    analyzer.build_analysis(['AAA', 'BBB', 'CCC'], returns)
+    revised = returns.copy()
+    revised.iloc[-1] += 0.001
+    result = analyzer.build_analysis(['AAA', 'BBB', 'CCC'], revised)
+
+    assert len(analyzer.solves) == 2
+    assert 'cached' not in result['metadata']
+    # The entry for the superseded bar is dropped
+    assert len(analyzer._analysis_cache) == 1
+
+
+def test_cached_copy_is_not_mutated_by_callers(analyzer, returns):
+    first = analyzer.build_analysis(['AAA', 'BBB', 'CCC'], returns)
+    first['insights'] = {'added': True}
+    second = analyzer.build_analysis(['AAA', 'BBB', 'CCC'], returns)
+    assert 'insights' not in second
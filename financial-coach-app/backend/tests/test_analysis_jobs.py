@@ -0,0 +1,136 @@
+import threading
+
+import pytest
+
+from services.analysis_jobs import AnalysisJobManager
+
+
+class StubAnalyzer:
+    def __init__(self, gate=None, fail=False):
+        self.gate = gate
+        self.fail = fail
+
+    def get_current_market_data(self, tickers):
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.fail:
+            raise ValueError('no data')
+        return {'tickers': tickers}
+
+    def get_market_conditions(self):
+        return {'regime': 'neutral'}
+
+    def build_analysis(self, tickers, data, market_conditions, **options):
+        return {'tickers': tickers, 'options': options}
+
+
+@pytest.fixture
+def events():
+    received = []
+
+    def emit(event, payload, to=None, namespace=None):
+        received.append((event, payload['stage'], to))
+
+    return received, emit
+
+
+def test_job_reports_progress_and_result(events):
+    received, emit = events
+    manager = AnalysisJobManager(StubAnalyzer(), emit=emit)
+    job = manager.submit(['AAA'], 'user-1', series_format='base64')
+    job.future.result(timeout=5)
+
+    assert job.status == 'done' and job.progress == 100
+    assert job.result == {'tickers': ['AAA'], 'options': {'series_format': 'base64'}}
+    assert [stage for _, stage, _ in received] == ['fetching_data', 'market_conditions', 'optimizing', 'done']
+    assert {to for _, _, to in received} == {job.room}
+    assert manager.get(job.id) is job
+    manager.shutdown()
+
+
+def test_failures_are_reported_not_raised(events):
+    received, emit = events
+    manager = AnalysisJobManager(StubAnalyzer(fail=True), emit=emit)
+    job = manager.submit(['AAA'], 'user-1')
+    job.future.result(timeout=5)
+
+    assert job.status == 'failed' and job.error == 'no data'
+    assert received[-1][0] == 'analysis_done'
+    manager.shutdown()
+
+
+def test_per_user_limit_and_cancellation():
+    gate = threading.Event()
+    manager = AnalysisJobManager(StubAnalyzer(gate=gate), per_user_limit=1, max_workers=1)
+    running = manager.submit(['AAA'], 'user-1')
+    with pytest.raises(RuntimeError):
+        manager.submit(['BBB'], 'user-1')
+    # Another user is queued behind the single worker
+    queued = manager.submit(['CCC'], 'user-2')
+
+    assert manager.cancel(queued.id).status == 'cancelled'
+    manager.cancel(running.id)
+    gate.set()
+    running.future.result(timeout=5)
+    assert running.status == 'cancelled' and running.result is None
+    manager.shutdown()
+
+
+def test_jobs_are_only_visible_to_their_owner():
+    gate = threading.Event()
+    manager = AnalysisJobManager(StubAnalyzer(gate=gate))
+    job = manager.submit(['AAA'], 'user-1')
+
+    assert manager.get(job.id, owner='user-2') is None
+    assert manager.cancel(job.id, owner='user-2') is None
+    assert not job.cancel_event.is_set()
+    assert manager.get(job.id, owner='user-1') is job
+    gate.set()
+    job.future.result(timeout=5)
+    manager.shutdown()
+
+
+@pytest.fixture
+def app_jobs(monkeypatch):
+    import app_portfolio
+    gate = threading.Event()
+    manager = AnalysisJobManager(StubAnalyzer(gate=gate), emit=app_portfolio.socketio.emit, per_user_limit=1)
+    monkeypatch.setattr(app_portfolio, 'analysis_jobs', manager)
+    yield app_portfolio, gate
+    gate.set()
+    manager.shutdown()
+
+
+def test_routes_scope_jobs_to_the_server_issued_caller(app_jobs):
+    app_portfolio, gate = app_jobs
+    alice, bob = app_portfolio.app.test_client(), app_portfolio.app.test_client()
+    submitted = alice.post('/api/analysis/jobs', json={'tickers': ['AAA'], 'user_id': 'a'})
+    assert submitted.status_code == 202
+    job_id = submitted.get_json()['data']['job_id']
+
+    # A different user_id in the body is still the same caller
+    assert alice.post('/api/analysis/jobs', json={'tickers': ['BBB'], 'user_id': 'b'}).status_code == 429
+    assert bob.get(f'/api/analysis/jobs/{job_id}').status_code == 404
+    assert bob.delete(f'/api/analysis/jobs/{job_id}').status_code == 404
+    assert alice.get(f'/api/analysis/jobs/{job_id}').status_code == 200
+
+
+def test_only_the_owner_can_join_a_job_room(app_jobs):
+    app_portfolio, gate = app_jobs
+    alice, bob = app_portfolio.app.test_client(), app_portfolio.app.test_client()
+    job_id = alice.post('/api/analysis/jobs', json={'tickers': ['AAA']}).get_json()['data']['job_id']
+    sockets = {name: app_portfolio.socketio.test_client(app_portfolio.app, flask_test_client=client)
+               for name, client in (('alice', alice), ('bob', bob))}
+
+    for socket in sockets.values():
+        socket.get_received()
+        socket.emit('join_analysis', {'job_id': job_id})
+    assert [m['name'] for m in sockets['bob'].get_received()] == ['analysis_error']
+    assert [m['name'] for m in sockets['alice'].get_received()] == ['analysis_joined']
+
+    gate.set()
+    app_portfolio.analysis_jobs.get(job_id).future.result(timeout=5)
+    assert 'analysis_done' in [m['name'] for m in sockets['alice'].get_received()]
+    assert sockets['bob'].get_received() == []
+    for socket in sockets.values():
+        socket.disconnect()
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.backtest_service import BacktestService
+from utils.portfolio_optimizer import compute_moments
+
+
+@pytest.fixture
+def returns():
+    rng = np.random.default_rng(8)
+    dates = pd.bdate_range('2021-01-04', periods=600)
+    return pd.DataFrame(rng.normal(0.0004, 0.01, size=(600, 3)), index=dates, columns=['AAA', 'BBB', 'CCC'])
+
+
+@pytest.mark.parametrize('window', ['expanding', 'rolling'])
+def test_window_moments_match_direct_computation(returns, window):
+    service = BacktestService(window=window, lookback=60)
+    values = returns.to_numpy()
+    rebalance_idx = service._rebalance_indices(returns.index)
+
+    for end, (mu, cov) in zip(rebalance_idx, service._window_moments(values, rebalance_idx)):
+        start = end - 60 if window == 'rolling' else 0
+        expected_mu, expected_cov = compute_moments(values[start:end])
+        assert np.allclose(mu, expected_mu)
+        assert np.allclose(cov, expected_cov)
+
+
+def test_holdings_drift_between_rebalances(returns):
+    service = BacktestService(lookback=60)
+    values = returns.to_numpy()
+    rebalance_idx = np.array([100, 120])
+    weights = np.array([[0.5, 0.3, 0.2], [0.2, 0.3, 0.5]])
+    daily, turnover = service._simulate(values, rebalance_idx, weights)
+
+    # Buy and hold from each rebalance: value is the weighted growth of each asset
+    period = values[100:120]
+    value = np.cumprod(1 + period, axis=0) @ weights[0]
+    assert np.allclose(np.cumprod(1 + daily[:20]), value)
+    assert len(daily) == len(values) - 100
+    assert turnover[0] == 0.5 and turnover[1] > 0
+
+
+def test_costs_are_charged_on_turnover(returns):
+    free = BacktestService(lookback=60).run(returns, criteria=('hrp',))
+    costly = BacktestService(lookback=60, cost_bps=25).run(returns, criteria=('hrp',))
+    assert (costly['strategies'][0]['metrics']['total_return']
+            < free['strategies'][0]['metrics']['total_return'])
+
+
+def test_run_is_out_of_sample(returns):
+    result = BacktestService(lookback=252, rebalance='quarterly').run(returns)
+    first_rebalance = result['strategies'][0]['rebalances'][0]['date']
+    assert result['metadata']['out_of_sample_start'] == first_rebalance
+    assert pd.Timestamp(first_rebalance) >= returns.index[252]
+    for strategy in result['strategies']:
+        for rebalance in strategy['rebalances']:
+            assert sum(rebalance['weights'].values()) == pytest.approx(1.0, abs=1e-5)
+
+
+@pytest.mark.parametrize('kwargs', [{'window': 'sliding'}, {'rebalance': 'daily'}, {'lookback': 5}])
+def test_invalid_settings_are_rejected(kwargs):
+    with pytest.raises(ValueError):
+        BacktestService(**kwargs)
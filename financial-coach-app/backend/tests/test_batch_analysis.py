@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.price_panel import PricePanel
+
+
+@pytest.fixture
+def analyzer():
+    from app_portfolio import PortfolioAnalyzer
+    analyzer = PortfolioAnalyzer()
+    analyzer.get_market_conditions = lambda: {'regime': 'neutral'}
+    return analyzer
+
+
+@pytest.fixture
+def panel():
+    rng = np.random.default_rng(5)
+    dates = pd.bdate_range('2023-01-02', periods=300)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.01, size=(300, 4)), axis=0))
+    prices[:, 3] = np.nan  # a ticker Yahoo knows nothing about
+    return PricePanel(prices, dates, ['AAA', 'BBB', 'CCC', 'ZZZ'])
+
+
+def test_baskets_share_one_price_fetch(analyzer, panel):
+    requested = []
+
+    def get_price_panel(tickers, start=None):
+        requested.append(list(tickers))
+        return panel
+
+    analyzer.get_price_panel = get_price_panel
+    batch = analyzer.batch_analysis([['AAA', 'BBB'], ['CCC', 'AAA'], ['BBB', 'CCC']])
+
+    assert requested == [['AAA', 'BBB', 'CCC']]
+    assert batch['metadata']['unique_tickers'] == 3
+    results = batch['results']
+    assert [r['metadata']['tickers'] for r in results] == [['AAA', 'BBB'], ['CCC', 'AAA'], ['BBB', 'CCC']]
+    for result in results:
+        assert 'error' not in result
+        allocation = result['strategies'][0]['ticker_allocation']
+        assert sum(allocation.values()) == pytest.approx(1.0)
+
+
+def test_basket_with_a_ticker_without_data_fails_alone(analyzer, panel):
+    analyzer.get_price_panel = lambda tickers, start=None: panel
+    results = analyzer.batch_analysis([['AAA', 'ZZZ'], ['AAA', 'BBB']])['results']
+
+    assert results[0]['error'] == 'No data retrieved for ZZZ'
+    assert results[0]['strategies'] == []
+    assert 'error' not in results[1]
@@ -0,0 +1,216 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.cache_manager import CacheManager, estimate_size, parse_quotas
+
+
+class Loader:
+    """Counts calls and blocks until released, so tests control overlap"""
+    def __init__(self, value='value', error=None):
+        self.value = value
+        self.error = error
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+def run_concurrently(target, count):
+    results = [None] * count
+    errors = [None] * count
+
+    def worker(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def wait_for_waiters(cache, count):
+    deadline = time.time() + 5
+    while cache.coalesced < count and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_concurrent_misses_share_one_load():
+    cache = CacheManager()
+    loader = Loader()
+    threads, results, _ = run_concurrently(lambda: cache.get_or_load('quote:AAA', loader, ttl=60), 8)
+    wait_for_waiters(cache, 7)
+    loader.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert loader.calls == 1 and cache.coalesced == 7
+    assert results == ['value'] * 8
+    assert cache.get('quote:AAA') == 'value'
+
+
+def test_waiters_share_the_leaders_exception_and_nothing_is_cached():
+    cache = CacheManager()
+    loader = Loader(error=RuntimeError('upstream down'))
+    threads, _, errors = run_concurrently(lambda: cache.get_or_load('quote:AAA', loader, ttl=60), 4)
+    wait_for_waiters(cache, 3)
+    loader.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert loader.calls == 1
+    assert all(isinstance(error, RuntimeError) for error in errors)
+    assert cache.get('quote:AAA') is None
+
+
+def test_none_results_are_not_cached():
+    cache = CacheManager()
+    calls = []
+    for _ in range(2):
+        cache.get_or_load('quote:AAA', lambda: calls.append(1), ttl=60)
+    assert len(calls) == 2
+
+
+def test_reentrant_load_of_the_same_key_does_not_deadlock():
+    cache = CacheManager()
+
+    def loader():
+        return cache.get_or_load('panel:AAA', lambda: 'inner', ttl=60) + '+outer'
+
+    assert cache.get_or_load('panel:AAA', loader, ttl=60) == 'inner+outer'
+
+
+def test_zero_ttl_stores_nothing():
+    cache = CacheManager()
+    assert cache.get_or_load('download:AAA', lambda: 'bars', ttl=0) == 'bars'
+    assert cache.get('download:AAA') is None and cache.stats()['entries'] == 0
+
+
+def make_stale(cache, key):
+    value, expiry, fresh_until, size = cache._cache[key]
+    cache._cache[key] = (value, expiry, time.time() - 1, size)
+
+
+def test_stale_value_is_served_while_one_refresh_runs():
+    cache = CacheManager()
+    cache.set('index:^GSPC', 'old', ttl=60, hard_ttl=600)
+    make_stale(cache, 'index:^GSPC')
+    loader = Loader(value='new')
+
+    assert cache.get_or_load('index:^GSPC', loader, ttl=60, hard_ttl=600) == 'old'
+    assert cache.get_or_load('index:^GSPC', loader, ttl=60, hard_ttl=600) == 'old'
+    assert loader.started.wait(5)
+    loader.release.set()
+    deadline = time.time() + 5
+    while cache.get('index:^GSPC') != 'new' and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert cache.get('index:^GSPC') == 'new'
+    assert loader.calls == 1 and cache.stale_hits == 2
+
+
+def test_failed_refresh_keeps_serving_the_stale_value():
+    cache = CacheManager()
+    cache.set('index:^GSPC', 'old', ttl=60, hard_ttl=600)
+    make_stale(cache, 'index:^GSPC')
+    loader = Loader(error=RuntimeError('upstream down'))
+    loader.release.set()
+
+    assert cache.get_or_load('index:^GSPC', loader, ttl=60, hard_ttl=600) == 'old'
+    deadline = time.time() + 5
+    while 'index:^GSPC' in cache._inflight and time.time() < deadline:
+        time.sleep(0.01)
+    assert cache.get('index:^GSPC') == 'old'
+
+
+def test_callers_that_persist_results_never_get_stale_values():
+    cache = CacheManager()
+    cache.set('md:download:AAA', 'old', ttl=60, hard_ttl=600)
+    make_stale(cache, 'md:download:AAA')
+    assert cache.get_or_load('md:download:AAA', lambda: 'new', ttl=60, hard_ttl=600, allow_stale=False) == 'new'
+
+
+def test_values_past_the_hard_ttl_are_gone():
+    cache = CacheManager()
+    cache.set('index:^GSPC', 'old', ttl=60, hard_ttl=600)
+    value, _, _, size = cache._cache['index:^GSPC']
+    cache._cache['index:^GSPC'] = (value, time.time() - 1, time.time() - 2, size)
+    assert cache.get('index:^GSPC') is None
+    assert cache.stats()['entries'] == 0 and cache.stats()['bytes'] == 0
+
+
+def blob(kilobytes):
+    return np.zeros(kilobytes * 1024, dtype=np.uint8)
+
+
+def test_max_entries_evicts_the_least_recently_used():
+    cache = CacheManager(max_entries=2)
+    cache.set('md:A', 1)
+    cache.set('md:B', 2)
+    assert cache.get('md:A') == 1  # A is now more recent than B
+    cache.set('md:C', 3)
+    assert cache.get('md:B') is None
+    assert cache.get('md:A') == 1 and cache.get('md:C') == 3
+    assert cache.evictions == 1
+
+
+def test_max_bytes_bounds_the_whole_cache():
+    cache = CacheManager(max_bytes=10 * 1024)
+    for name in 'ABC':
+        cache.set(f"md:{name}", blob(4))
+    stats = cache.stats()
+    assert stats['entries'] == 2 and stats['bytes'] <= 10 * 1024
+    assert cache.get('md:A') is None and cache.get('md:C') is not None
+
+
+def test_namespace_quota_only_evicts_within_the_namespace():
+    cache = CacheManager(quotas={'panel': 6 * 1024})
+    cache.set('quote:A', blob(4))
+    cache.set('panel:A', blob(4))
+    cache.set('panel:B', blob(4))
+    assert cache.get('panel:A') is None and cache.get('panel:B') is not None
+    assert cache.get('quote:A') is not None
+    assert cache.stats()['namespaces']['panel'] == {'bytes': 4 * 1024, 'quota': 6 * 1024}
+
+
+def test_values_larger_than_their_budget_are_not_cached():
+    cache = CacheManager(max_bytes=64 * 1024, quotas={'quote': 2 * 1024})
+    cache.set('quote:A', blob(4))
+    cache.set('md:A', blob(128))
+    assert cache.get('quote:A') is None and cache.get('md:A') is None
+    assert cache.rejected == 2 and cache.stats()['entries'] == 0
+
+
+def test_accounting_follows_replacement_deletion_and_expiry():
+    cache = CacheManager()
+    cache.set('md:A', blob(4))
+    cache.set('md:A', blob(2))
+    cache.set('md:B', blob(1), ttl=0.05)
+    assert cache.stats()['bytes'] == 3 * 1024
+    cache.delete('md:A')
+    time.sleep(0.1)
+    cache.cleanup()
+    stats = cache.stats()
+    assert stats['entries'] == 0 and stats['bytes'] == 0 and stats['namespaces'] == {}
+
+
+def test_estimate_size():
+    frame = pd.DataFrame(np.zeros((100, 4)))
+    assert estimate_size(frame) >= 100 * 4 * 8
+    assert estimate_size(np.zeros(1000, dtype=np.float32)) == 4000
+    nested = {'history': np.zeros(1000), 'meta': {'ticker': 'AAA'}}
+    assert estimate_size(nested) > 8000
+    assert parse_quotas('md=1, panel=0.5') == {'md': 1024 * 1024, 'panel': 512 * 1024}
@@ -0,0 +1,85 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.data_providers import ProviderError, ReplayProvider
+
+
+def test_synthetic_bars_are_deterministic_and_prefix_stable(tmp_path):
+    short = ReplayProvider(tmp_path, synthetic_start='2020-01-01', synthetic_end='2020-06-30')
+    long = ReplayProvider(tmp_path, synthetic_start='2020-01-01', synthetic_end='2021-06-30')
+    again = ReplayProvider(tmp_path, synthetic_start='2020-01-01', synthetic_end='2020-06-30')
+
+    bars = short.bars('AAA')
+    pd.testing.assert_frame_equal(bars, again.bars('AAA'))
+    pd.testing.assert_frame_equal(bars, long.bars('AAA').loc[:bars.index[-1]])
+    assert not bars['Close'].equals(short.bars('BBB')['Close'])
+    assert (bars['High'] >= bars[['Open', 'Close']].max(axis=1)).all()
+    assert (bars['Low'] <= bars[['Open', 'Close']].min(axis=1)).all()
+
+
+def test_download_matches_the_yfinance_layout(tmp_path):
+    provider = ReplayProvider(tmp_path, synthetic_end='2024-12-31')
+    data = provider.download(['BBB', 'AAA'], start='2024-06-03', end='2024-07-01')
+    assert data.columns.names == ['Price', 'Ticker']
+    assert list(data['Close'].columns) == ['BBB', 'AAA']
+    assert data.index[0] == pd.Timestamp('2024-06-03') and data.index[-1] < pd.Timestamp('2024-07-01')
+
+    week = provider.history('AAA', period='5d')
+    assert len(week) == 5 and week.index[-1] == pd.Timestamp('2024-12-31')
+    year = provider.history('AAA', period='1y')
+    assert year.index[0] >= pd.Timestamp('2023-12-31')
+    with pytest.raises(ProviderError):
+        provider.history('AAA', period='fortnight')
+
+
+def run_calls(provider, order):
+    outcomes = {}
+
+    def call(ticker):
+        try:
+            provider.history(ticker, period='5d')
+            outcomes.setdefault(ticker, []).append(True)
+        except ProviderError:
+            outcomes.setdefault(ticker, []).append(False)
+
+    for ticker in order:
+        threads = [threading.Thread(target=call, args=(ticker,)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return {ticker: sorted(results) for ticker, results in outcomes.items()}, provider.injected_errors
+
+
+def test_fault_injection_does_not_depend_on_call_order(tmp_path):
+    tickers = [f"T{i}" for i in range(12)]
+    first = run_calls(ReplayProvider(tmp_path, error_rate=0.4, seed=7, synthetic_end='2024-12-31'), tickers)
+    second = run_calls(ReplayProvider(tmp_path, error_rate=0.4, seed=7, synthetic_end='2024-12-31'),
+                       list(reversed(tickers)))
+    assert first == second
+    assert 0 < first[1] < 36
+
+
+def test_full_error_rate_always_fails(tmp_path):
+    provider = ReplayProvider(tmp_path, error_rate=1.0)
+    with pytest.raises(ProviderError):
+        provider.download(['AAA'], period='5d')
+    assert provider.calls == 1 and provider.injected_errors == 1
+
+
+def test_recorded_files_take_precedence(tmp_path):
+    dates = pd.bdate_range('2024-01-01', periods=3, name='Date')
+    recorded = pd.DataFrame({'Open': [1.0, 2.0, 3.0], 'High': [1.5, 2.5, 3.5], 'Low': [0.5, 1.5, 2.5],
+                             'Close': [1.2, 2.2, 3.2], 'Volume': [100.0, 200.0, 300.0]}, index=dates)
+    (tmp_path / 'prices').mkdir()
+    recorded.to_csv(tmp_path / 'prices' / 'AAA.csv', index_label='Date')
+
+    provider = ReplayProvider(tmp_path, synthetic=False)
+    bars = provider.bars('aaa')
+    np.testing.assert_allclose(bars['Close'], [1.2, 2.2, 3.2])
+    assert provider.info('AAA')['currentPrice'] == pytest.approx(3.2)
+    assert provider.bars('ZZZ').empty
+    assert provider.news_sentiment('AAA')['feed'] == []
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from utils.portfolio_optimizer import compute_moments, efficient_frontier
+
+
+@pytest.fixture
+def moments():
+    rng = np.random.default_rng(2)
+    returns = rng.normal([0.0002, 0.0004, 0.0006, 0.0008], [0.006, 0.009, 0.012, 0.016], size=(750, 4))
+    return compute_moments(returns)
+
+
+def test_frontier_points_are_feasible_and_ordered(moments):
+    mu, cov = moments
+    frontier = efficient_frontier(mu, cov, n_points=15)
+
+    assert frontier['weights'].shape == (15, 4)
+    assert frontier['converged'].all()
+    assert np.allclose(frontier['weights'].sum(axis=1), 1.0)
+    assert (frontier['weights'] >= 0).all()
+    # Targets run from the minimum-variance to the maximum-return portfolio
+    assert np.all(np.diff(frontier['returns']) > -1e-10)
+    assert np.all(np.diff(frontier['volatility']) > -1e-8)
+
+
+def test_frontier_risk_matches_the_covariance(moments):
+    mu, cov = moments
+    frontier = efficient_frontier(mu, cov, n_points=5)
+    expected = np.sqrt(np.einsum('ki,ij,kj->k', frontier['weights'], cov, frontier['weights']))
+    assert np.allclose(frontier['volatility'], expected)
+    assert np.allclose(frontier['returns'], frontier['weights'] @ mu)
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from utils.portfolio_optimizer import (
+    FactorCovariance, project_capped_simplex, projected_gradient_solve, solve_weights,
+    mv_objective, sharpe_objective
+)
+
+
+@pytest.fixture
+def returns():
+    rng = np.random.default_rng(9)
+    factors = rng.normal(0, 0.01, size=(600, 3))
+    exposures = rng.normal(1, 0.4, size=(3, 40))
+    return 0.0004 + factors @ exposures + rng.normal(0, 0.005, size=(600, 40))
+
+
+def test_factor_products_match_the_dense_matrix(returns):
+    _, cov = FactorCovariance.from_returns(returns, n_factors=5)
+    dense = cov.loadings @ cov.loadings.T + np.diag(cov.specific_variance)
+    w = np.random.default_rng(1).uniform(size=40)
+
+    assert cov.shape == (40, 40)
+    assert np.allclose(cov @ w, dense @ w)
+    assert np.allclose(w @ cov, w @ dense)
+    assert np.allclose(cov.diagonal(), np.diag(dense))
+    items = [3, 7, 11]
+    assert np.allclose(cov.subset(items) @ w[items], dense[np.ix_(items, items)] @ w[items])
+
+
+def test_factor_model_keeps_total_variance(returns):
+    _, cov = FactorCovariance.from_returns(returns, n_factors=5)
+    assert np.allclose(cov.diagonal(), returns.var(axis=0))
+    assert (cov.specific_variance > 0).all()
+
+
+@pytest.mark.parametrize('upper', [1.0, 0.1])
+def test_capped_simplex_projection_is_feasible(upper):
+    v = np.random.default_rng(2).normal(size=40)
+    w = project_capped_simplex(v, 0.0, upper)
+    assert w.sum() == pytest.approx(1.0)
+    assert w.min() >= 0 and w.max() <= upper + 1e-12
+
+
+@pytest.mark.parametrize('criterion, objective', [('mv', mv_objective), ('sr', sharpe_objective)])
+def test_projected_gradient_matches_slsqp_on_the_same_model(returns, criterion, objective):
+    mu, cov = FactorCovariance.from_returns(returns, n_factors=5)
+    dense = cov.loadings @ cov.loadings.T + np.diag(cov.specific_variance)
+
+    structured = projected_gradient_solve(criterion, mu, cov)
+    reference = solve_weights(criterion, mu, dense, np.ones(40) / 40, lower=0.0, upper=1.0)
+
+    assert structured['feasible']
+    assert structured['weights'].sum() == pytest.approx(1.0)
+    assert objective(structured['weights'], mu, dense) <= reference['fun'] + 1e-6
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.portfolio_optimizer import FactorCovariance, compute_moments, hrp_weights, quasi_diagonal_order
+
+
+@pytest.fixture
+def returns():
+    rng = np.random.default_rng(15)
+    # Two blocks of correlated assets
+    blocks = rng.normal(0, 0.01, size=(750, 2))
+    noise = rng.normal(0, 0.004, size=(750, 6))
+    return np.repeat(blocks, 3, axis=1)[:, [0, 3, 1, 4, 2, 5]] + noise
+
+
+def test_weights_are_long_only_and_fully_invested(returns):
+    weights = hrp_weights(compute_moments(returns)[1])
+    assert weights.sum() == pytest.approx(1.0)
+    assert (weights > 0).all()
+    assert np.array_equal(hrp_weights(np.array([[0.04]])), np.ones(1))
+
+
+def test_correlated_assets_are_clustered_together(returns):
+    order = list(quasi_diagonal_order(compute_moments(returns)[1]))
+    assert set(order[:3]) in ({0, 2, 4}, {1, 3, 5})
+
+
+def test_uncorrelated_assets_get_inverse_variance_weights():
+    variances = np.array([0.01, 0.02, 0.04, 0.08])
+    weights = hrp_weights(np.diag(variances))
+    assert np.allclose(weights, (1 / variances) / (1 / variances).sum())
+
+
+def test_zero_covariance_splits_equally():
+    assert np.allclose(hrp_weights(np.zeros((4, 4))), 0.25)
+
+
+def test_factor_covariance_matches_the_dense_path(returns):
+    _, factor_cov = FactorCovariance.from_returns(np.tile(returns, 10), n_factors=3)
+    dense = factor_cov.loadings @ factor_cov.loadings.T + np.diag(factor_cov.specific_variance)
+
+    assert np.array_equal(quasi_diagonal_order(factor_cov), quasi_diagonal_order(dense))
+    assert np.allclose(hrp_weights(factor_cov), hrp_weights(dense))
+
+
+def test_large_universe_trade_uses_the_factor_model(monkeypatch):
+    from app_portfolio import PortfolioAnalyzer
+
+    analyzer = PortfolioAnalyzer()
+    seen = []
+
+    def recording_hrp_weights(cov):
+        seen.append(cov)
+        return hrp_weights(cov)
+
+    monkeypatch.setattr('app_portfolio.hrp_weights', recording_hrp_weights)
+    data = pd.DataFrame(np.random.default_rng(1).normal(0.0005, 0.01, size=(300, analyzer.large_universe_threshold + 5)))
+
+    weights = analyzer.execute_trade(data)
+    assert len(weights) == 3
+    assert isinstance(seen[0], FactorCovariance)
@@ -0,0 +1,100 @@
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+from utils.cache_manager import CacheManager
+from utils.data_providers import DataProvider
+from utils.market_data import MarketDataGateway, MarketDataRequest, TickerDemand
+from utils.rate_limiter import RateLimiter
+
+
+def test_equivalent_requests_share_one_key():
+    first = MarketDataRequest.build('download', ['msft', 'AAPL', ' aapl '], period='1y', progress=False)
+    second = MarketDataRequest.build('download', ('AAPL', 'MSFT'), period='1y', threads=False, end=None)
+
+    assert first == second and hash(first) == hash(second)
+    assert first.tickers == ('AAPL', 'MSFT')
+    assert first.key == 'md:download:AAPL,MSFT:period=1y'
+
+
+def test_typed_arguments_round_trip_while_the_key_is_canonical():
+    start = datetime(2024, 3, 1, 9, 30)
+    request = MarketDataRequest.build('download', 'AAPL', auto_adjust=False, start=start,
+                                      end=date(2024, 4, 1), interval='1d')
+
+    assert request.kwargs == {'auto_adjust': False, 'start': start, 'end': date(2024, 4, 1), 'interval': '1d'}
+    assert request.kwargs['auto_adjust'] is False
+    assert dict(request.params) == {'auto_adjust': 'False', 'start': '2024-03-01',
+                                    'end': '2024-04-01', 'interval': '1d'}
+    # Requests that differ only in time of day share an entry
+    later = MarketDataRequest.build('download', 'AAPL', auto_adjust=False, start=start.replace(hour=15),
+                                    end=date(2024, 4, 1), interval='1d')
+    assert later == request and later.key == request.key
+
+
+@pytest.mark.parametrize('kind, tickers', [('quote', 'AAPL'), ('download', []), ('download', ['  '])])
+def test_invalid_requests_are_rejected(kind, tickers):
+    with pytest.raises(ValueError):
+        MarketDataRequest.build(kind, tickers)
+
+
+class StubProvider(DataProvider):
+    name = 'stub'
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.calls = []
+
+    def download(self, tickers, **kwargs):
+        self.calls.append((tickers, kwargs))
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({'Close': [1.0, 2.0]})
+
+
+def gateway_for(provider):
+    return MarketDataGateway(limiter=RateLimiter(1000, 1), cache=CacheManager(), provider=provider)
+
+
+def test_gateway_forwards_typed_arguments_and_caches(frame):
+    provider = StubProvider([frame])
+    gateway = gateway_for(provider)
+    request = MarketDataRequest.build('download', ['MSFT', 'AAPL'], auto_adjust=False, period='5d')
+
+    assert gateway.fetch(request) is frame
+    assert gateway.fetch(MarketDataRequest.build('download', ['aapl', 'msft'], auto_adjust=False, period='5d')) is frame
+    assert provider.calls == [(['AAPL', 'MSFT'], {'auto_adjust': False, 'period': '5d'})]
+
+    metrics = gateway.metrics()
+    assert metrics['requests'] == 2 and metrics['upstream_calls'] == 1
+    assert metrics['cache_hit_ratio'] == 0.5 and metrics['provider'] == 'stub'
+
+
+def test_failed_and_empty_fetches_are_not_cached(frame):
+    provider = StubProvider([RuntimeError('timeout'), pd.DataFrame(), frame])
+    gateway = gateway_for(provider)
+    request = MarketDataRequest.build('download', 'AAPL', period='5d')
+
+    assert gateway.fetch(request).empty
+    assert gateway.fetch(request).empty
+    assert gateway.fetch(request) is frame
+    assert gateway.metrics()['upstream_errors'] == 1
+    assert len(provider.calls) == 3
+
+
+def test_ticker_demand_decays_older_requests():
+    demand = TickerDemand(half_life=10)
+    for _ in range(3):
+        demand.record(['AAA', 'aaa'], now=0)  # duplicates within one request count once
+    for _ in range(2):
+        demand.record('BBB', now=20)
+
+    assert demand.top(2, now=20) == ['BBB', 'AAA']  # 2 against 3 / 4
+    assert demand.top(2, now=40) == ['BBB']         # AAA has decayed below the floor
@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+
+from services.market_regime_service import MarketRegimeService, score_market
+
+
+def closes(start, end, vix):
+    return {
+        '^GSPC': pd.Series([start, end]),
+        '^DJI': pd.Series([start, end]),
+        '^IXIC': pd.Series([start, end]),
+        '^VIX': pd.Series([vix, vix])
+    }
+
+
+def test_rising_indices_and_calm_vix_score_bullish():
+    regime = score_market(closes(100, 110, 12))
+    assert regime['condition'] == 'bull' and regime['description'] == 'Strong Bullish'
+    assert regime['volatility'] == 'low' and regime['vix_level'] == 12
+
+
+def test_falling_indices_and_high_vix_score_bearish():
+    regime = score_market(closes(100, 90, 35))
+    assert regime['condition'] == 'bear' and regime['score'] == -2
+    assert regime['volatility'] == 'high'
+
+
+def test_no_indicators_is_neutral():
+    assert score_market({})['description'] == 'Unable to determine'
+
+
+class CountingService(MarketRegimeService):
+    def __init__(self, results, **kwargs):
+        super().__init__(**kwargs)
+        self.results = list(results)
+        self.fetches = 0
+
+    def _fetch_closes(self):
+        self.fetches += 1
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def test_snapshot_is_served_from_memory_until_stale():
+    service = CountingService([closes(100, 110, 12), closes(100, 90, 35)], refresh_interval=300)
+    first = service.snapshot()
+    first['condition'] = 'mutated'
+    assert service.snapshot()['condition'] == 'bull'
+    assert service.fetches == 1
+
+    service._published_at -= 301
+    assert service.snapshot()['condition'] == 'bear'
+    assert service.fetches == 2
+
+
+def test_failed_refresh_keeps_the_last_good_regime():
+    service = CountingService([closes(100, 110, 12), ValueError('offline')])
+    service.refresh()
+    assert service.refresh()['condition'] == 'bull'
+
+
+def test_first_refresh_failure_publishes_a_neutral_error():
+    service = CountingService([ValueError('offline')])
+    regime = service.snapshot()
+    assert regime['condition'] == 'neutral' and regime['error'] == 'offline'
@@ -0,0 +1,82 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from services.monte_carlo_service import MonteCarloService
+
+
+@pytest.fixture
+def returns():
+    return np.random.default_rng(13).normal(0.0004, 0.01, size=(1000, 3))
+
+
+WEIGHTS = [0.5, 0.3, 0.2]
+
+
+@pytest.mark.parametrize('method', ['moments', 'bootstrap'])
+def test_seeded_runs_are_reproducible(returns, method):
+    run = lambda: MonteCarloService(n_paths=2000, years=2, method=method, seed=3).simulate(returns, WEIGHTS)
+    first, second = run(), run()
+    assert first['bands'] == second['bands']
+    assert first['terminal']['mean'] == second['terminal']['mean']
+
+
+@pytest.mark.parametrize('method', ['moments', 'bootstrap'])
+def test_bands_cover_the_horizon_in_percentile_order(returns, method):
+    result = MonteCarloService(n_paths=4000, years=3, method=method, seed=1).simulate(returns, WEIGHTS, 1000)
+    percentiles = result['bands']['percentiles']
+
+    assert len(result['bands']['years']) == 36 and result['bands']['years'][-1] == 3
+    for low, high in zip(['p5', 'p25', 'p50', 'p75'], ['p25', 'p50', 'p75', 'p95']):
+        assert all(a <= b for a, b in zip(percentiles[low], percentiles[high]))
+    assert 0 <= result['probability_of_loss'] <= 1
+    assert sum(result['terminal']['histogram']['counts']) == 4000
+
+
+def test_moments_method_matches_the_expected_growth(returns):
+    portfolio = returns @ np.array(WEIGHTS)
+    result = MonteCarloService(n_paths=50000, years=1, seed=0).simulate(returns, WEIGHTS)
+    expected = (1 + portfolio.mean()) ** 252
+    assert result['terminal']['mean'] == pytest.approx(expected, rel=0.01)
+
+
+@pytest.mark.parametrize('method', ['moments', 'bootstrap'])
+def test_simulation_peak_memory_fits_the_budget(returns, method):
+    service = MonteCarloService(n_paths=20000, years=30, method=method, seed=0, memory_budget_mb=8)
+    tracemalloc.start()
+    try:
+        result = service.simulate(returns, WEIGHTS)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak <= service.memory_budget
+    assert result['metadata']['checkpoint_block'] < 360
+    assert len(result['bands']['percentiles']['p50']) == 360
+
+
+def test_the_advertised_projection_range_fits_the_default_budget():
+    for method in ('moments', 'bootstrap'):
+        assert MonteCarloService(n_paths=100000, years=30, method=method).max_paths() >= 100000
+
+
+def test_block_size_does_not_change_the_distribution(returns):
+    whole = MonteCarloService(n_paths=20000, years=5, seed=0).simulate(returns, WEIGHTS)
+    blocked = MonteCarloService(n_paths=20000, years=5, seed=0, memory_budget_mb=2).simulate(returns, WEIGHTS)
+    assert blocked['metadata']['checkpoint_block'] < whole['metadata']['checkpoint_block']
+    assert np.allclose(blocked['bands']['percentiles']['p50'], whole['bands']['percentiles']['p50'], rtol=0.02)
+
+
+def test_path_counts_beyond_the_budget_are_rejected():
+    with pytest.raises(ValueError, match='use at most'):
+        MonteCarloService(n_paths=100000, years=30, memory_budget_mb=2)
+    assert MonteCarloService(n_paths=1000, years=30, memory_budget_mb=2).max_paths() >= 1000
+
+
+def test_invalid_settings_are_rejected():
+    with pytest.raises(ValueError):
+        MonteCarloService(method='garch')
+    with pytest.raises(ValueError):
+        MonteCarloService(checkpoints_per_year=5)
+    with pytest.raises(ValueError):
+        MonteCarloService(n_paths=1000, years=1).simulate(np.ones((1, 2)), [0.5, 0.5])
@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.portfolio_optimizer import compute_moments, multi_start_solve, seeded_starts
+
+
+@pytest.fixture
+def moments():
+    rng = np.random.default_rng(4)
+    return compute_moments(rng.normal(0.0005, 0.01, size=(400, 5)))
+
+
+def test_seeded_starts_are_deterministic():
+    first, second = seeded_starts(5, 4, seed=7), seeded_starts(5, 4, seed=7)
+    assert np.allclose(first[0], np.full(5, 0.2))
+    assert all(np.array_equal(a, b) for a, b in zip(first, second))
+    assert all(np.isclose(start.sum(), 1.0) for start in first)
+
+
+@pytest.mark.parametrize('criterion', ['mv', 'sr'])
+def test_parallel_and_sequential_runs_agree(moments, criterion):
+    mu, cov = moments
+    sequential, stats = multi_start_solve(criterion, mu, cov, n_starts=4, seed=1)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        parallel, _ = multi_start_solve(criterion, mu, cov, n_starts=4, seed=1, executor=executor)
+
+    assert np.allclose(sequential, parallel)
+    assert stats['starts'] == 4 and stats['feasible'] >= 1
+    assert stats['best_objective'] == stats['objectives'][stats['best_start']]
+    assert np.isclose(sequential.sum(), 1.0)
+
+
+def test_failing_executor_falls_back_to_sequential(moments):
+    class BrokenExecutor:
+        def submit(self, *args, **kwargs):
+            raise RuntimeError('pool is gone')
+
+    mu, cov = moments
+    weights, stats = multi_start_solve('mv', mu, cov, n_starts=2, executor=BrokenExecutor())
+    assert weights is not None and stats['starts'] == 2
+
+
+def test_process_pool_spawns_its_workers(moments):
+    from utils.async_handler import get_process_executor
+    executor = get_process_executor()
+    assert executor._mp_context.get_start_method() == 'spawn'
+
+    mu, cov = moments
+    weights, stats = multi_start_solve('sr', mu, cov, n_starts=2, seed=1, executor=executor)
+    assert stats['feasible'] == 2 and weights.sum() == pytest.approx(1)
+
+
+def test_solver_stats_are_returned_per_analysis(monkeypatch):
+    import app_portfolio
+    analyzer = app_portfolio.PortfolioAnalyzer()
+    analyzer.n_starts = 3
+    monkeypatch.setattr(app_portfolio, 'get_process_executor', lambda: ThreadPoolExecutor(max_workers=2))
+    rng = np.random.default_rng(5)
+    data = pd.DataFrame(rng.normal(0.0004, 0.01, size=(300, 4)), columns=['AAA', 'BBB', 'CCC', 'DDD'],
+                        index=pd.bdate_range('2023-01-02', periods=300))
+
+    stats = analyzer.build_analysis(['AAA', 'BBB', 'CCC', 'DDD'], data, {'regime': 'neutral'})['metadata']['solver_stats']
+    assert set(stats) == {'mv', 'sr', 'hrp'}
+    assert stats['mv']['starts'] == 3 and stats['hrp']['solver'] == 'hierarchical_risk_parity'
+    assert not hasattr(analyzer, 'last_solver_stats')
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from scipy.optimize import check_grad
+
+from utils.portfolio_optimizer import (
+    compute_moments, mv_objective, mv_gradient, sharpe_objective, sharpe_gradient
+)
+
+
+@pytest.fixture
+def returns():
+    rng = np.random.default_rng(0)
+    return rng.normal(0.0005, 0.01, size=(500, 6))
+
+
+@pytest.fixture
+def weights():
+    w = np.random.default_rng(1).uniform(0.05, 1.0, 6)
+    return w / w.sum()
+
+
+def test_compute_moments_uses_population_covariance(returns):
+    mu, cov = compute_moments(returns)
+    assert np.allclose(mu, returns.mean(axis=0))
+    assert np.allclose(cov, np.cov(returns, rowvar=False, ddof=0))
+
+
+def test_objectives_match_full_history_evaluation(returns, weights):
+    mu, cov = compute_moments(returns)
+    portfolio = returns @ weights
+    assert sharpe_objective(weights, mu, cov) == pytest.approx(-portfolio.mean() / portfolio.std())
+
+    from app_portfolio import PortfolioAnalyzer
+    analyzer = PortfolioAnalyzer()
+    assert mv_objective(weights, mu, cov) == pytest.approx(analyzer.mv_Criterion(weights, returns))
+
+
+@pytest.mark.parametrize('objective, gradient', [
+    (mv_objective, mv_gradient),
+    (sharpe_objective, sharpe_gradient),
+])
+def test_analytic_gradients_match_finite_differences(returns, weights, objective, gradient):
+    mu, cov = compute_moments(returns)
+    error = check_grad(objective, gradient, weights, mu, cov, epsilon=1e-7)
+    assert error < 1e-5 * max(1.0, np.linalg.norm(gradient(weights, mu, cov)))
+
+
+def test_sharpe_gradient_is_zero_for_degenerate_variance():
+    mu, cov = np.array([0.01, 0.02]), np.zeros((2, 2))
+    assert np.array_equal(sharpe_gradient(np.array([0.5, 0.5]), mu, cov), np.zeros(2))
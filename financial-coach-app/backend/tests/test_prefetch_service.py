@@ -0,0 +1,81 @@
+import time
+
+from services.prefetch_service import PrefetchService
+from utils.rate_limiter import RateLimiter
+
+
+class RecordingLimiter(RateLimiter):
+    def __init__(self):
+        super().__init__(max_calls=1000, period=1)
+        self.reserves = []
+
+    def acquire(self, reserve=0):
+        self.reserves.append(reserve)
+        super().acquire(reserve)
+
+
+def test_targets_are_seeds_then_hot_tickers_without_duplicates(wrapper):
+    wrapper.demand.record(['nvda', 'AAPL'])
+
+    def broken_source():
+        raise RuntimeError('database down')
+
+    service = PrefetchService(seed_sources=[lambda: ['^GSPC', 'aapl '], broken_source], wrapper=wrapper)
+    tickers, hot = service.targets()
+    assert tickers[:2] == ['^GSPC', 'AAPL'] and set(tickers) == {'^GSPC', 'AAPL', 'NVDA'}
+    assert set(hot) == {'NVDA', 'AAPL'}
+
+
+def test_pass_warms_quotes_and_store_with_the_reserve_on_every_call(wrapper):
+    limiter = RecordingLimiter()
+    gateway_limiter = RecordingLimiter()
+    wrapper.gateway.limiter = gateway_limiter
+    service = PrefetchService(seed_sources=[lambda: ['AAA', 'BBB', 'CCC']], wrapper=wrapper,
+                              limiter=limiter, batch_size=2, reserve=1)
+    service.run_once()
+
+    # Per batch: one quote download and one full-history store fetch, each
+    # taking its slot from the prefetch limiter instead of the gateway's
+    assert len(wrapper.provider.downloads) == 4
+    assert limiter.reserves == [1, 1, 1, 1]
+    assert gateway_limiter.reserves == []
+    assert set(wrapper.price_store.coverage(['AAA', 'BBB', 'CCC'])) == {'AAA', 'BBB', 'CCC'}
+    assert wrapper.cache.get('quote:CCC') is not None
+    # Warming is not demand
+    assert wrapper.demand.top(5) == []
+    status = service.status()
+    assert status['ready'] and status['passes'] == 1 and status['tickers'] == 3
+
+
+def test_reserved_slots_are_left_for_interactive_callers():
+    limiter = RateLimiter(max_calls=2, period=0.2)
+    limiter.acquire()
+    start = time.time()
+    limiter.acquire(reserve=1)  # waits until the window holds no calls
+    assert time.time() - start >= 0.15
+    start = time.time()
+    limiter.acquire()  # an interactive caller still gets the second slot at once
+    assert time.time() - start < 0.1
+    assert not limiter.can_call()
+
+
+def test_stopping_skips_the_remaining_batches(wrapper):
+    service = PrefetchService(seed_sources=[lambda: ['AAA', 'BBB']], wrapper=wrapper, batch_size=1)
+    service._stop_event.set()
+    service.run_once()
+    assert wrapper.provider.downloads == []
+    assert service.ready.is_set()
+
+
+def test_background_services_start_on_the_first_request(monkeypatch):
+    import app_portfolio
+    started = []
+    monkeypatch.setenv('BACKGROUND_SERVICES', 'true')
+    monkeypatch.setattr(app_portfolio, '_background_started', False)
+    monkeypatch.setattr(app_portfolio.market_regime_service, 'start', lambda: started.append('regime'))
+    monkeypatch.setattr(app_portfolio.prefetch_service, 'start', lambda: started.append('prefetch'))
+
+    client = app_portfolio.app.test_client()
+    client.get('/api/ready')
+    client.get('/api/ready')
+    assert started == ['regime', 'prefetch']
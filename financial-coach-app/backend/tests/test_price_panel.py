@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.price_panel import PricePanel
+
+
+def make_frame():
+    dates = pd.bdate_range('2024-01-01', periods=6, name='Date')
+    return pd.DataFrame({
+        'AAA': [10.0, 10.5, np.nan, 11.0, 11.5, 12.0],
+        'BBB': [20.0, 19.0, 19.5, 20.5, 21.0, 20.0],
+        'CCC': [5.0, 5.1, 5.2, 5.3, 5.4, 5.5],
+        'DDD': [np.nan] * 6,
+    }, index=dates)
+
+
+def test_panel_stores_float32():
+    panel = PricePanel.from_frame(make_frame())
+    assert panel.values.dtype == np.float32
+    assert panel.tickers == ('AAA', 'BBB', 'CCC', 'DDD')
+    assert len(panel) == 6 and 'CCC' in panel
+    with pytest.raises(ValueError):
+        PricePanel(np.zeros((2, 2)), panel.dates, ['AAA', 'BBB'])
+
+
+def test_select_orders_columns_and_avoids_copies():
+    panel = PricePanel.from_frame(make_frame())
+    assert panel.select(['AAA', 'BBB', 'CCC', 'DDD']) is panel
+
+    strided = panel.select(['AAA', 'CCC'])
+    assert strided.tickers == ('AAA', 'CCC')
+    assert np.shares_memory(strided.values, panel.values)
+
+    reordered = panel.select(['CCC', 'AAA'])
+    assert reordered.tickers == ('CCC', 'AAA')
+    np.testing.assert_array_equal(reordered.values[:, 0], panel.values[:, 2])
+
+    with pytest.raises(KeyError):
+        panel.select(['AAA', 'ZZZ'])
+
+
+def test_since_and_drop_empty():
+    panel = PricePanel.from_frame(make_frame())
+    recent = panel.since('2024-01-04')
+    assert len(recent) == 3 and recent.dates[0] == pd.Timestamp('2024-01-04')
+    assert np.shares_memory(recent.values, panel.values)
+
+    kept, dropped = panel.drop_empty()
+    assert kept.tickers == ('AAA', 'BBB', 'CCC') and dropped == ['DDD']
+    same, none = kept.drop_empty()
+    assert same is kept and none == []
+
+
+def test_returns_match_the_pandas_definition():
+    frame = make_frame()[['AAA', 'BBB', 'CCC']]
+    panel = PricePanel.from_frame(frame)
+    expected = frame.astype(np.float32).astype(np.float64).dropna().pct_change(1).dropna()
+    returns = panel.returns()
+    assert returns.dtypes.eq(np.float64).all()
+    pd.testing.assert_frame_equal(returns, expected, check_freq=False)
+
+
+def test_every_ordering_of_a_basket_shares_one_cache_entry(wrapper):
+    first = wrapper.get_price_panel(['BBB', 'AAA'], start='2024-01-01')
+    second = wrapper.get_price_panel(['AAA', 'BBB'], start='2024-01-01')
+    assert first.tickers == ('BBB', 'AAA') and second.tickers == ('AAA', 'BBB')
+    np.testing.assert_array_equal(first.values[:, 0], second.values[:, 1])
+    assert len(wrapper.provider.downloads) == 1
+    assert 'panel' in wrapper.cache.stats()['namespaces']
+    assert wrapper.cache.stats()['entries'] == 1
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.price_store import OHLCV_FIELDS, PriceStore
+
+
+def bars(tickers, dates, scale=1.0):
+    """yf.download-shaped (field, ticker) frame with deterministic prices"""
+    rng = np.random.default_rng(17)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, size=(len(dates), len(tickers))), axis=0)) * scale
+    fields = {field: closes for field in OHLCV_FIELDS[:4]}
+    fields['Volume'] = np.full_like(closes, 1e6)
+    return pd.concat({field: pd.DataFrame(values, index=dates, columns=tickers)
+                      for field, values in fields.items()}, axis=1)
+
+
+class Source:
+    """Fetch callable recording each upstream request"""
+    def __init__(self, dates, scale=1.0):
+        self.dates = dates
+        self.scale = scale
+        self.calls = []
+
+    def __call__(self, tickers, start):
+        self.calls.append((list(tickers), start))
+        data = bars(['AAA', 'BBB'], self.dates, self.scale)
+        # Unknown tickers come back as all-NaN columns, as from yf.download
+        columns = pd.MultiIndex.from_product([OHLCV_FIELDS, list(tickers)])
+        return data.loc[data.index >= pd.Timestamp(start)].reindex(columns=columns)
+
+
+@pytest.fixture
+def dates():
+    return pd.bdate_range('2024-01-02', '2024-03-29')
+
+
+def stale_store(path):
+    # Always stale: no TTL and a settle delay that never passes
+    return PriceStore(str(path), refresh_ttl=-1, settle_delay=10 ** 9)
+
+
+def test_history_is_fetched_once_and_served_from_disk(tmp_path, dates):
+    store = PriceStore(str(tmp_path / 'bars.db'))
+    source = Source(dates)
+
+    first = store.history(['AAA', 'BBB'], '2024-01-02', source)
+    second = store.history(['AAA', 'BBB'], '2024-01-02', source)
+
+    assert source.calls == [(['AAA', 'BBB'], '2024-01-02')]
+    expected = bars(['AAA', 'BBB'], dates)['Close']
+    assert np.allclose(second['Close'].to_numpy(), expected.to_numpy())
+    assert first.equals(second)
+
+
+def test_stale_tickers_fetch_only_the_tail_with_overlap(tmp_path, dates):
+    store = stale_store(tmp_path / 'bars.db')
+    store.sync(['AAA'], '2024-01-02', Source(dates[:40]))
+    source = Source(dates)
+    store.sync(['AAA'], '2024-01-02', source)
+
+    last_stored = dates[39]
+    assert source.calls == [(['AAA'], (last_stored - pd.Timedelta(days=5)).strftime('%Y-%m-%d'))]
+    assert store.coverage(['AAA'])['AAA'][1] == dates[-1].strftime('%Y-%m-%d')
+    assert len(store.read(['AAA'], '2024-01-02')) == len(dates)
+
+
+def test_readjusted_history_is_refetched_in_full(tmp_path, dates):
+    store = stale_store(tmp_path / 'bars.db')
+    store.sync(['AAA', 'BBB'], '2024-01-02', Source(dates[:40]))
+    # A dividend re-adjusts every past close of both tickers
+    source = Source(dates, scale=0.98)
+    store.sync(['AAA', 'BBB'], '2024-01-02', source)
+
+    assert len(source.calls) == 2
+    assert source.calls[1] == (['AAA', 'BBB'], '2024-01-02')
+    stored = store.read(['AAA', 'BBB'], '2024-01-02')['Close']
+    assert np.allclose(stored.to_numpy(), bars(['AAA', 'BBB'], dates, 0.98)['Close'].to_numpy())
+
+
+def test_revised_last_bar_alone_is_not_a_readjustment(tmp_path, dates):
+    store = stale_store(tmp_path / 'bars.db')
+    store.sync(['AAA'], '2024-01-02', Source(dates[:40]))
+    revised = Source(dates[:40])
+    original = bars(['AAA', 'BBB'], dates[:40])
+    original.iloc[-1] *= 1.01
+
+    def fetch(tickers, start):
+        revised.calls.append((list(tickers), start))
+        return original.loc[original.index >= pd.Timestamp(start), (slice(None), list(tickers))]
+
+    store.sync(['AAA'], '2024-01-02', fetch)
+    assert len(revised.calls) == 1
+    assert store.read(['AAA'], '2024-01-02')['Close']['AAA'].iloc[-1] == pytest.approx(original['Close']['AAA'].iloc[-1])
+
+
+def test_panel_reads_one_field_as_float32(tmp_path, dates):
+    store = PriceStore(str(tmp_path / 'bars.db'))
+    panel = store.panel(['BBB', 'AAA', 'ZZZ'], '2024-01-02', Source(dates))
+
+    assert panel.values.dtype == np.float32 and panel.tickers == ('BBB', 'AAA', 'ZZZ')
+    expected = bars(['AAA', 'BBB'], dates)['Close'][['BBB', 'AAA']].to_numpy()
+    assert np.allclose(panel.values[:, :2], expected, rtol=1e-6)
+    assert np.isnan(panel.values[:, 2]).all()
+
+
+def test_tickers_missing_from_a_download_are_refetched_in_full(tmp_path, dates):
+    store = stale_store(tmp_path / 'bars.db')
+    store.sync(['AAA', 'CCC'], '2024-01-02', Source(dates))
+    assert 'CCC' not in store.coverage(['AAA', 'CCC'])
+
+    # A row left without a last bar (written before this was fixed) counts as missing too
+    with store._connect() as conn:
+        conn.execute("INSERT INTO coverage VALUES ('BBB', '2024-01-02', NULL, 0)")
+
+    source = Source(dates)
+    store.sync(['AAA', 'BBB'], '2024-01-02', source)
+    assert source.calls[0] == (['BBB'], '2024-01-02')
+    assert source.calls[1][0] == ['AAA']
+    assert len(store.read_panel(['AAA', 'BBB'], '2024-01-02').returns()) == len(dates) - 1
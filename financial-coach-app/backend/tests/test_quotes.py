@@ -0,0 +1,59 @@
+import os
+
+import pandas as pd
+import pytest
+
+
+def test_missing_quotes_come_from_one_multi_ticker_download(wrapper):
+    quotes = wrapper.get_quotes(['msft', 'AAPL', 'MSFT', ' nvda '])
+
+    assert list(quotes) == ['MSFT', 'AAPL', 'NVDA']
+    assert len(wrapper.provider.downloads) == 1
+    tickers, kwargs = wrapper.provider.downloads[0]
+    assert tickers == ['AAPL', 'MSFT', 'NVDA']
+    assert kwargs == {'period': '5d', 'interval': '1d', 'auto_adjust': False}
+
+
+def test_quote_fields_come_from_the_last_two_closes(wrapper):
+    quote = wrapper.get_quotes(['AAPL'])['AAPL']
+    closes = wrapper.provider.bars('AAPL')['Close']
+
+    assert quote['price'] == pytest.approx(closes.iloc[-1])
+    assert quote['previousClose'] == pytest.approx(closes.iloc[-2])
+    assert quote['change'] == pytest.approx(closes.iloc[-1] - closes.iloc[-2])
+    assert quote['changePercent'] == pytest.approx((closes.iloc[-1] / closes.iloc[-2] - 1) * 100)
+
+
+def test_each_ticker_uses_its_own_last_two_bars(wrapper):
+    # A JSE listing with no bar on the US ticker's last date
+    os.makedirs(os.path.join(wrapper.provider.path, 'prices'))
+    dates = pd.to_datetime(['2024-12-26', '2024-12-27', '2024-12-30'])
+    pd.DataFrame({'Open': [10.0, 11.0, 12.0], 'High': [10.0, 11.0, 12.0], 'Low': [10.0, 11.0, 12.0],
+                  'Close': [10.0, 11.0, 12.0], 'Volume': [100.0, 200.0, 300.0]}, index=dates).to_csv(
+        os.path.join(wrapper.provider.path, 'prices', 'NPN.JO.csv'), index_label='Date')
+
+    quotes = wrapper.get_quotes(['AAPL', 'NPN.JO'])
+    assert len(wrapper.provider.downloads) == 1
+    assert quotes['NPN.JO']['price'] == 12.0 and quotes['NPN.JO']['previousClose'] == 11.0
+    assert quotes['NPN.JO']['change'] == 1.0 and quotes['NPN.JO']['volume'] == 300
+    closes = wrapper.provider.bars('AAPL')['Close']
+    assert quotes['AAPL']['previousClose'] == pytest.approx(closes.iloc[-2])
+
+
+def test_cached_quotes_are_not_downloaded_again(wrapper):
+    wrapper.get_quotes(['AAPL', 'MSFT'])
+    wrapper.get_quotes(['MSFT', 'AAPL', 'NVDA'])
+
+    assert [tickers for tickers, _ in wrapper.provider.downloads] == [['AAPL', 'MSFT'], ['NVDA']]
+
+
+def test_only_per_ticker_quotes_are_cached(wrapper):
+    wrapper.get_quotes(['AAPL', 'MSFT'])
+    keys = list(wrapper.cache._cache)
+    assert sorted(keys) == ['quote:AAPL', 'quote:MSFT']
+
+
+def test_prefetch_does_not_count_as_demand(wrapper):
+    wrapper.get_quotes(['AAPL'], track=False)
+    wrapper.get_quotes(['MSFT'])
+    assert wrapper.demand.top(5) == ['MSFT']
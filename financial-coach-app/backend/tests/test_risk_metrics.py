@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+from flask import Flask
+
+from utils.risk_metrics import drawdowns, risk_metrics, risk_report
+
+
+def test_historical_tail_matches_the_empirical_distribution():
+    returns = np.random.default_rng(14).normal(0.0005, 0.01, size=(2000, 2))
+    metrics = risk_metrics(returns)
+    quantile = np.quantile(returns, 0.05, axis=0)
+
+    assert np.allclose(metrics['historical_var'], -quantile)
+    for column in range(2):
+        tail = returns[returns[:, column] <= quantile[column], column]
+        assert metrics['historical_cvar'][column] == pytest.approx(-tail.mean())
+
+
+def test_cornish_fisher_reduces_to_normal_for_gaussian_returns():
+    returns = np.random.default_rng(15).normal(0, 0.01, size=(200000, 1))
+    metrics = risk_metrics(returns)
+    assert metrics['cornish_fisher_var'][0] == pytest.approx(metrics['parametric_var'][0], rel=0.01)
+    assert metrics['cornish_fisher_cvar'][0] == pytest.approx(metrics['parametric_cvar'][0], rel=0.02)
+
+
+def test_drawdown_depth_and_duration():
+    returns = np.array([-0.1, 0.05, 0.05, -0.5, 1.0, 0.2])
+    drawdown, duration = drawdowns(returns)
+    metrics = risk_report(returns, names=['s'])['s']
+
+    assert drawdown[0, 0] == pytest.approx(-0.1)  # a first-day loss counts
+    assert metrics['max_drawdown'] == pytest.approx(0.9 * 1.05 * 1.05 * 0.5 - 1)
+    assert duration[:, 0].tolist() == [1, 2, 3, 4, 5, 0]
+    assert metrics['max_drawdown_duration'] == 5 and isinstance(metrics['max_drawdown_duration'], int)
+
+
+def test_report_labels_every_strategy_column():
+    frame = pd.DataFrame(np.random.default_rng(16).normal(0, 0.01, size=(100, 3)), columns=['mv', 'sr', 'hrp'])
+    report = risk_report(frame)
+    assert list(report) == ['mv', 'sr', 'hrp']
+    assert all(isinstance(value, float) for value in report['mv'].values() if not isinstance(value, int))
+
+
+def test_single_return_is_rejected():
+    with pytest.raises(ValueError):
+        risk_metrics(np.array([0.01]))
+
+
+def test_historical_analysis_omits_risk_for_a_single_return(monkeypatch):
+    from controllers import hedge_controller
+
+    dates = pd.bdate_range('2024-01-02', periods=2)
+    history = pd.DataFrame({'Close': [100.0, 101.0], 'Volume': [1000, 1200]}, index=dates)
+    history['Returns'] = history['Close'].pct_change()
+
+    async def fetch_historical_data(symbol, start_date):
+        return history
+
+    monkeypatch.setattr(hedge_controller.options_service, 'fetch_historical_data', fetch_historical_data)
+    with Flask(__name__).test_request_context(json={'symbol': 'AAA', 'start_date': '2024-01-01'}):
+        result = hedge_controller.get_historical_analysis()
+
+    assert result['success']
+    stats = result['data']['summary_statistics']
+    assert stats['var_95'] is None and stats['calmar_ratio'] is None
+    assert stats['total_return'] == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize('bars', [1, 2])
+def test_analysis_of_a_very_short_history_still_succeeds(bars):
+    from app_portfolio import PortfolioAnalyzer
+    data = pd.DataFrame([[0.01, -0.005], [0.002, 0.004]][:bars], columns=['AAA', 'BBB'],
+                        index=pd.bdate_range('2024-01-02', periods=bars))
+    result = PortfolioAnalyzer().build_analysis(['AAA', 'BBB'], data, {'regime': 'neutral'})
+
+    assert len(result['strategies']) == 3
+    for strategy in result['strategies']:
+        assert 'total_return' in strategy['metrics']
+        assert np.isfinite(list(strategy['ticker_allocation'].values())).all()
+        assert ('historical_var' in strategy['metrics']) == (bars == 2)
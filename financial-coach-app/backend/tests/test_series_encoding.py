@@ -0,0 +1,52 @@
+import base64
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.series_encoding import encode_series, format_analysis_series, resample_returns
+
+
+def decode(buffer, dtype):
+    return np.frombuffer(base64.b64decode(buffer), dtype)
+
+
+@pytest.fixture
+def returns():
+    # Trading days around the year end, with Christmas and New Year missing
+    dates = pd.bdate_range('2024-12-16', '2025-01-17').drop(pd.to_datetime(['2024-12-25', '2025-01-01']))
+    return pd.Series(np.linspace(-0.02, 0.02, len(dates)), index=dates)
+
+
+def test_json_keeps_the_plain_list(returns):
+    assert encode_series(returns) == returns.tolist()
+
+
+def test_base64_round_trips_values_and_dates(returns):
+    encoded = encode_series(returns, 'base64')
+
+    assert encoded['length'] == len(returns)
+    assert np.allclose(decode(encoded['data'], '<f4'), returns.to_numpy(), atol=1e-7)
+    dates = pd.Timestamp(encoded['start']) + pd.to_timedelta(decode(encoded['offsets'], '<i4'), unit='D')
+    assert dates.equals(returns.index)
+    assert encoded['end'] == '2025-01-17'
+
+
+def test_undated_series_has_no_index():
+    encoded = encode_series([0.01, -0.02], 'base64')
+    assert encoded['start'] is None and encoded['offsets'] is None
+    assert np.allclose(decode(encoded['data'], '<f4'), [0.01, -0.02])
+
+
+def test_resampling_compounds_within_each_period(returns):
+    weekly = resample_returns(returns, 'weekly')
+    first_week = returns[:'2024-12-20']
+    assert weekly.iloc[0] == pytest.approx((1 + first_week).prod() - 1)
+    assert len(resample_returns(returns, 'monthly')) == 2
+
+
+def test_formatting_leaves_the_analysis_untouched(returns):
+    analysis = {'strategies': [{'name': 'MV', 'portfolio_return': returns}], 'metadata': {}}
+    formatted = format_analysis_series(analysis, 'base64')
+    assert formatted['strategies'][0]['portfolio_return']['encoding'] == 'base64'
+    assert analysis['strategies'][0]['portfolio_return'] is returns
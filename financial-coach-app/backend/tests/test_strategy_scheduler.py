@@ -0,0 +1,112 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.strategy_scheduler import StrategyScheduler
+
+
+class StubAnalyzer:
+    optimizer_mode = 'moments'
+
+    def __init__(self):
+        self.history_calls = []
+
+    def get_price_history(self, tickers, start=None):
+        self.history_calls.append((list(tickers), start))
+        rng = np.random.default_rng(len(tickers))
+        dates = pd.bdate_range('2024-01-01', periods=80)
+        prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, size=(80, len(tickers))), axis=0))
+        return pd.DataFrame(prices, index=dates, columns=list(tickers))
+
+    def execute_trade(self, data, moments=None, previous_weights=None):
+        n = data.shape[1]
+        return [np.ones(n) / n] * 3
+
+
+class ParkedRefresh:
+    """Refresh policy that parks strategies an hour out, so each runs exactly once"""
+    def next_run(self, tickers, interval, last_run=None, volatility_ratio=None):
+        return time.time() + 3600
+
+
+@pytest.fixture
+def scheduler():
+    updates = []
+    received = threading.Semaphore(0)
+
+    def emit(event, payload, to=None, namespace=None):
+        updates.append((event, payload['strategy_id'], to))
+        received.release()
+
+    scheduler = StrategyScheduler(StubAnalyzer(), emit=emit, refresh_policy=ParkedRefresh())
+    scheduler.updates = updates
+    scheduler.received = received
+    yield scheduler
+    scheduler.shutdown()
+
+
+def test_strategies_on_one_ticker_set_share_state_and_emit_to_their_room(scheduler):
+    first = scheduler.start_strategy(['AAA', 'BBB'], owner='alice')
+    second = scheduler.start_strategy(['BBB', 'AAA'], owner='bob')
+    for _ in range(2):
+        assert scheduler.received.acquire(timeout=5)
+
+    assert {(s, room) for _, s, room in scheduler.updates} == {(first.id, first.id), (second.id, second.id)}
+    assert len(scheduler._states) == 1
+    assert first.weights is not None and first.consecutive_errors == 0
+
+
+def test_stop_is_scoped_to_the_owner(scheduler):
+    alice = [scheduler.start_strategy(['AAA'], owner='alice') for _ in range(2)]
+    bob = scheduler.start_strategy(['AAA'], owner='bob')
+
+    assert sorted(scheduler.stop(owner='alice')) == sorted(s.id for s in alice)
+    assert [s.id for s in scheduler.list_strategies()] == [bob.id]
+    assert scheduler.stop_strategy('unknown') is None
+
+
+def test_last_strategy_on_a_ticker_set_drops_its_state(scheduler):
+    strategy = scheduler.start_strategy(['AAA', 'BBB'], owner='alice')
+    assert scheduler.received.acquire(timeout=5)
+    scheduler.stop_strategy(strategy.id)
+    assert scheduler._states == {}
+    assert scheduler.active_count() == 0
+
+
+@pytest.fixture
+def app_scheduler(scheduler, monkeypatch):
+    import app_portfolio
+    monkeypatch.setattr(app_portfolio, 'strategy_scheduler', scheduler)
+    return app_portfolio
+
+
+def test_routes_only_act_on_the_callers_strategies(app_scheduler):
+    alice, bob = app_scheduler.app.test_client(), app_scheduler.app.test_client()
+    started = alice.post('/api/start', json={'tickers': ['AAA'], 'room': 'victim', 'user_id': 'bob'}).get_json()
+    strategy_id = started['strategy_id']
+
+    # The room is the server-side strategy id, whatever the client asked for
+    assert started['room'] == strategy_id
+    assert bob.post('/api/stop', json={'strategy_id': strategy_id}).get_json()['message'] == 'Strategy is not running'
+    assert bob.post('/api/stop', json={}).get_json()['message'] == 'Strategy is not running'
+    assert bob.get('/api/strategies').get_json()['data'] == []
+    assert [s['strategy_id'] for s in alice.get('/api/strategies').get_json()['data']] == [strategy_id]
+    assert alice.post('/api/stop', json={}).get_json()['stopped'] == [strategy_id]
+
+
+def test_only_the_owner_can_join_a_strategy_room(app_scheduler):
+    alice, bob = app_scheduler.app.test_client(), app_scheduler.app.test_client()
+    strategy_id = alice.post('/api/start', json={'tickers': ['AAA']}).get_json()['strategy_id']
+    sockets = {name: app_scheduler.socketio.test_client(app_scheduler.app, flask_test_client=client)
+               for name, client in (('alice', alice), ('bob', bob))}
+
+    for socket in sockets.values():
+        socket.get_received()
+        socket.emit('join_strategy', {'strategy_id': strategy_id})
+    assert [m['name'] for m in sockets['bob'].get_received()] == ['strategy_error']
+    assert [m['name'] for m in sockets['alice'].get_received()] == ['strategy_joined']
+    for socket in sockets.values():
+        socket.disconnect()
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.portfolio_optimizer import compute_moments
+from utils.streaming_moments import StreamingMoments
+
+
+@pytest.fixture
+def closes():
+    rng = np.random.default_rng(3)
+    dates = pd.bdate_range('2024-01-01', periods=60)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, size=(60, 3)), axis=0))
+    return pd.DataFrame(prices, index=dates, columns=['AAA', 'BBB', 'CCC'])
+
+
+def assert_matches_batch(state, closes):
+    mu, cov = state.moments()
+    expected_mu, expected_cov = compute_moments(closes.pct_change(1).dropna())
+    assert np.allclose(mu, expected_mu)
+    assert np.allclose(cov, expected_cov)
+
+
+def test_seed_matches_batch_moments(closes):
+    assert_matches_batch(StreamingMoments(closes), closes)
+
+
+def test_appended_bars_match_recomputation(closes):
+    state = StreamingMoments(closes.iloc[:40])
+    assert state.update(closes.iloc[38:]) == 20
+    assert_matches_batch(state, closes)
+    assert len(state.returns) == len(closes) - 1
+
+
+def test_revised_last_bar_replaces_observation(closes):
+    state = StreamingMoments(closes)
+    revised = closes.copy()
+    revised.iloc[-1] *= 1.02
+    assert state.update(revised.iloc[-3:]) == 1
+    assert_matches_batch(state, revised)
+
+
+def test_unchanged_and_older_bars_are_ignored(closes):
+    state = StreamingMoments(closes)
+    assert state.update(closes.iloc[-5:]) == 0
+    assert_matches_batch(state, closes)
+
+
+def test_needs_three_prices(closes):
+    with pytest.raises(ValueError):
+        StreamingMoments(closes.iloc[:2])
@@ -0,0 +1,70 @@
+from datetime import date, datetime, timezone
+
+import numpy as np
+import pytest
+
+from utils.trading_calendar import (
+    AdaptiveRefresh, JSE_CALENDAR, US_CALENDAR, easter_sunday, jse_holidays, realized_volatility_ratio,
+    us_early_closes, us_holidays
+)
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize('year, expected', [(2024, date(2024, 3, 31)), (2025, date(2025, 4, 20)),
+                                            (2038, date(2038, 4, 25))])
+def test_easter(year, expected):
+    assert easter_sunday(year) == expected
+
+
+def test_nyse_holidays_and_early_closes():
+    assert us_holidays(2024) == {
+        date(2024, 1, 1), date(2024, 1, 15), date(2024, 2, 19), date(2024, 3, 29), date(2024, 5, 27),
+        date(2024, 6, 19), date(2024, 7, 4), date(2024, 9, 2), date(2024, 11, 28), date(2024, 12, 25)
+    }
+    assert us_early_closes(2024) == {date(2024, 7, 3), date(2024, 11, 29), date(2024, 12, 24)}
+    # Saturday New Year is not observed on Friday; Sunday Juneteenth moves to Monday
+    assert date(2021, 12, 31) not in us_holidays(2021) | us_holidays(2022)
+    assert date(2022, 6, 20) in us_holidays(2022)
+
+
+def test_jse_holidays_move_sunday_to_monday():
+    holidays = jse_holidays(2024)
+    assert date(2024, 6, 17) in holidays  # Youth Day fell on a Sunday
+    assert {date(2024, 3, 29), date(2024, 4, 1)} <= holidays  # Good Friday and Family Day
+    assert date(2024, 4, 29) not in holidays  # a Saturday holiday is not moved
+
+
+def test_sessions_in_exchange_time():
+    assert US_CALENDAR.is_open(utc(2024, 7, 2, 14, 0))       # 10:00 New York
+    assert not US_CALENDAR.is_open(utc(2024, 7, 3, 17, 30))   # after the 13:00 early close
+    assert not US_CALENDAR.is_open(utc(2024, 7, 4, 15, 0))
+    assert JSE_CALENDAR.is_open(utc(2024, 7, 2, 8, 0))        # 10:00 Johannesburg
+    assert US_CALENDAR.next_open(utc(2024, 7, 3, 20, 0)) == datetime(2024, 7, 5, 9, 30, tzinfo=US_CALENDAR.tz)
+    assert US_CALENDAR.last_close(utc(2024, 7, 5, 12, 0)) == datetime(2024, 7, 3, 13, 0, tzinfo=US_CALENDAR.tz)
+
+
+def test_open_market_runs_on_the_interval_grid():
+    policy = AdaptiveRefresh(min_interval=5)
+    now = utc(2024, 7, 2, 14, 0, 7)
+    assert policy.next_run(['AAPL'], 30, now=now) == now.timestamp() - 7 + 30
+    # A volatility spike shortens the interval, never below the minimum
+    assert policy.interval(30, volatility_ratio=4.0) == 15
+    assert policy.interval(30, volatility_ratio=100.0) == 5
+
+
+def test_closed_market_wakes_after_the_close_then_at_the_next_open():
+    policy = AdaptiveRefresh(post_close_delay=900)
+    now = utc(2024, 7, 5, 21, 0)  # Friday, 17:00 New York
+    settled = datetime(2024, 7, 5, 16, 15, tzinfo=US_CALENDAR.tz).timestamp()
+    assert policy.next_run(['AAPL'], 30, last_run=None, now=now) == max(settled, now.timestamp())
+    monday_open = datetime(2024, 7, 8, 9, 30, tzinfo=US_CALENDAR.tz).timestamp()
+    assert policy.next_run(['AAPL'], 30, last_run=now.timestamp(), now=now) == monday_open
+
+
+def test_volatility_ratio_uses_the_worst_strategy():
+    cov = np.diag([0.0001, 0.0004])
+    ratio = realized_volatility_ratio([0.03, 0.0], [[1.0, 0.0], [0.0, 1.0]], cov)
+    assert ratio == pytest.approx(3.0)
@@ -5,6 +5,7 @@ import logging
 import functools
 import time
 import os
+import multiprocessing
 from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
@@ -21,6 +22,27 @@ io_executor = concurrent.futures.ThreadPoolExecutor(
     thread_name_prefix="io_worker"
 )
 
+# Process pool for CPU-bound work that needs true parallelism (created lazily)
+_process_executor = None
+_process_executor_lock = threading.Lock()
+
+def get_process_executor():
+    """
+    Return the shared process pool, creating it on first use
+
+    Workers are spawned, not forked: the server already runs cache, scheduler
+    and Socket.IO threads, and a fork could copy a lock one of them holds
+    into the child and deadlock it.
+    """
+    global _process_executor
+    with _process_executor_lock:
+        if _process_executor is None:
+            _process_executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _process_executor
+
 @contextmanager
 def timing(operation_name):
     """Context manager to time operations for performance monitoring"""
@@ -97,4 +119,6 @@ def batch_process(items, processor_func, max_workers=10, chunk_size=None):
 def cleanup():
     """Cleanup function to shut down thread pools properly"""
     io_executor.shutdown(wait=False)
-    cpu_executor.shutdown(wait=False)
\ No newline at end of file
+    cpu_executor.shutdown(wait=False)
+    if _process_executor is not None:
+        _process_executor.shutdown(wait=False)
\ No newline at end of file
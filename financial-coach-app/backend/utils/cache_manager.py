@@ -1,18 +1,80 @@
+import os
+import sys
 import time
 import logging
 import threading
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from functools import wraps
-from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+
+def estimate_size(value, _depth=0):
+    """
+    Approximate memory footprint of a cached value in bytes
+
+    DataFrames and Series use pandas' own accounting, arrays (and anything
+    else exposing nbytes, such as PricePanel) their buffer size, and
+    containers are walked a few levels deep.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True, index=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(value, (np.ndarray, pd.Index)) or hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if hasattr(value, 'get_data'):
+        # Flask response
+        return sys.getsizeof(value) + len(value.get_data())
+    size = sys.getsizeof(value)
+    if _depth >= 6:
+        return size
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _depth + 1) for item in value)
+    elif hasattr(value, '__dict__'):
+        size += estimate_size(vars(value), _depth + 1)
+    return size
+
+
+def _namespace(key):
+    """Quota namespace of a key: the part before the first ':'"""
+    return key.split(':', 1)[0]
+
+
 class CacheManager:
     """
-    A memory cache manager with time-based expiration
+    A memory cache manager with time-based expiration and single-flight loading
+
+    Entries may carry a soft TTL (fresh) and a later hard TTL (expiry). Between
+    the two, get_or_load serves the stale value immediately and refreshes it
+    once in the background (stale-while-revalidate).
+
+    Memory is bounded by max_entries and max_bytes across the cache and by
+    per-namespace byte quotas (namespace = key prefix before ':'). Each entry
+    is sized once when set; least recently used entries are evicted first,
+    within the namespace when its quota is exceeded. A value larger than its
+    budget is not cached at all.
     """
-    def __init__(self):
-        self._cache = {}
+    def __init__(self, refresh_workers=4, max_entries=None, max_bytes=None, quotas=None):
+        self._cache = OrderedDict()  # key -> (value, hard expiry, soft expiry, size), LRU first
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.quotas = dict(quotas or {})
+        self._bytes = 0
+        self._namespace_bytes = {}
+        self.evictions = 0
+        self.rejected = 0
         self._lock = threading.RLock()
+        # key -> (Future, owner thread id) for loads currently in progress
+        self._inflight = {}
+        self.coalesced = 0
+        self.stale_hits = 0
+        self.refresh_workers = refresh_workers
+        self._refresh_executor = None
         self._cleanup_thread = None
         self._stop_cleanup = threading.Event()
         self._start_cleanup_thread()
@@ -40,43 +102,204 @@ class CacheManager:
         now = time.time()
         with self._lock:
             expired_keys = [
-                key for key, (_, expiry) in self._cache.items()
+                key for key, (_, expiry, _, _) in self._cache.items()
                 if expiry is not None and expiry < now
             ]
             for key in expired_keys:
-                del self._cache[key]
+                self._remove(key)
                 logger.debug(f"Removed expired cache entry: {key}")
     
-    def get(self, key):
-        """Get item from cache if it exists and hasn't expired"""
+    def _remove(self, key):
+        """Drop an entry and its size from the accounting; caller holds the lock"""
+        entry = self._cache.pop(key, None)
+        if entry is None:
+            return
+        namespace = _namespace(key)
+        self._bytes -= entry[3]
+        self._namespace_bytes[namespace] -= entry[3]
+        if not self._namespace_bytes[namespace]:
+            del self._namespace_bytes[namespace]
+    
+    def _evict(self, namespace):
+        """Evict least recently used entries until every budget holds; caller holds the lock"""
+        quota = self.quotas.get(namespace)
+        if quota is not None and self._namespace_bytes.get(namespace, 0) > quota:
+            victims = []
+            excess = self._namespace_bytes[namespace] - quota
+            for key, entry in self._cache.items():
+                if excess <= 0:
+                    break
+                if _namespace(key) == namespace:
+                    victims.append(key)
+                    excess -= entry[3]
+            for key in victims:
+                self._remove(key)
+            self.evictions += len(victims)
+        
+        while self._cache and ((self.max_entries is not None and len(self._cache) > self.max_entries)
+                               or (self.max_bytes is not None and self._bytes > self.max_bytes)):
+            key = next(iter(self._cache))
+            self._remove(key)
+            self.evictions += 1
+            logger.debug(f"Evicted cache entry: {key}")
+    
+    def _lookup(self, key):
+        """Return (value, is_stale) for a live entry, or (None, False)"""
         with self._lock:
             cache_item = self._cache.get(key)
             if cache_item is None:
-                return None
+                return None, False
             
-            value, expiry = cache_item
-            if expiry is not None and expiry < time.time():
-                del self._cache[key]
-                return None
+            value, expiry, fresh_until, _ = cache_item
+            now = time.time()
+            if expiry is not None and expiry < now:
+                self._remove(key)
+                return None, False
             
-            return value
+            self._cache.move_to_end(key)
+            return value, fresh_until is not None and fresh_until < now
+    
+    def get(self, key):
+        """Get item from cache if it exists and hasn't expired"""
+        return self._lookup(key)[0]
+    
+    def set(self, key, value, ttl=None, hard_ttl=None):
+        """
+        Set an item in the cache with optional time-to-live in seconds
+
+        With hard_ttl > ttl the entry turns stale after ttl and expires after hard_ttl.
+        A ttl of zero or less stores nothing.
+        """
+        namespace = _namespace(key)
+        # Sized outside the lock; walking a large payload must not block readers
+        size = estimate_size(value) if ttl is None or ttl > 0 else 0
+        with self._lock:
+            self._remove(key)
+            if ttl is not None and ttl <= 0:
+                return
+            budgets = [self.max_bytes, self.quotas.get(namespace)]
+            if any(budget is not None and size > budget for budget in budgets):
+                self.rejected += 1
+                logger.debug(f"Not caching {key}: {size} bytes exceeds its budget")
+                return
+            
+            now = time.time()
+            if hard_ttl is not None and ttl is not None and hard_ttl > ttl:
+                self._cache[key] = (value, now + hard_ttl, now + ttl, size)
+            else:
+                expiry = now + ttl if ttl is not None else None
+                self._cache[key] = (value, expiry, None, size)
+            self._bytes += size
+            self._namespace_bytes[namespace] = self._namespace_bytes.get(namespace, 0) + size
+            self._evict(namespace)
     
-    def set(self, key, value, ttl=None):
-        """Set an item in the cache with optional time-to-live in seconds"""
+    def _refresh(self, key, loader, ttl, hard_ttl, future):
+        """Background revalidation of a stale entry; keeps the stale value on failure"""
+        try:
+            value = loader()
+            if value is not None:
+                self.set(key, value, ttl, hard_ttl)
+            future.set_result(value)
+        except Exception as e:
+            logger.warning(f"Background refresh failed for {key}: {str(e)}")
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+    
+    def _schedule_refresh(self, key, loader, ttl, hard_ttl):
         with self._lock:
-            expiry = time.time() + ttl if ttl is not None else None
-            self._cache[key] = (value, expiry)
+            if key in self._inflight:
+                return
+            if self._refresh_executor is None:
+                self._refresh_executor = ThreadPoolExecutor(max_workers=self.refresh_workers,
+                                                            thread_name_prefix="cache_refresh")
+            future = Future()
+            self._inflight[key] = (future, None)
+        self._refresh_executor.submit(self._refresh, key, loader, ttl, hard_ttl, future)
+    
+    def get_or_load(self, key, loader, ttl=None, hard_ttl=None, allow_stale=True):
+        """
+        Return the cached value for key, loading it at most once at a time
+
+        The first caller to miss runs loader() while concurrent callers for
+        the same key wait on its future and share its result or exception,
+        so a burst of identical misses costs one upstream request. A stale
+        entry (past ttl, before hard_ttl) is returned at once while a single
+        background refresh repopulates it, unless allow_stale is False.
+        """
+        value, is_stale = self._lookup(key)
+        if value is not None and (not is_stale or allow_stale):
+            if is_stale:
+                self.stale_hits += 1
+                self._schedule_refresh(key, loader, ttl, hard_ttl)
+            return value
+        
+        thread_id = threading.get_ident()
+        with self._lock:
+            value, is_stale = self._lookup(key)
+            if value is not None and not is_stale:
+                return value
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                future = Future()
+                self._inflight[key] = (future, thread_id)
+                is_leader = True
+            elif inflight[1] == thread_id:
+                # Re-entrant load of the same key from the loading thread
+                future, is_leader = None, False
+            else:
+                self.coalesced += 1
+                future, is_leader = inflight[0], False
+        
+        if future is None:
+            return loader()
+        if not is_leader:
+            logger.debug(f"Coalesced concurrent load for {key}")
+            return future.result()
+        
+        try:
+            value = loader()
+            if value is not None:
+                self.set(key, value, ttl, hard_ttl)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
     
     def delete(self, key):
         """Remove an item from the cache"""
         with self._lock:
-            if key in self._cache:
-                del self._cache[key]
+            self._remove(key)
     
     def clear(self):
         """Clear all items from the cache"""
         with self._lock:
             self._cache.clear()
+            self._bytes = 0
+            self._namespace_bytes.clear()
+    
+    def stats(self):
+        """Size, budget and eviction counters"""
+        with self._lock:
+            return {
+                'entries': len(self._cache),
+                'max_entries': self.max_entries,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'namespaces': {
+                    namespace: {'bytes': size, 'quota': self.quotas.get(namespace)}
+                    for namespace, size in sorted(self._namespace_bytes.items())
+                },
+                'evictions': self.evictions,
+                'rejected': self.rejected,
+                'stale_hits': self.stale_hits,
+                'coalesced': self.coalesced
+            }
     
     def shutdown(self):
         """Shutdown the cleanup thread"""
@@ -84,14 +307,96 @@ class CacheManager:
         if self._cleanup_thread:
             self._cleanup_thread.join(timeout=1)
             self._cleanup_thread = None
+        if self._refresh_executor is not None:
+            self._refresh_executor.shutdown(wait=False, cancel_futures=True)
+            self._refresh_executor = None
+
+
+class LRUCache:
+    """
+    A bounded memory cache with least-recently-used eviction and no expiry.
+    Suited to results whose keys already encode their freshness.
+    """
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key):
+        """Get item from cache and mark it as most recently used"""
+        with self._lock:
+            if key not in self._cache:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return self._cache[key]
+    
+    def set(self, key, value):
+        """Set an item, evicting the least recently used entries beyond max_entries"""
+        with self._lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                evicted_key, _ = self._cache.popitem(last=False)
+                logger.debug(f"Evicted LRU cache entry: {evicted_key}")
+    
+    def invalidate(self, predicate):
+        """Remove every entry whose key matches the predicate"""
+        with self._lock:
+            stale_keys = [key for key in self._cache if predicate(key)]
+            for key in stale_keys:
+                del self._cache[key]
+            return len(stale_keys)
+    
+    def delete(self, key):
+        """Remove an item from the cache"""
+        with self._lock:
+            self._cache.pop(key, None)
+    
+    def clear(self):
+        """Clear all items from the cache"""
+        with self._lock:
+            self._cache.clear()
+    
+    def stats(self):
+        """Return size and hit/miss counters"""
+        with self._lock:
+            return {
+                'entries': len(self._cache),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+    
+    def __len__(self):
+        return len(self._cache)
+
+
+def parse_quotas(spec):
+    """'md=96,panel=128' (megabytes per namespace) -> {namespace: bytes}"""
+    quotas = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        namespace, _, megabytes = item.partition('=')
+        quotas[namespace.strip()] = int(float(megabytes) * 1024 * 1024)
+    return quotas
 
 
 # Create a global cache instance
-cache = CacheManager()
+cache = CacheManager(
+    max_entries=int(os.getenv('CACHE_MAX_ENTRIES', '10000')),
+    max_bytes=int(float(os.getenv('CACHE_MAX_MB', '512')) * 1024 * 1024),
+    quotas=parse_quotas(os.getenv('CACHE_NAMESPACE_QUOTAS_MB', 'md=192,panel=256,quote=16'))
+)
 
-def cached(ttl=300):
+def cached(ttl=300, hard_ttl=None):
     """
     Decorator to cache function results with the specified TTL (in seconds)
+
+    With hard_ttl > ttl, results older than ttl are served stale while one
+    background call refreshes them, until they expire at hard_ttl.
     """
     def decorator(func):
         @wraps(func)
@@ -102,19 +407,8 @@ def cached(ttl=300):
             key_parts.extend(f"{k}={v}" for k, v in sorted(kwargs.items()))
             cache_key = ":".join(key_parts)
             
-            # Try to get from cache first
-            cached_value = cache.get(cache_key)
-            if cached_value is not None:
-                logger.debug(f"Cache hit for {func.__name__}")
-                return cached_value
-            
-            # If not in cache, call the function
-            logger.debug(f"Cache miss for {func.__name__}")
-            result = func(*args, **kwargs)
-            
-            # Store in cache with the specified TTL
-            cache.set(cache_key, result, ttl)
-            
-            return result
+            # On a miss only one caller runs the function; concurrent
+            # callers for the same key wait for and share its result
+            return cache.get_or_load(cache_key, lambda: func(*args, **kwargs), ttl, hard_ttl)
         return wrapper
     return decorator
\ No newline at end of file
@@ -0,0 +1,326 @@
+import os
+import json
+import time
+import zlib
+import random
+import logging
+import threading
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+ALPHA_VANTAGE_URL = 'https://www.alphavantage.co/query'
+
+
+class ProviderError(Exception):
+    """A data provider could not serve a request"""
+    pass
+
+
+class DataProvider:
+    """
+    Source of market data and news behind the gateway and sentiment service
+
+    download/history/info mirror yf.download, Ticker.history and Ticker.info;
+    news_sentiment returns an Alpha Vantage NEWS_SENTIMENT payload.
+    """
+    name = 'base'
+
+    def download(self, tickers, **kwargs):
+        raise NotImplementedError
+
+    def history(self, ticker, **kwargs):
+        raise NotImplementedError
+
+    def info(self, ticker):
+        raise NotImplementedError
+
+    def news_sentiment(self, ticker, limit=50, timeout=None):
+        raise NotImplementedError
+
+
+class YahooProvider(DataProvider):
+    """Live Yahoo Finance through yfinance"""
+    name = 'yahoo'
+
+    def download(self, tickers, **kwargs):
+        return yf.download(tickers, progress=False, threads=False, **kwargs)
+
+    def history(self, ticker, **kwargs):
+        return yf.Ticker(ticker).history(**kwargs)
+
+    def info(self, ticker):
+        return yf.Ticker(ticker).info
+
+
+class AlphaVantageProvider(DataProvider):
+    """Live Alpha Vantage news sentiment over a requests session"""
+    name = 'alphavantage'
+
+    def __init__(self, api_key, session):
+        self.api_key = api_key
+        self.session = session
+
+    def news_sentiment(self, ticker, limit=50, timeout=None):
+        params = {
+            'function': 'NEWS_SENTIMENT',
+            'tickers': ticker,
+            'apikey': self.api_key,
+            'limit': limit
+        }
+        response = self.session.get(ALPHA_VANTAGE_URL, params=params, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+def _ticker_seed(ticker, seed):
+    """Stable per-ticker seed, independent of PYTHONHASHSEED"""
+    return zlib.crc32(f"{seed}:{ticker}".encode())
+
+
+def _period_start(period, end):
+    """First date covered by a yfinance period string such as '5d', '1mo' or '2y'"""
+    if period in (None, 'max'):
+        return None
+    if period == 'ytd':
+        return pd.Timestamp(end.year, 1, 1)
+    units = {'d': 'D', 'wk': 'W', 'mo': 'M', 'y': 'Y'}
+    for suffix, unit in units.items():
+        if period.endswith(suffix) and period[:-len(suffix)].isdigit():
+            count = int(period[:-len(suffix)])
+            if unit == 'D':
+                # Trading days, as yfinance counts them
+                return end - pd.tseries.offsets.BDay(count - 1)
+            offsets = {'W': pd.DateOffset(weeks=count), 'M': pd.DateOffset(months=count),
+                       'Y': pd.DateOffset(years=count)}
+            return end - offsets[unit]
+    raise ProviderError(f"Unsupported period: {period}")
+
+
+class ReplayProvider(DataProvider):
+    """
+    Deterministic offline provider for load tests and benchmarks
+
+    Reads recorded data from ``path``:
+        prices/<TICKER>.csv   Date,Open,High,Low,Close,Volume daily bars
+        news/<TICKER>.json    Alpha Vantage NEWS_SENTIMENT payload
+        info/<TICKER>.json    Ticker.info dict
+    Tickers without a recording get synthetic data seeded by the ticker name
+    (geometric Brownian motion bars from ``synthetic_start`` to
+    ``synthetic_end``, a small news feed), so every run sees the same values.
+    Each field has its own generator, so a date's bar does not depend on where
+    the range ends; pin ``synthetic_end`` for a fixed range, otherwise it is
+    today. Each call sleeps ``latency`` seconds plus up to ``jitter`` more and
+    fails with probability ``error_rate``, decided by the seed, the call and
+    how many times that call was made before, so concurrent callers see the
+    same faults whatever order their threads run in.
+    """
+    name = 'replay'
+
+    def __init__(self, path, latency=0.0, jitter=0.0, error_rate=0.0, seed=0,
+                 synthetic=True, synthetic_start='2012-01-02', synthetic_end=None):
+        self.path = path
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.seed = seed
+        self.synthetic = synthetic
+        self.synthetic_start = synthetic_start
+        self.synthetic_end = synthetic_end
+        self._call_counts = {}
+        self._calls_lock = threading.Lock()
+        self._bars = {}
+        self._bars_lock = threading.Lock()
+        self.calls = 0
+        self.injected_errors = 0
+
+    def _simulate(self, what):
+        """Injected latency and failures"""
+        with self._calls_lock:
+            self.calls += 1
+            count = self._call_counts[what] = self._call_counts.get(what, 0) + 1
+        # Drawn from this call's own generator, not a shared one, so thread order does not matter
+        rng = random.Random(_ticker_seed(f"{what}#{count}", self.seed))
+        delay = self.latency + rng.uniform(0, self.jitter) if self.jitter else self.latency
+        fail = rng.random() < self.error_rate
+        if fail:
+            with self._calls_lock:
+                self.injected_errors += 1
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            raise ProviderError(f"Injected replay error for {what}")
+
+    def _file(self, kind, ticker, extension):
+        return os.path.join(self.path, kind, f"{ticker.upper()}.{extension}")
+
+    def _end_date(self):
+        if self.synthetic_end is not None:
+            return pd.Timestamp(self.synthetic_end).normalize()
+        return pd.Timestamp.today().normalize()
+
+    def _synthetic_bars(self, ticker):
+        def rng(field):
+            return np.random.default_rng(_ticker_seed(f"{field}:{ticker}", self.seed))
+
+        dates = pd.bdate_range(self.synthetic_start, self._end_date(), name='Date')
+        params = rng('params')
+        drift, volatility = params.uniform(-0.0002, 0.0008), params.uniform(0.008, 0.025)
+        level = params.uniform(20, 500)
+        close = level * np.exp(np.cumsum(rng('Close').normal(drift, volatility, len(dates))))
+        open_ = close * np.exp(rng('Open').normal(0, volatility / 2, len(dates)))
+        spread = np.abs(rng('Spread').normal(0, volatility, len(dates)))
+        return pd.DataFrame({
+            'Open': open_,
+            'High': np.maximum(open_, close) * (1 + spread),
+            'Low': np.minimum(open_, close) * (1 - spread),
+            'Close': close,
+            'Volume': rng('Volume').integers(100_000, 10_000_000, len(dates)).astype(float)
+        }, index=dates)
+
+    def bars(self, ticker):
+        """All daily bars for a ticker, recorded or synthetic"""
+        ticker = ticker.upper()
+        with self._bars_lock:
+            if ticker in self._bars:
+                return self._bars[ticker]
+        path = self._file('prices', ticker, 'csv')
+        if os.path.exists(path):
+            frame = pd.read_csv(path, index_col=0, parse_dates=True).reindex(columns=OHLCV_COLUMNS)
+            frame.index.name = 'Date'
+        elif self.synthetic:
+            frame = self._synthetic_bars(ticker)
+        else:
+            frame = pd.DataFrame(columns=OHLCV_COLUMNS, dtype=float)
+        with self._bars_lock:
+            self._bars[ticker] = frame
+        return frame
+
+    def _window(self, frame, start=None, end=None, period=None, **kwargs):
+        if start is None and period is not None and not frame.empty:
+            start = _period_start(period, frame.index[-1])
+        if start is not None:
+            frame = frame[frame.index >= pd.Timestamp(start)]
+        if end is not None:
+            frame = frame[frame.index < pd.Timestamp(end)]
+        return frame
+
+    def download(self, tickers, **kwargs):
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        self._simulate(f"download {tickers}")
+        frames = {ticker: self._window(self.bars(ticker), **kwargs) for ticker in tickers}
+        data = pd.concat(frames, axis=1, names=['Ticker', 'Price']).swaplevel(axis=1)
+        # Same (Price, Ticker) layout as yf.download
+        return data.reindex(columns=pd.MultiIndex.from_product([OHLCV_COLUMNS, tickers],
+                                                               names=['Price', 'Ticker']))
+
+    def history(self, ticker, **kwargs):
+        self._simulate(f"history {ticker}")
+        return self._window(self.bars(ticker), **kwargs)
+
+    def info(self, ticker):
+        self._simulate(f"info {ticker}")
+        path = self._file('info', ticker, 'json')
+        if os.path.exists(path):
+            with open(path) as f:
+                return json.load(f)
+        closes = self.bars(ticker)['Close']
+        if closes.empty:
+            return {}
+        return {
+            'symbol': ticker.upper(),
+            'shortName': f"{ticker.upper()} (replay)",
+            'currency': 'ZAR' if ticker.upper().endswith('.JO') else 'USD',
+            'currentPrice': float(closes.iloc[-1]),
+            'previousClose': float(closes.iloc[-2]) if len(closes) > 1 else float(closes.iloc[-1])
+        }
+
+    def _synthetic_news(self, ticker, limit):
+        rng = np.random.default_rng(_ticker_seed(f"news:{ticker}", self.seed))
+        bias = rng.uniform(-0.3, 0.3)
+        labels = [(-0.35, 'Bearish'), (-0.15, 'Somewhat-Bearish'), (0.15, 'Neutral'),
+                  (0.35, 'Somewhat-Bullish'), (np.inf, 'Bullish')]
+
+        def label(score):
+            return next(name for bound, name in labels if score < bound)
+
+        published = self._end_date()
+        feed = []
+        for i in range(min(limit, 20)):
+            score = float(np.clip(rng.normal(bias, 0.15), -1, 1))
+            ticker_score = float(np.clip(score + rng.normal(0, 0.05), -1, 1))
+            feed.append({
+                'title': f"{ticker} replay article {i + 1}",
+                'url': f"https://example.com/replay/{ticker.lower()}/{i + 1}",
+                'time_published': (published - pd.Timedelta(hours=6 * i)).strftime('%Y%m%dT%H%M%S'),
+                'authors': ['Replay'],
+                'summary': f"Synthetic news item {i + 1} for {ticker}.",
+                'source': 'Replay',
+                'source_domain': 'example.com',
+                'topics': [],
+                'overall_sentiment_score': round(score, 6),
+                'overall_sentiment_label': label(score),
+                'ticker_sentiment': [{
+                    'ticker': ticker,
+                    'relevance_score': str(round(float(rng.uniform(0.3, 1.0)), 6)),
+                    'ticker_sentiment_score': str(round(ticker_score, 6)),
+                    'ticker_sentiment_label': label(ticker_score)
+                }]
+            })
+        return {'items': str(len(feed)), 'feed': feed}
+
+    def news_sentiment(self, ticker, limit=50, timeout=None):
+        self._simulate(f"news {ticker}")
+        path = self._file('news', ticker, 'json')
+        if os.path.exists(path):
+            with open(path) as f:
+                return json.load(f)
+        if self.synthetic:
+            return self._synthetic_news(ticker, limit)
+        return {'items': '0', 'feed': []}
+
+    @staticmethod
+    def record(source, path, tickers, start='2012-01-01', news_source=None):
+        """Write live bars (and news, if a news source is given) as replay files"""
+        os.makedirs(os.path.join(path, 'prices'), exist_ok=True)
+        for ticker in tickers:
+            bars = source.history(ticker, start=start, interval='1d', auto_adjust=True)
+            if bars is None or bars.empty:
+                logger.warning(f"No bars recorded for {ticker}")
+                continue
+            bars = bars.reindex(columns=OHLCV_COLUMNS)
+            bars.index = pd.DatetimeIndex(bars.index).tz_localize(None).normalize()
+            bars.to_csv(os.path.join(path, 'prices', f"{ticker.upper()}.csv"), index_label='Date')
+            if news_source is not None:
+                os.makedirs(os.path.join(path, 'news'), exist_ok=True)
+                with open(os.path.join(path, 'news', f"{ticker.upper()}.json"), 'w') as f:
+                    json.dump(news_source.news_sentiment(ticker), f)
+
+
+@lru_cache(maxsize=1)
+def provider_from_env():
+    """
+    Shared provider selected by MARKET_DATA_PROVIDER, or None for the live defaults
+
+    'replay' reads REPLAY_DATA_PATH, REPLAY_LATENCY_MS, REPLAY_JITTER_MS,
+    REPLAY_ERROR_RATE, REPLAY_SEED and REPLAY_END (last synthetic date,
+    YYYY-MM-DD; today if unset).
+    """
+    name = os.getenv('MARKET_DATA_PROVIDER', 'yahoo').lower()
+    if name != 'replay':
+        return None
+    provider = ReplayProvider(
+        os.getenv('REPLAY_DATA_PATH', 'data/replay'),
+        latency=float(os.getenv('REPLAY_LATENCY_MS', '0')) / 1000,
+        jitter=float(os.getenv('REPLAY_JITTER_MS', '0')) / 1000,
+        error_rate=float(os.getenv('REPLAY_ERROR_RATE', '0')),
+        seed=int(os.getenv('REPLAY_SEED', '0')),
+        synthetic_end=os.getenv('REPLAY_END') or None
+    )
+    logger.info(f"Using replay market data from {provider.path}")
+    return provider
@@ -0,0 +1,214 @@
+import time
+import logging
+import threading
+import pandas as pd
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from .cache_manager import cache as default_cache
+from .rate_limiter import yfinance_limiter
+from .data_providers import YahooProvider, provider_from_env
+
+logger = logging.getLogger(__name__)
+
+# Default cache lifetime per request kind, in seconds
+DEFAULT_TTLS = {
+    'download': 300,
+    'history': 300,
+    'info': 300
+}
+
+# How long past its TTL a value may still be served while it is refreshed
+DEFAULT_HARD_TTLS = {
+    'download': 1800,
+    'history': 1800,
+    'info': 3600
+}
+
+# Arguments the gateway controls itself and never forwards or keys on
+_RESERVED_PARAMS = ('progress', 'threads')
+
+
+def _canonical_value(value):
+    """Stable string form of a request parameter"""
+    if isinstance(value, datetime):
+        # Day granularity: an end of datetime.now() must not make every key unique
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return ','.join(str(v) for v in value)
+    return str(value)
+
+
+@dataclass(frozen=True)
+class MarketDataRequest:
+    """
+    A normalized yfinance call: what to fetch, for which tickers, with which parameters
+
+    params is the canonical string form used for the cache key and equality;
+    arguments keeps the caller's typed values, which are what the provider gets
+    (yfinance tests flags such as auto_adjust for truthiness, so 'False' would
+    read as True).
+    """
+    kind: str
+    tickers: tuple
+    params: tuple = ()
+    arguments: dict = field(default_factory=dict, compare=False, hash=False)
+
+    @classmethod
+    def build(cls, kind, tickers, **params):
+        if kind not in DEFAULT_TTLS:
+            raise ValueError(f"Unknown market data request kind: {kind}")
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        symbols = tuple(sorted({t.strip().upper() for t in tickers if t and t.strip()}))
+        if not symbols:
+            raise ValueError("At least one ticker is required")
+        arguments = {key: value for key, value in params.items()
+                     if key not in _RESERVED_PARAMS and value is not None}
+        normalized = tuple(sorted((key, _canonical_value(value)) for key, value in arguments.items()))
+        return cls(kind, symbols, normalized, arguments)
+
+    @property
+    def key(self):
+        params = '&'.join(f"{k}={v}" for k, v in self.params)
+        return f"md:{self.kind}:{','.join(self.tickers)}:{params}"
+
+    @property
+    def kwargs(self):
+        """The caller's typed arguments, as forwarded upstream"""
+        return dict(self.arguments)
+
+
+class MarketDataGateway:
+    """
+    Single request pipeline for every market data call
+
+    normalize -> cache lookup (single-flight) -> one limiter slot -> fetch ->
+    metrics. Failed or empty fetches are not cached, so the next request
+    retries instead of serving a cached error for the full TTL. Values past
+    their TTL but within the hard TTL are served stale while one background
+    refresh runs, so callers do not wait on upstream latency. The upstream is
+    a DataProvider, live Yahoo unless another one is passed in.
+    """
+    def __init__(self, limiter=yfinance_limiter, cache=default_cache, ttls=None, hard_ttls=None,
+                 provider=None):
+        self.provider = provider or YahooProvider()
+        self.limiter = limiter
+        self.cache = cache
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.hard_ttls = dict(DEFAULT_HARD_TTLS, **(hard_ttls or {}))
+        self._lock = threading.Lock()
+        self._metrics = {
+            'requests': 0,
+            'upstream_calls': 0,
+            'upstream_errors': 0,
+            'upstream_seconds': 0.0,
+            'by_kind': {kind: {'requests': 0, 'upstream_calls': 0} for kind in DEFAULT_TTLS}
+        }
+
+    def _count(self, kind, field, amount=1):
+        with self._lock:
+            self._metrics[field] += amount
+            if field in self._metrics['by_kind'][kind]:
+                self._metrics['by_kind'][kind][field] += amount
+
+    def _call_upstream(self, request):
+        if request.kind == 'download':
+            tickers = request.tickers[0] if len(request.tickers) == 1 else list(request.tickers)
+            return self.provider.download(tickers, **request.kwargs)
+        if request.kind == 'history':
+            return self.provider.history(request.tickers[0], **request.kwargs)
+        return self.provider.info(request.tickers[0])
+
+    def _load(self, request, acquire=None):
+        (acquire or self.limiter.acquire)()
+        self._count(request.kind, 'upstream_calls')
+        start_time = time.time()
+        try:
+            result = self._call_upstream(request)
+        except Exception as e:
+            self._count(request.kind, 'upstream_errors')
+            logger.error(f"Error fetching {request.kind} for {list(request.tickers)}: {str(e)}")
+            return None
+        finally:
+            self._count(request.kind, 'upstream_seconds', time.time() - start_time)
+
+        if result is None or len(result) == 0:
+            return None
+        return result
+
+    def fetch(self, request, ttl=None, allow_stale=True, acquire=None):
+        """
+        Serve a request from cache or with one upstream call
+
+        Pass allow_stale=False when the caller persists the result and must
+        not receive a value past its TTL. Background callers pass acquire, a
+        callable that takes the upstream call's slot from their own limiter
+        (e.g. leaving headroom for interactive requests) in place of the
+        gateway's. Returns an
+        empty DataFrame (dict for 'info') when nothing could be fetched.
+        """
+        self._count(request.kind, 'requests')
+        ttl = self.ttls[request.kind] if ttl is None else ttl
+        result = self.cache.get_or_load(request.key, lambda: self._load(request, acquire), ttl,
+                                        self.hard_ttls[request.kind], allow_stale=allow_stale)
+        if result is None:
+            return {} if request.kind == 'info' else pd.DataFrame()
+        return result
+
+    def metrics(self):
+        """Request, upstream-call and latency counters"""
+        with self._lock:
+            metrics = {key: value for key, value in self._metrics.items() if key != 'by_kind'}
+            metrics['by_kind'] = {kind: dict(counts) for kind, counts in self._metrics['by_kind'].items()}
+        served = metrics['requests'] - metrics['upstream_calls']
+        metrics['cache_hit_ratio'] = round(served / metrics['requests'], 4) if metrics['requests'] else 0.0
+        metrics['upstream_seconds'] = round(metrics['upstream_seconds'], 3)
+        metrics['provider'] = self.provider.name
+        return metrics
+
+
+class TickerDemand:
+    """
+    Exponentially decayed request counts per ticker
+
+    Each request adds one to a ticker's score and scores halve every
+    half_life seconds, so the top of the ranking is what users asked for
+    recently and often.
+    """
+    def __init__(self, half_life=3600, max_tickers=1000):
+        self.half_life = half_life
+        self.max_tickers = max_tickers
+        self._scores = {}  # ticker -> (score, last update)
+        self._lock = threading.Lock()
+
+    def _decayed(self, score, updated, now):
+        return score * 0.5 ** ((now - updated) / self.half_life)
+
+    def record(self, tickers, now=None):
+        now = time.time() if now is None else now
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        with self._lock:
+            for ticker in {t.strip().upper() for t in tickers if t and t.strip()}:
+                score, updated = self._scores.get(ticker, (0.0, now))
+                self._scores[ticker] = (self._decayed(score, updated, now) + 1, now)
+            if len(self._scores) > self.max_tickers:
+                # Forget the coldest tickers so the table stays bounded
+                ranked = sorted(self._scores, key=lambda t: self._decayed(*self._scores[t], now))
+                for ticker in ranked[:len(self._scores) - self.max_tickers]:
+                    del self._scores[ticker]
+
+    def top(self, n, min_score=0.5, now=None):
+        """Up to n tickers ranked by decayed request count"""
+        now = time.time() if now is None else now
+        with self._lock:
+            scores = {ticker: self._decayed(score, updated, now)
+                      for ticker, (score, updated) in self._scores.items()}
+        ranked = sorted((t for t, score in scores.items() if score >= min_score),
+                        key=scores.get, reverse=True)
+        return ranked[:n]
+
+
+market_data_gateway = MarketDataGateway(provider=provider_from_env())
@@ -0,0 +1,534 @@
+import time
+import logging
+import numpy as np
+from scipy.optimize import minimize
+from scipy.cluster.hierarchy import linkage, leaves_list
+from scipy.spatial.distance import squareform
+
+logger = logging.getLogger(__name__)
+
+# Mean-variance utility parameters, kept in sync with PortfolioAnalyzer.mv_Criterion
+MV_LAMBDA = 3
+MV_W = 1
+MV_WBAR = 1.0025
+MV_WEIGHT_PENALTY = 0.001
+
+# Pre-computed coefficients of the MV utility: const + a * mean - b * variance
+_MV_CONST = (MV_WBAR ** (-1 - MV_LAMBDA)) / (1 + MV_LAMBDA)
+_MV_MEAN_COEF = (MV_WBAR ** (-MV_LAMBDA)) * MV_W
+_MV_VAR_COEF = (MV_WBAR ** (-1 - MV_LAMBDA)) * MV_LAMBDA * 0.5 * (MV_W ** 2)
+
+
+def compute_moments(data):
+    """
+    Compute the mean vector and covariance matrix of a return matrix
+
+    Uses the population covariance (ddof=0) so that objectives evaluated on the
+    moments match np.var / np.std over the full return history exactly.
+
+    Args:
+        data: T x n return matrix (DataFrame or ndarray)
+
+    Returns:
+        tuple: (mu, cov) as float64 arrays of shape (n,) and (n, n)
+    """
+    returns = np.asarray(data, dtype=float)
+    mu = returns.mean(axis=0)
+    centered = returns - mu
+    cov = centered.T @ centered / returns.shape[0]
+    return mu, cov
+
+
+def mv_objective(weight, mu, cov):
+    """Negative mean-variance utility evaluated on pre-computed moments, O(n^2)"""
+    mean = weight @ mu
+    variance = weight @ cov @ weight
+    deviation = weight - 1 / len(weight)
+    criterion = _MV_CONST + _MV_MEAN_COEF * mean - _MV_VAR_COEF * variance
+    criterion -= MV_WEIGHT_PENALTY * np.sum(deviation ** 2)
+    return -criterion
+
+
+def mv_gradient(weight, mu, cov):
+    """Analytic gradient of mv_objective"""
+    deviation = weight - 1 / len(weight)
+    grad = _MV_MEAN_COEF * mu - 2 * _MV_VAR_COEF * (cov @ weight)
+    grad -= 2 * MV_WEIGHT_PENALTY * deviation
+    return -grad
+
+
+def sharpe_objective(weight, mu, cov):
+    """Negative (daily) Sharpe ratio evaluated on pre-computed moments, O(n^2)"""
+    variance = weight @ cov @ weight
+    if not np.isfinite(variance) or variance <= 0:
+        return 0.0
+    return -(weight @ mu) / np.sqrt(variance)
+
+
+def sharpe_gradient(weight, mu, cov):
+    """Analytic gradient of sharpe_objective"""
+    cov_w = cov @ weight
+    variance = weight @ cov_w
+    if not np.isfinite(variance) or variance <= 0:
+        return np.zeros_like(weight)
+    std = np.sqrt(variance)
+    mean = weight @ mu
+    return -(mu / std - mean * cov_w / (std ** 3))
+
+
+def sum_to_one_constraint():
+    """Budget constraint (weights sum to 1) with its constant Jacobian"""
+    return {
+        'type': 'eq',
+        'fun': lambda x: np.sum(x) - 1,
+        'jac': lambda x: np.ones_like(x)
+    }
+
+
+def covariance_factor(cov):
+    """
+    Cholesky factor L of the covariance matrix (cov = L @ L.T)
+
+    A small diagonal jitter is added when the sample covariance is only
+    positive semi-definite (e.g. perfectly collinear tickers).
+    """
+    jitter = 0.0
+    scale = np.mean(np.diag(cov)) if cov.size else 1.0
+    for _ in range(6):
+        try:
+            return np.linalg.cholesky(cov + jitter * np.eye(len(cov)))
+        except np.linalg.LinAlgError:
+            jitter = scale * 1e-10 if jitter == 0 else jitter * 100
+    raise np.linalg.LinAlgError("Covariance matrix is not positive definite")
+
+
+def max_return_weights(mu, lower=0.001, upper=0.999):
+    """Greedy highest-return portfolio under box bounds and full investment"""
+    n = len(mu)
+    weights = np.full(n, lower)
+    remaining = 1.0 - weights.sum()
+    for idx in np.argsort(mu)[::-1]:
+        if remaining <= 0:
+            break
+        add = min(upper - lower, remaining)
+        weights[idx] += add
+        remaining -= add
+    return weights
+
+
+def efficient_frontier(mu, cov, n_points=50, lower=0.001, upper=0.999, maxiter=500):
+    """
+    Trace the long-only efficient frontier in a single pass
+
+    Solves min w'Σw subject to w·mu = target, sum(w) = 1 and box bounds for
+    n_points targets between the minimum-variance and maximum-return
+    portfolios. The covariance is factored once and every solve is
+    warm-started from its neighbour's solution.
+
+    Returns:
+        dict: 'weights' (K x n), 'returns' (K,), 'volatility' (K,) in daily units
+              and 'converged' (K,) booleans
+    """
+    n = len(mu)
+    factor = covariance_factor(cov)
+    factor_t = factor.T
+
+    def variance(w):
+        z = factor_t @ w
+        return z @ z
+
+    def variance_grad(w):
+        return 2 * (factor @ (factor_t @ w))
+
+    bounds = [(lower, upper)] * n
+    budget = sum_to_one_constraint()
+    options = {'disp': False, 'maxiter': maxiter, 'ftol': 1e-12}
+
+    # Left end of the frontier: global minimum-variance portfolio
+    x0 = np.ones(n) / n
+    res = minimize(variance, x0, jac=variance_grad, method='SLSQP',
+                   bounds=bounds, constraints=[budget], options=options)
+    min_var_weights = res.x if res.success else x0
+    max_ret_weights = max_return_weights(mu, lower, upper)
+
+    low_target = float(min_var_weights @ mu)
+    high_target = float(max_ret_weights @ mu)
+    if n_points < 2 or high_target <= low_target:
+        targets = np.array([low_target])
+    else:
+        targets = np.linspace(low_target, high_target, n_points)
+
+    weights = np.empty((len(targets), n))
+    converged = np.zeros(len(targets), dtype=bool)
+    x0 = min_var_weights
+    for k, target in enumerate(targets):
+        if k == 0:
+            weights[k], converged[k] = min_var_weights, res.success
+            continue
+        if k == len(targets) - 1:
+            weights[k], converged[k] = max_ret_weights, True
+            continue
+
+        target_cons = {
+            'type': 'eq',
+            'fun': lambda x, t=target: x @ mu - t,
+            'jac': lambda x: mu
+        }
+        point = minimize(variance, x0, jac=variance_grad, method='SLSQP',
+                         bounds=bounds, constraints=[budget, target_cons], options=options)
+        if point.success:
+            x0 = point.x
+        else:
+            logger.warning(f"Frontier point {k} did not converge: {point.message}")
+        weights[k], converged[k] = x0, point.success
+
+    weights = np.clip(weights, 0, None)
+    weights /= weights.sum(axis=1, keepdims=True)
+    # One batched product against the shared factor gives every point's risk
+    volatility = np.sqrt(np.sum((weights @ factor) ** 2, axis=1))
+
+    return {
+        'weights': weights,
+        'returns': weights @ mu,
+        'volatility': volatility,
+        'converged': converged
+    }
+
+
+_CRITERIA = {
+    'mv': (mv_objective, mv_gradient),
+    'sr': (sharpe_objective, sharpe_gradient)
+}
+
+
+def solve_weights(criterion, mu, cov, x0, lower=0.001, upper=0.999, maxiter=2000):
+    """
+    Run one SLSQP solve of a moment-based criterion from a given start
+
+    Module-level so it can be shipped to a process pool.
+
+    Returns:
+        dict: weights, objective value and solver statistics
+    """
+    objective, gradient = _CRITERIA[criterion]
+    n = len(mu)
+    start = time.time()
+    try:
+        res = minimize(objective, x0, args=(mu, cov), jac=gradient, method='SLSQP',
+                       constraints=sum_to_one_constraint(), bounds=[(lower, upper)] * n,
+                       options={'disp': False, 'maxiter': maxiter, 'ftol': 1e-9})
+        weights = res.x / np.sum(res.x)
+        feasible = bool(res.success and np.isfinite(res.fun) and np.all(weights >= 0)
+                        and np.abs(np.sum(res.x) - 1.0) < 1e-6)
+        return {
+            'weights': weights,
+            'fun': float(res.fun),
+            'success': bool(res.success),
+            'feasible': feasible,
+            'nit': int(res.nit),
+            'nfev': int(res.nfev),
+            'message': str(res.message),
+            'elapsed': time.time() - start
+        }
+    except Exception as e:
+        return {
+            'weights': None,
+            'fun': float('inf'),
+            'success': False,
+            'feasible': False,
+            'nit': 0,
+            'nfev': 0,
+            'message': str(e),
+            'elapsed': time.time() - start
+        }
+
+
+def seeded_starts(n, n_starts, seed=0):
+    """Deterministic start points: equal weights followed by seeded Dirichlet draws"""
+    rng = np.random.default_rng(seed)
+    starts = [np.ones(n) / n]
+    if n_starts > 1:
+        starts.extend(rng.dirichlet(np.ones(n), size=n_starts - 1))
+    return starts
+
+
+def multi_start_solve(criterion, mu, cov, n_starts=8, seed=0, executor=None, **solver_kwargs):
+    """
+    Solve a criterion from several seeded starts and keep the best feasible result
+
+    Starts run concurrently on the given executor (typically a process pool);
+    when no executor is given or it fails, they run sequentially.
+
+    Returns:
+        tuple: (best weights or None, solver statistics dict)
+    """
+    start = time.time()
+    starts = seeded_starts(len(mu), n_starts, seed)
+
+    results = None
+    if executor is not None:
+        try:
+            futures = [executor.submit(solve_weights, criterion, mu, cov, x0, **solver_kwargs)
+                       for x0 in starts]
+            results = [future.result() for future in futures]
+        except Exception as e:
+            logger.warning(f"Parallel multi-start failed, running sequentially: {str(e)}")
+    if results is None:
+        results = [solve_weights(criterion, mu, cov, x0, **solver_kwargs) for x0 in starts]
+
+    feasible = [idx for idx, r in enumerate(results) if r['feasible']]
+    best_idx = min(feasible, key=lambda idx: results[idx]['fun']) if feasible else None
+    best = results[best_idx] if best_idx is not None else None
+
+    stats = {
+        'criterion': criterion,
+        'starts': len(results),
+        'seed': seed,
+        'feasible': len(feasible),
+        'best_objective': best['fun'] if best else None,
+        'best_start': best_idx,
+        'objectives': [r['fun'] for r in results],
+        'iterations': [r['nit'] for r in results],
+        'function_evaluations': [r['nfev'] for r in results],
+        'wall_time': time.time() - start
+    }
+    return (best['weights'] if best else None), stats
+
+
+class FactorCovariance:
+    """
+    Low-rank plus diagonal covariance: cov = B @ B.T + diag(d)
+
+    Stores O(n * k) numbers instead of O(n^2) and supports ``cov @ w`` and
+    ``w @ cov`` in O(n * k), so the moment-based objectives and gradients above
+    work on it unchanged.
+    """
+    __array_ufunc__ = None  # make numpy defer `ndarray @ FactorCovariance` to __rmatmul__
+
+    def __init__(self, loadings, specific_variance):
+        self.loadings = loadings
+        self.specific_variance = specific_variance
+        self.shape = (len(specific_variance), len(specific_variance))
+
+    @classmethod
+    def from_returns(cls, data, n_factors=10):
+        """
+        Estimate a statistical (PCA) factor model from a T x n return matrix
+
+        Returns:
+            tuple: (mu, FactorCovariance)
+        """
+        returns = np.asarray(data, dtype=float)
+        t, n = returns.shape
+        mu = returns.mean(axis=0)
+        centered = returns - mu
+        k = max(1, min(n_factors, n - 1, t - 1))
+
+        _, singular, vt = np.linalg.svd(centered, full_matrices=False)
+        loadings = vt[:k].T * (singular[:k] / np.sqrt(t))
+        total_variance = np.einsum('ij,ij->j', centered, centered) / t
+        specific = total_variance - np.einsum('ij,ij->i', loadings, loadings)
+        # Keep the idiosyncratic part strictly positive so the model stays definite
+        specific = np.maximum(specific, 1e-4 * np.maximum(total_variance, 1e-12))
+        return mu, cls(loadings, specific)
+
+    def __matmul__(self, weight):
+        return self.loadings @ (self.loadings.T @ weight) + self.specific_variance * weight
+
+    def __rmatmul__(self, weight):
+        return self @ weight  # symmetric
+
+    def diagonal(self):
+        return np.einsum('ij,ij->i', self.loadings, self.loadings) + self.specific_variance
+
+    def subset(self, items):
+        """Factor covariance of the assets at the given positions"""
+        return FactorCovariance(self.loadings[items], self.specific_variance[items])
+
+
+def project_capped_simplex(v, lower=0.0, upper=1.0, iterations=60):
+    """Euclidean projection onto {sum(w) = 1, lower <= w <= upper} by bisection on the shift"""
+    lo = np.min(v) - upper
+    hi = np.max(v) - lower
+    for _ in range(iterations):
+        tau = 0.5 * (lo + hi)
+        if np.clip(v - tau, lower, upper).sum() > 1:
+            lo = tau
+        else:
+            hi = tau
+    return np.clip(v - 0.5 * (lo + hi), lower, upper)
+
+
+def projected_gradient_solve(criterion, mu, cov, x0=None, lower=0.0, upper=1.0,
+                             maxiter=2000, tol=1e-10):
+    """
+    Structured first-order solver for large universes
+
+    Projected gradient descent with Armijo backtracking on the capped simplex.
+    Each iteration costs one covariance product plus an O(n) projection, so
+    with a FactorCovariance the whole solve is O(iterations * n * k).
+
+    Returns:
+        dict: weights, objective value and solver statistics (same shape as solve_weights)
+    """
+    objective, gradient = _CRITERIA[criterion]
+    start = time.time()
+    n = len(mu)
+    x = project_capped_simplex(np.ones(n) / n if x0 is None else np.asarray(x0, dtype=float),
+                               lower, upper)
+    fx = objective(x, mu, cov)
+    step = 1.0
+    nfev = 1
+    converged = False
+
+    for iteration in range(1, maxiter + 1):
+        grad = gradient(x, mu, cov)
+        while True:
+            candidate = project_capped_simplex(x - step * grad, lower, upper)
+            f_candidate = objective(candidate, mu, cov)
+            nfev += 1
+            move = candidate - x
+            # Sufficient-decrease test along the projection arc
+            if f_candidate <= fx + grad @ move + (move @ move) / (2 * step) or step < 1e-12:
+                break
+            step *= 0.5
+        improvement = fx - f_candidate
+        x, fx = candidate, f_candidate
+        if np.abs(move).max() < 1e-9 or 0 <= improvement < tol * max(1.0, abs(fx)):
+            converged = True
+            break
+        step *= 2  # let the step grow again after a successful move
+
+    return {
+        'weights': x,
+        'fun': float(fx),
+        'success': converged,
+        'feasible': bool(np.isfinite(fx)),
+        'nit': iteration,
+        'nfev': nfev,
+        'message': 'Converged' if converged else 'Iteration limit reached',
+        'elapsed': time.time() - start
+    }
+
+
+def _correlation_distance(cov):
+    """Dense n x n correlation distance sqrt((1 - corr) / 2)"""
+    std = np.sqrt(np.clip(np.diag(cov), 1e-18, None))
+    corr = np.clip(cov / np.outer(std, std), -1.0, 1.0)
+    distance = np.sqrt(0.5 * (1 - corr))
+    np.fill_diagonal(distance, 0.0)
+    return distance
+
+
+def _factor_single_linkage(cov):
+    """
+    Single-linkage matrix for a FactorCovariance without forming n x n
+
+    Off the diagonal corr_ij = u_i . u_j with u_i = b_i / sigma_i, so Prim's
+    minimum spanning tree can compute each distance row on the fly in O(n * k).
+    Memory stays O(n * k); the MST edges sorted by length are the single-linkage
+    merges.
+    """
+    n = cov.shape[0]
+    scaled = cov.loadings / np.sqrt(np.clip(cov.diagonal(), 1e-18, None))[:, None]
+
+    def distances(i):
+        return np.sqrt(0.5 * (1 - np.clip(scaled @ scaled[i], -1.0, 1.0)))
+
+    in_tree = np.zeros(n, dtype=bool)
+    in_tree[0] = True
+    best = distances(0)
+    parent = np.zeros(n, dtype=int)
+    edges = []
+    for _ in range(n - 1):
+        candidate = np.where(in_tree, np.inf, best)
+        node = int(np.argmin(candidate))
+        edges.append((candidate[node], parent[node], node))
+        in_tree[node] = True
+        row = distances(node)
+        closer = ~in_tree & (row < best)
+        best[closer] = row[closer]
+        parent[closer] = node
+
+    # Kruskal-style merge of the MST edges into a scipy linkage matrix
+    cluster = list(range(n))
+    size = [1] * n
+    root = list(range(n))
+
+    def find(i):
+        while root[i] != i:
+            root[i] = root[root[i]]
+            i = root[i]
+        return i
+
+    merges = np.empty((n - 1, 4))
+    for step, (distance, a, b) in enumerate(sorted(edges)):
+        a, b = find(a), find(b)
+        # Smaller cluster id first, as scipy orders them
+        first, second = sorted((cluster[a], cluster[b]))
+        merges[step] = (first, second, distance, size[a] + size[b])
+        root[b] = a
+        cluster[a] = n + step
+        size[a] += size[b]
+    return merges
+
+
+def quasi_diagonal_order(cov):
+    """Leaf order of a single-linkage clustering on the correlation distance"""
+    if isinstance(cov, FactorCovariance):
+        return leaves_list(_factor_single_linkage(cov))
+    distance = _correlation_distance(cov)
+    return leaves_list(linkage(squareform(distance, checks=False), method='single'))
+
+
+def hrp_weights(cov):
+    """
+    Hierarchical risk parity weights (Lopez de Prado)
+
+    Assets are ordered by correlation clustering, then capital is split
+    top-down between the two halves of every cluster in inverse proportion to
+    their inverse-variance-portfolio variance. No matrix inversion and no
+    iterative solver are involved, so it always returns fully invested,
+    long-only weights.
+
+    A FactorCovariance is used in factored form throughout, so large
+    universes stay at O(n * k) memory.
+
+    Args:
+        cov: n x n covariance matrix or FactorCovariance
+
+    Returns:
+        ndarray: weights of shape (n,) summing to one
+    """
+    factored = isinstance(cov, FactorCovariance)
+    if not factored:
+        cov = np.asarray(cov, dtype=float)
+    n = cov.shape[0]
+    if n == 1:
+        return np.ones(1)
+
+    order = quasi_diagonal_order(cov)
+    variance = cov.diagonal() if factored else np.diag(cov)
+    inverse_variance = 1.0 / np.clip(variance, 1e-18, None)
+    weights = np.ones(n)
+
+    def cluster_variance(items):
+        ivp = inverse_variance[items] / inverse_variance[items].sum()
+        block = cov.subset(items) if factored else cov[np.ix_(items, items)]
+        return ivp @ (block @ ivp)
+
+    clusters = [order]
+    while clusters:
+        # Bisect every multi-asset cluster of the current level
+        clusters = [half for cluster in clusters if len(cluster) > 1
+                    for half in (cluster[:len(cluster) // 2], cluster[len(cluster) // 2:])]
+        for left, right in zip(clusters[::2], clusters[1::2]):
+            left_variance = cluster_variance(left)
+            right_variance = cluster_variance(right)
+            total = left_variance + right_variance
+            # A degenerate covariance (e.g. a single return) gives both halves zero variance
+            alpha = 1 - left_variance / total if total > 0 else 0.5
+            weights[left] *= alpha
+            weights[right] *= 1 - alpha
+
+    return weights / weights.sum()
@@ -0,0 +1,91 @@
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class PricePanel:
+    """
+    Compact daily price matrix for one field across many tickers
+
+    Prices are a float32 (dates x tickers) array with a shared DatetimeIndex
+    and a ticker tuple, about a quarter of the memory of the float64 OHLCV
+    frame it replaces. Date windows, the whole panel and contiguous ticker
+    runs are numpy views; other baskets gather only their own columns.
+    Returns are computed in float64 for the optimizer.
+    """
+    def __init__(self, values, dates, tickers):
+        values = np.asarray(values, dtype=np.float32)
+        if values.ndim != 2 or values.shape != (len(dates), len(tickers)):
+            raise ValueError(f"Panel shape {values.shape} does not match "
+                             f"{len(dates)} dates x {len(tickers)} tickers")
+        self.values = values
+        self.dates = pd.DatetimeIndex(dates)
+        self.tickers = tuple(tickers)
+        self._positions = {ticker: i for i, ticker in enumerate(self.tickers)}
+
+    @classmethod
+    def from_frame(cls, frame):
+        """Panel from a date-indexed frame with one column per ticker"""
+        if isinstance(frame, pd.Series):
+            frame = frame.to_frame()
+        return cls(frame.to_numpy(dtype=np.float32), frame.index, [str(c) for c in frame.columns])
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __contains__(self, ticker):
+        return ticker in self._positions
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.dates.nbytes
+
+    def select(self, tickers):
+        """
+        Panel restricted to tickers, in the given order
+
+        Raises KeyError for tickers not in the panel.
+        """
+        positions = [self._positions[ticker] for ticker in tickers]
+        if positions == list(range(len(self.tickers))):
+            return self
+        steps = np.diff(positions)
+        if len(positions) and (len(positions) == 1 or (np.all(steps == steps[0]) and steps[0] > 0)):
+            # Evenly strided run: a view, no copy
+            step = int(steps[0]) if len(positions) > 1 else 1
+            values = self.values[:, positions[0]:positions[-1] + 1:step]
+        else:
+            values = self.values[:, positions]
+        return PricePanel(values, self.dates, tickers)
+
+    def since(self, start):
+        """View of the rows dated on or after start"""
+        row = self.dates.searchsorted(pd.Timestamp(start))
+        return PricePanel(self.values[row:], self.dates[row:], self.tickers)
+
+    def drop_empty(self):
+        """(panel without all-NaN tickers, dropped tickers)"""
+        has_data = ~np.isnan(self.values).all(axis=0)
+        if has_data.all():
+            return self, []
+        kept = [ticker for ticker, keep in zip(self.tickers, has_data) if keep]
+        dropped = [ticker for ticker, keep in zip(self.tickers, has_data) if not keep]
+        return self.select(kept), dropped
+
+    def returns(self):
+        """
+        Simple daily returns as a float64 frame
+
+        Same rows as closes.dropna().pct_change(1).dropna(): dates on which any
+        ticker is missing are dropped before differencing.
+        """
+        complete = ~np.isnan(self.values).any(axis=1)
+        prices = self.values[complete].astype(np.float64)
+        returns = prices[1:] / prices[:-1] - 1
+        return pd.DataFrame(returns, index=self.dates[complete][1:], columns=list(self.tickers))
+
+    def to_frame(self):
+        """Date x ticker frame sharing the panel's memory"""
+        return pd.DataFrame(self.values, index=self.dates, columns=list(self.tickers), copy=False)
@@ -0,0 +1,234 @@
+import os
+import time
+import sqlite3
+import logging
+import numpy as np
+import pandas as pd
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from .trading_calendar import calendar_for_ticker
+from .price_panel import PricePanel
+
+logger = logging.getLogger(__name__)
+
+OHLCV_FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    ticker TEXT NOT NULL,
+    date TEXT NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, volume REAL,
+    PRIMARY KEY (ticker, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS coverage (
+    ticker TEXT PRIMARY KEY,
+    start TEXT NOT NULL,
+    last_date TEXT,
+    fetched_at REAL NOT NULL
+);
+"""
+
+
+def normalize_download(data, tickers):
+    """yf.download output as a (field, ticker) column frame for the given tickers"""
+    if data is None or data.empty:
+        return pd.DataFrame()
+    if not isinstance(data.columns, pd.MultiIndex):
+        data = pd.concat({tickers[0]: data}, axis=1).swaplevel(axis=1)
+    return data
+
+
+class PriceStore:
+    """
+    On-disk store of adjusted daily OHLCV bars
+
+    Bars live in SQLite keyed by (ticker, date), so each ticker's history is
+    one contiguous partition, and WAL mode lets several worker processes read
+    and write the same file. A history request is served from disk; only
+    tickers whose bars are stale are fetched, and then only from their last
+    stored bar (plus a short overlap that also detects split/dividend
+    re-adjustments, which trigger a full refetch of that ticker).
+    """
+    def __init__(self, path, refresh_ttl=300, overlap_days=5, settle_delay=900):
+        self.path = path
+        self.refresh_ttl = refresh_ttl
+        self.overlap_days = overlap_days
+        self.settle_delay = settle_delay
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def coverage(self, tickers):
+        """ticker -> (covered start, last bar date, fetched_at) for stored tickers"""
+        placeholders = ','.join('?' * len(tickers))
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT ticker, start, last_date, fetched_at FROM coverage WHERE ticker IN ({placeholders})",
+                list(tickers)
+            ).fetchall()
+        return {ticker: (start, last_date, fetched_at) for ticker, start, last_date, fetched_at in rows}
+
+    def _is_fresh(self, ticker, fetched_at, now):
+        if now.timestamp() - fetched_at < self.refresh_ttl:
+            return True
+        calendar = calendar_for_ticker(ticker)
+        # Nothing changes between a settled close and the next open
+        return (not calendar.is_open(now)
+                and fetched_at >= calendar.last_close(now).timestamp() + self.settle_delay)
+
+    def write(self, data, tickers, start=None, replace=False):
+        """
+        Upsert bars from a (field, ticker) frame and record coverage
+
+        With start set (a full-history write), tickers the download has no
+        bars for are skipped entirely, so they stay missing and are refetched
+        from start by the next sync instead of being marked as covered.
+        """
+        fetched_at = time.time()
+        with self._connect() as conn:
+            for ticker in tickers:
+                frame = (data.xs(ticker, axis=1, level=1).reindex(columns=list(OHLCV_FIELDS))
+                         if ticker in data.columns.get_level_values(1) else pd.DataFrame())
+                frame = frame.dropna(subset=['Close']) if not frame.empty else frame
+                if start is not None and frame.empty:
+                    logger.warning(f"Price store: no bars downloaded for {ticker}")
+                    continue
+                if replace:
+                    conn.execute("DELETE FROM bars WHERE ticker = ?", (ticker,))
+                if not frame.empty:
+                    dates = pd.DatetimeIndex(frame.index).strftime('%Y-%m-%d')
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [(ticker, day, *map(float, values))
+                         for day, values in zip(dates, frame.to_numpy(dtype=float))]
+                    )
+                last_date = conn.execute("SELECT MAX(date) FROM bars WHERE ticker = ?",
+                                         (ticker,)).fetchone()[0]
+                if start is None:
+                    conn.execute("UPDATE coverage SET last_date = ?, fetched_at = ? WHERE ticker = ?",
+                                 (last_date, fetched_at, ticker))
+                else:
+                    conn.execute("INSERT OR REPLACE INTO coverage VALUES (?, ?, ?, ?)",
+                                 (ticker, start, last_date, fetched_at))
+
+    def read(self, tickers, start):
+        """(field, ticker) frame of stored bars from start onwards"""
+        placeholders = ','.join('?' * len(tickers))
+        with self._connect() as conn:
+            rows = pd.read_sql_query(
+                f"SELECT ticker, date, open, high, low, close, volume FROM bars "
+                f"WHERE ticker IN ({placeholders}) AND date >= ? ORDER BY date",
+                conn, params=[*tickers, start]
+            )
+        columns = pd.MultiIndex.from_product([OHLCV_FIELDS, tickers], names=['Price', 'Ticker'])
+        if rows.empty:
+            return pd.DataFrame(columns=columns, dtype=float)
+        rows.columns = ['ticker', 'date', *OHLCV_FIELDS]
+        frame = rows.pivot(index='date', columns='ticker', values=list(OHLCV_FIELDS))
+        frame.index = pd.DatetimeIndex(frame.index, name='Date')
+        return frame.reindex(columns=columns)
+
+    def read_panel(self, tickers, start, field='Close'):
+        """PricePanel of one stored field from start onwards; only that column is read"""
+        if field not in OHLCV_FIELDS:
+            raise ValueError(f"Unknown price field: {field}")
+        placeholders = ','.join('?' * len(tickers))
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT ticker, date, {field.lower()} FROM bars "
+                f"WHERE ticker IN ({placeholders}) AND date >= ?",
+                [*tickers, start]
+            ).fetchall()
+        if not rows:
+            return PricePanel(np.empty((0, len(tickers))), pd.DatetimeIndex([], name='Date'), tickers)
+
+        symbols, days, values = zip(*rows)
+        dates, date_codes = np.unique(np.array(days), return_inverse=True)
+        positions = {ticker: i for i, ticker in enumerate(tickers)}
+        matrix = np.full((len(dates), len(tickers)), np.nan, dtype=np.float32)
+        matrix[date_codes, [positions[symbol] for symbol in symbols]] = np.array(values, dtype=float)
+        return PricePanel(matrix, pd.DatetimeIndex(dates, name='Date'), tickers)
+
+    def _readjusted(self, stored, fetched, tickers):
+        """Tickers whose overlapping closes changed, i.e. history was re-adjusted"""
+        changed = []
+        for ticker in tickers:
+            if ticker not in fetched['Close'].columns:
+                continue
+            # The last stored bar may have been a partial session; compare settled bars only
+            old = stored['Close'][ticker].dropna().iloc[:-1]
+            new = fetched['Close'][ticker].reindex(old.index)
+            overlap = new.notna()
+            if overlap.any() and not np.allclose(old[overlap], new[overlap], rtol=1e-6):
+                changed.append(ticker)
+        return changed
+
+    def sync(self, tickers, start, fetch):
+        """
+        Fetch whatever is missing or stale so the store covers tickers from start
+
+        Args:
+            tickers: list of symbols
+            start: 'YYYY-MM-DD' first date wanted
+            fetch: callable(tickers, start) returning a yf.download-shaped frame
+        """
+        tickers = list(dict.fromkeys(tickers))
+        now = datetime.now(timezone.utc)
+        coverage = self.coverage(tickers)
+
+        # A coverage row without a last bar holds no history to extend
+        missing = [t for t in tickers if t not in coverage or coverage[t][0] > start
+                   or coverage[t][1] is None]
+        stale = [t for t in tickers if t not in missing
+                 and not self._is_fresh(t, coverage[t][2], now)]
+
+        if missing:
+            logger.info(f"Price store: fetching full history for {missing}")
+            full = normalize_download(fetch(missing, start), missing)
+            if not full.empty:
+                self.write(full, missing, start=start)
+
+        if stale:
+            tail_start = min(coverage[t][1] for t in stale)
+            tail_start = (datetime.strptime(tail_start, '%Y-%m-%d')
+                          - timedelta(days=self.overlap_days)).strftime('%Y-%m-%d')
+            logger.info(f"Price store: fetching bars since {tail_start} for {stale}")
+            tail = normalize_download(fetch(stale, tail_start), stale)
+            if not tail.empty:
+                readjusted = self._readjusted(self.read(stale, tail_start), tail, stale)
+                self.write(tail, [t for t in stale if t not in readjusted])
+                if readjusted:
+                    logger.info(f"Price store: history re-adjusted for {readjusted}, refetching")
+                    covered_start = min(coverage[t][0] for t in readjusted)
+                    full = normalize_download(fetch(readjusted, covered_start), readjusted)
+                    if not full.empty:
+                        self.write(full, readjusted, start=covered_start, replace=True)
+
+    def history(self, tickers, start, fetch):
+        """
+        Adjusted daily bars for tickers from start, fetching only what is missing
+
+        Returns:
+            DataFrame: (field, ticker) columns indexed by date
+        """
+        tickers = list(dict.fromkeys(tickers))
+        self.sync(tickers, start, fetch)
+        return self.read(tickers, start)
+
+    def panel(self, tickers, start, fetch, field='Close'):
+        """Like history, but a single-field PricePanel"""
+        tickers = list(dict.fromkeys(tickers))
+        self.sync(tickers, start, fetch)
+        return self.read_panel(tickers, start, field)
@@ -22,20 +22,31 @@ class RateLimiter:
         self.calls = []
         self.lock = threading.RLock()
         
-    def can_call(self):
+    def _limit(self, reserve):
+        """Calls allowed in the window when reserve slots are kept free for others"""
+        return max(self.max_calls - reserve, 1)
+    
+    def can_call(self, reserve=0):
         """Check if a call can be made within the rate limit"""
         with self.lock:
             now = time.time()
             # Remove calls older than the period
             self.calls = [call_time for call_time in self.calls if now - call_time <= self.period]
-            return len(self.calls) < self.max_calls
+            return len(self.calls) < self._limit(reserve)
+    
+    def available(self):
+        """Number of calls that could be made right now"""
+        with self.lock:
+            now = time.time()
+            self.calls = [call_time for call_time in self.calls if now - call_time <= self.period]
+            return max(self.max_calls - len(self.calls), 0)
     
     def add_call(self):
         """Record a call was made"""
         with self.lock:
             self.calls.append(time.time())
     
-    def wait_until_available(self):
+    def wait_until_available(self, reserve=0):
         """Wait until a call can be made within the rate limit"""
         while True:
             with self.lock:
@@ -43,17 +54,31 @@ class RateLimiter:
                 # Remove calls older than the period
                 self.calls = [call_time for call_time in self.calls if now - call_time <= self.period]
                 
-                if len(self.calls) < self.max_calls:
+                if len(self.calls) < self._limit(reserve):
                     # We can make a call now
                     return
                 
                 # Calculate how long to wait
-                oldest_call = self.calls[0]
+                oldest_call = self.calls[len(self.calls) - self._limit(reserve)]
                 wait_time = self.period - (now - oldest_call) + 0.1  # Add a small buffer
             
             if wait_time > 0:
                 logger.debug(f"Rate limit reached, waiting {wait_time:.2f} seconds")
                 time.sleep(min(wait_time, self.period))  # Don't wait longer than one period
+    
+    def acquire(self, reserve=0):
+        """
+        Wait for a free slot and claim it atomically
+        
+        With reserve > 0 a slot is only claimed while more than reserve slots
+        are free, so background callers leave room for interactive ones.
+        """
+        while True:
+            self.wait_until_available(reserve)
+            with self.lock:
+                if self.can_call(reserve):
+                    self.add_call()
+                    return
 
 # Create rate limiters for different APIs
 yfinance_limiter = RateLimiter(max_calls=2, period=1)  # 2 calls per second
@@ -69,8 +94,7 @@ def rate_limited(limiter):
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            limiter.wait_until_available()
-            limiter.add_call()
+            limiter.acquire()
             return func(*args, **kwargs)
         return wrapper
     return decorator
\ No newline at end of file
@@ -0,0 +1,140 @@
+import logging
+import numpy as np
+from scipy.stats import norm
+
+logger = logging.getLogger(__name__)
+
+RISK_METRICS = (
+    'historical_var', 'historical_cvar',
+    'parametric_var', 'parametric_cvar',
+    'cornish_fisher_var', 'cornish_fisher_cvar',
+    'max_drawdown', 'max_drawdown_duration',
+    'sortino_ratio', 'calmar_ratio'
+)
+
+
+def _as_matrix(returns):
+    """T x k float matrix from a Series, DataFrame or array of daily returns"""
+    matrix = np.asarray(returns, dtype=float)
+    return matrix[:, None] if matrix.ndim == 1 else matrix
+
+
+def cornish_fisher_quantile(z, skew, excess_kurtosis):
+    """Adjust standard normal quantiles z for per-column skew and excess kurtosis"""
+    return (z
+            + (z ** 2 - 1) * skew / 6
+            + (z ** 3 - 3 * z) * excess_kurtosis / 24
+            - (2 * z ** 3 - 5 * z) * skew ** 2 / 36)
+
+
+def drawdowns(returns):
+    """
+    Drawdown path and its duration for every column
+
+    Returns:
+        tuple: (drawdown, duration) T x k matrices; drawdown is <= 0 and
+               duration counts periods since the last equity peak
+    """
+    matrix = _as_matrix(returns)
+    # Start from an initial equity of 1 so a loss on day one counts as drawdown
+    equity = np.vstack([np.ones((1, matrix.shape[1])), np.cumprod(1 + matrix, axis=0)])
+    drawdown = equity / np.maximum.accumulate(equity, axis=0) - 1
+
+    steps = np.arange(len(equity))[:, None]
+    last_peak = np.maximum.accumulate(np.where(drawdown < 0, 0, steps), axis=0)
+    return drawdown[1:], (steps - last_peak)[1:]
+
+
+def risk_metrics(returns, confidence=0.95, periods_per_year=252, target_return=0.0, cf_grid=256):
+    """
+    Tail and drawdown risk for a stacked strategy return matrix in one pass
+
+    VaR and CVaR are reported as positive loss fractions of a single period at
+    the given confidence; max_drawdown is negative and its duration is in
+    periods. Cornish-Fisher CVaR averages the adjusted quantile over the tail.
+
+    Args:
+        returns: T x k matrix (or Series) of periodic returns, one column per strategy
+        confidence: VaR confidence level
+        periods_per_year: annualization factor for Sortino and Calmar
+        target_return: per-period minimum acceptable return for Sortino
+        cf_grid: tail quadrature points for Cornish-Fisher CVaR
+
+    Returns:
+        dict: metric name -> length-k array
+    """
+    matrix = _as_matrix(returns)
+    n_periods = len(matrix)
+    if n_periods < 2:
+        raise ValueError("At least two periods are required for risk metrics")
+
+    alpha = 1 - confidence
+    mean = matrix.mean(axis=0)
+    std = matrix.std(axis=0)
+    safe_std = np.where(std > 0, std, 1.0)
+
+    # Historical: empirical quantile and the mean of returns at or beyond it
+    quantile = np.quantile(matrix, alpha, axis=0)
+    tail = matrix <= quantile
+    historical_cvar = -(matrix * tail).sum(axis=0) / np.maximum(tail.sum(axis=0), 1)
+
+    # Parametric (normal)
+    z = norm.ppf(alpha)
+    parametric_var = -(mean + z * std)
+    parametric_cvar = -(mean - std * norm.pdf(z) / alpha)
+
+    # Cornish-Fisher: normal quantile corrected by sample skew and excess kurtosis
+    standardized = (matrix - mean) / safe_std
+    skew = (standardized ** 3).mean(axis=0)
+    excess_kurtosis = (standardized ** 4).mean(axis=0) - 3
+    cf_var = -(mean + cornish_fisher_quantile(z, skew, excess_kurtosis) * std)
+    tail_z = norm.ppf((np.arange(cf_grid) + 0.5) / cf_grid * alpha)[:, None]
+    cf_tail = cornish_fisher_quantile(tail_z, skew, excess_kurtosis).mean(axis=0)
+    cf_cvar = -(mean + cf_tail * std)
+
+    # Drawdowns
+    drawdown, duration = drawdowns(matrix)
+    max_drawdown = drawdown.min(axis=0)
+    max_duration = duration.max(axis=0)
+
+    # Sortino: excess return over downside deviation below the target
+    downside = np.sqrt((np.minimum(matrix - target_return, 0) ** 2).mean(axis=0))
+    sortino = np.divide((mean - target_return) * np.sqrt(periods_per_year), downside,
+                        out=np.zeros_like(mean), where=downside > 0)
+
+    # Calmar: compound annual growth over the magnitude of the worst drawdown
+    years = n_periods / periods_per_year
+    growth = np.prod(1 + matrix, axis=0)
+    cagr = np.sign(growth) * np.abs(growth) ** (1 / years) - 1
+    calmar = np.divide(cagr, -max_drawdown, out=np.zeros_like(cagr), where=max_drawdown < 0)
+
+    return {
+        'historical_var': -quantile,
+        'historical_cvar': historical_cvar,
+        'parametric_var': parametric_var,
+        'parametric_cvar': parametric_cvar,
+        'cornish_fisher_var': cf_var,
+        'cornish_fisher_cvar': cf_cvar,
+        'max_drawdown': max_drawdown,
+        'max_drawdown_duration': max_duration,
+        'sortino_ratio': sortino,
+        'calmar_ratio': calmar
+    }
+
+
+def risk_report(returns, names=None, confidence=0.95, periods_per_year=252):
+    """
+    Per-strategy dict of risk metrics as plain floats
+
+    Args:
+        returns: T x k matrix or DataFrame of periodic returns
+        names: column labels; defaults to DataFrame columns or 0..k-1
+    """
+    metrics = risk_metrics(returns, confidence=confidence, periods_per_year=periods_per_year)
+    if names is None:
+        names = list(getattr(returns, 'columns', range(_as_matrix(returns).shape[1])))
+    return {
+        name: {metric: (int(values[i]) if metric == 'max_drawdown_duration' else float(values[i]))
+               for metric, values in metrics.items()}
+        for i, name in enumerate(names)
+    }
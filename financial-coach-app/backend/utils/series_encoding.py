@@ -0,0 +1,83 @@
+import base64
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SERIES_FORMATS = ('json', 'base64')
+SERIES_RESOLUTIONS = {
+    'daily': None,
+    'weekly': 'W-FRI',
+    'monthly': 'ME'
+}
+
+
+def resample_returns(returns, resolution='daily'):
+    """
+    Downsample a daily return series by compounding within each period
+
+    Args:
+        returns: pandas Series of daily returns indexed by date
+        resolution: 'daily', 'weekly' or 'monthly'
+    """
+    rule = SERIES_RESOLUTIONS[resolution]
+    if rule is None or not isinstance(returns.index, pd.DatetimeIndex):
+        return returns
+    try:
+        return (1 + returns).resample(rule).prod().sub(1)
+    except ValueError:
+        # Older pandas spells month-end as 'M'
+        return (1 + returns).resample('M').prod().sub(1)
+
+
+def encode_series(returns, series_format='json', resolution='daily'):
+    """
+    Encode a return series for an API response
+
+    'json' keeps the legacy plain list of floats. 'base64' ships the values
+    as a little-endian float32 buffer. Decode with
+    Float32Array.from(new Float32Array(Uint8Array.from(atob(data), c => c.charCodeAt(0)).buffer))
+    in the browser (the inner view is enough if a copy is not needed) or
+    np.frombuffer(base64.b64decode(data), '<f4') in Python.
+
+    Trading days skip holidays, so the dates cannot be rebuilt from start and
+    end alone; 'offsets' is a little-endian int32 buffer, decoded the same
+    way, of each point's day count from 'start' (date i = start + offsets[i]
+    days). Both are None for an undated series.
+    """
+    if not isinstance(returns, pd.Series):
+        returns = pd.Series(np.asarray(returns, dtype=float))
+    returns = resample_returns(returns, resolution)
+
+    if series_format == 'json':
+        return returns.tolist()
+
+    values = returns.to_numpy(dtype='<f4')
+    index = returns.index
+    is_dated = isinstance(index, pd.DatetimeIndex) and len(index) > 0
+    offsets = None
+    if is_dated:
+        days = ((index - index[0]) // pd.Timedelta(days=1)).to_numpy(dtype='<i4')
+        offsets = base64.b64encode(days.tobytes()).decode('ascii')
+    return {
+        'encoding': 'base64',
+        'dtype': 'float32',
+        'length': int(len(values)),
+        'resolution': resolution,
+        'start': index[0].strftime('%Y-%m-%d') if is_dated else None,
+        'end': index[-1].strftime('%Y-%m-%d') if is_dated else None,
+        'offsets': offsets,
+        'data': base64.b64encode(values.tobytes()).decode('ascii')
+    }
+
+
+def format_analysis_series(analysis, series_format='json', resolution='daily'):
+    """Return a copy of an analysis result with every strategy's return series encoded"""
+    formatted = dict(analysis)
+    formatted['strategies'] = [
+        {**strategy, 'portfolio_return': encode_series(strategy['portfolio_return'],
+                                                       series_format, resolution)}
+        for strategy in analysis.get('strategies', [])
+    ]
+    return formatted
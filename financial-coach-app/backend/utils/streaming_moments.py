@@ -0,0 +1,112 @@
+import logging
+import threading
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingMoments:
+    """
+    Incrementally maintained return matrix, running mean and covariance for a
+    fixed ticker set
+
+    The state is seeded once from a full close-price history. Later ticks only
+    pass the tail bars: new dates are appended and a revised last bar (today's
+    in-progress daily close) replaces the previous observation, each through an
+    O(n^2) rank-one Welford update instead of recomputing over the full history.
+    """
+    def __init__(self, closes):
+        """
+        Seed the state from a close-price frame
+
+        Args:
+            closes: DataFrame of daily closes indexed by date, one column per ticker
+        """
+        closes = closes.dropna()
+        if len(closes) < 3:
+            raise ValueError("Insufficient price history to seed streaming state")
+
+        returns = closes.pct_change(1).dropna()
+        values = returns.to_numpy(dtype=float)
+
+        self.columns = list(closes.columns)
+        self.returns = returns
+        self.count = len(values)
+        self.mean = values.mean(axis=0)
+        centered = values - self.mean
+        # Sum of squared deviations (co-moment matrix); cov = m2 / count
+        self.m2 = centered.T @ centered
+
+        self.last_date = closes.index[-1]
+        self.last_close = closes.iloc[-1].to_numpy(dtype=float)
+        self.prev_close = closes.iloc[-2].to_numpy(dtype=float)
+        self._lock = threading.RLock()
+
+    def _add(self, x):
+        """Rank-one update with a new observation"""
+        self.count += 1
+        delta = x - self.mean
+        self.mean = self.mean + delta / self.count
+        self.m2 += np.outer(delta, x - self.mean)
+
+    def _remove(self, x):
+        """Rank-one downdate removing an existing observation"""
+        if self.count <= 1:
+            raise ValueError("Cannot remove the only observation")
+        old_mean = (self.count * self.mean - x) / (self.count - 1)
+        self.m2 -= np.outer(x - old_mean, x - self.mean)
+        self.mean = old_mean
+        self.count -= 1
+
+    def update(self, closes):
+        """
+        Fold tail close prices into the state
+
+        Rows dated before the last known bar are ignored, a row on the last
+        bar's date replaces it, and later rows are appended in order.
+
+        Args:
+            closes: DataFrame of recent daily closes with the same tickers
+
+        Returns:
+            int: number of bars appended or revised
+        """
+        closes = closes.reindex(columns=self.columns).dropna()
+        closes = closes[closes.index >= self.last_date].sort_index()
+
+        changed = 0
+        with self._lock:
+            new_rows = []
+            for date, row in closes.iterrows():
+                close = row.to_numpy(dtype=float)
+                if date == self.last_date:
+                    if np.array_equal(close, self.last_close):
+                        continue
+                    x = close / self.prev_close - 1
+                    self._remove(self.returns.iloc[-1].to_numpy(dtype=float))
+                    self._add(x)
+                    self.returns.iloc[-1] = x
+                    self.last_close = close
+                else:
+                    x = close / self.last_close - 1
+                    self._add(x)
+                    new_rows.append((date, x))
+                    self.prev_close, self.last_close = self.last_close, close
+                    self.last_date = date
+                changed += 1
+
+            if new_rows:
+                appended = pd.DataFrame([x for _, x in new_rows],
+                                        index=[d for d, _ in new_rows],
+                                        columns=self.columns)
+                self.returns = pd.concat([self.returns, appended])
+
+        if changed:
+            logger.debug(f"Streaming state for {self.columns} updated with {changed} bar(s)")
+        return changed
+
+    def moments(self):
+        """Return (mu, cov) with the population covariance used by the optimizer"""
+        with self._lock:
+            return self.mean.copy(), self.m2 / self.count
@@ -0,0 +1,222 @@
+import logging
+import numpy as np
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+
+def easter_sunday(year):
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def nth_weekday(year, month, weekday, n):
+    """n-th given weekday (Mon=0) of a month; n=-1 for the last one"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(day, saturday_to_friday=True):
+    """Weekend holidays move to the adjacent weekday"""
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    if day.weekday() == 5 and saturday_to_friday:
+        return day - timedelta(days=1)
+    return day
+
+
+def us_holidays(year):
+    """NYSE full-day closures"""
+    easter = easter_sunday(year)
+    holidays = {
+        # A Saturday New Year's Day is not observed on the previous Friday
+        _observed(date(year, 1, 1), saturday_to_friday=False),
+        nth_weekday(year, 1, 0, 3),   # Martin Luther King Jr. Day
+        nth_weekday(year, 2, 0, 3),   # Washington's Birthday
+        easter - timedelta(days=2),   # Good Friday
+        nth_weekday(year, 5, 0, -1),  # Memorial Day
+        _observed(date(year, 7, 4)),
+        nth_weekday(year, 9, 0, 1),   # Labor Day
+        nth_weekday(year, 11, 3, 4),  # Thanksgiving
+        _observed(date(year, 12, 25))
+    }
+    if year >= 2022:
+        holidays.add(_observed(date(year, 6, 19)))  # Juneteenth
+    return holidays
+
+
+def us_early_closes(year):
+    """NYSE 13:00 closes"""
+    candidates = {
+        date(year, 7, 3),
+        nth_weekday(year, 11, 3, 4) + timedelta(days=1),  # Day after Thanksgiving
+        date(year, 12, 24)
+    }
+    holidays = us_holidays(year)
+    return {day for day in candidates if day.weekday() < 5 and day not in holidays}
+
+
+def jse_holidays(year):
+    """South African public holidays on which the JSE is closed"""
+    easter = easter_sunday(year)
+    fixed = [(1, 1), (3, 21), (4, 27), (5, 1), (6, 16), (8, 9), (9, 24), (12, 16), (12, 25), (12, 26)]
+    # Public Holidays Act: a Sunday holiday is observed on the Monday
+    holidays = {_observed(date(year, month, day), saturday_to_friday=False) for month, day in fixed}
+    holidays.update({
+        easter - timedelta(days=2),  # Good Friday
+        easter + timedelta(days=1)   # Family Day
+    })
+    return holidays
+
+
+class TradingCalendar:
+    """Regular sessions and holidays of a single exchange"""
+    def __init__(self, name, tz, open_time, close_time, holiday_rule,
+                 early_close_rule=None, early_close_time=None):
+        self.name = name
+        self.tz = ZoneInfo(tz)
+        self.open_time = open_time
+        self.close_time = close_time
+        self.holiday_rule = holiday_rule
+        self.early_close_rule = early_close_rule
+        self.early_close_time = early_close_time
+        self._years = {}
+
+    def _year(self, year):
+        if year not in self._years:
+            early = self.early_close_rule(year) if self.early_close_rule else set()
+            self._years[year] = (self.holiday_rule(year), early)
+        return self._years[year]
+
+    def is_trading_day(self, day):
+        return day.weekday() < 5 and day not in self._year(day.year)[0]
+
+    def session(self, day):
+        """(open, close) as aware datetimes for a trading day, or None"""
+        if not self.is_trading_day(day):
+            return None
+        close_time = self.early_close_time if day in self._year(day.year)[1] else self.close_time
+        return (datetime.combine(day, self.open_time, tzinfo=self.tz),
+                datetime.combine(day, close_time, tzinfo=self.tz))
+
+    def _now(self, now=None):
+        return (now or datetime.now(timezone.utc)).astimezone(self.tz)
+
+    def is_open(self, now=None):
+        now = self._now(now)
+        session = self.session(now.date())
+        return session is not None and session[0] <= now < session[1]
+
+    def next_open(self, now=None):
+        """Start of the next session strictly after now"""
+        now = self._now(now)
+        day = now.date()
+        for _ in range(30):
+            session = self.session(day)
+            if session is not None and session[0] > now:
+                return session[0]
+            day += timedelta(days=1)
+        raise ValueError(f"No {self.name} session within 30 days of {now}")
+
+    def last_close(self, now=None):
+        """End of the most recent session that closed at or before now"""
+        now = self._now(now)
+        day = now.date()
+        for _ in range(30):
+            session = self.session(day)
+            if session is not None and session[1] <= now:
+                return session[1]
+            day -= timedelta(days=1)
+        raise ValueError(f"No {self.name} session within 30 days before {now}")
+
+
+US_CALENDAR = TradingCalendar('NYSE', 'America/New_York', dtime(9, 30), dtime(16, 0), us_holidays,
+                              early_close_rule=us_early_closes, early_close_time=dtime(13, 0))
+JSE_CALENDAR = TradingCalendar('JSE', 'Africa/Johannesburg', dtime(9, 0), dtime(17, 0), jse_holidays)
+
+
+def calendar_for_ticker(ticker):
+    """Exchange calendar from the Yahoo symbol suffix"""
+    return JSE_CALENDAR if ticker.upper().endswith('.JO') else US_CALENDAR
+
+
+def calendars_for(tickers):
+    calendars = {calendar_for_ticker(ticker).name: calendar_for_ticker(ticker) for ticker in tickers}
+    return list(calendars.values())
+
+
+class AdaptiveRefresh:
+    """
+    Chooses when a live strategy on a ticker set should next refresh
+
+    While any of the set's exchanges is in session the strategy runs on its
+    interval grid, shortened in proportion to a realized-volatility spike
+    (the latest bar's move in units of its usual daily standard deviation).
+    Once every exchange is closed it sleeps until the next session opens,
+    waking once ``post_close_delay`` seconds after each close to pick up the
+    final daily bar.
+    """
+    def __init__(self, min_interval=5, spike_threshold=2.0, post_close_delay=900):
+        self.min_interval = min_interval
+        self.spike_threshold = spike_threshold
+        self.post_close_delay = post_close_delay
+
+    def interval(self, base_interval, volatility_ratio=None):
+        """Intraday interval, shortened during volatility spikes"""
+        if volatility_ratio is None or volatility_ratio <= self.spike_threshold:
+            return base_interval
+        return max(self.min_interval, base_interval * self.spike_threshold / volatility_ratio)
+
+    def next_run(self, tickers, base_interval, last_run=None, volatility_ratio=None, now=None):
+        """
+        Epoch time of the next refresh
+
+        Args:
+            tickers: the strategy's tickers, used to pick exchange calendars
+            base_interval: configured intraday interval in seconds
+            last_run: epoch time of the last successful refresh
+            volatility_ratio: |latest return| / daily volatility, if known
+            now: aware datetime, defaults to the current time
+        """
+        now = now or datetime.now(timezone.utc)
+        now_ts = now.timestamp()
+        calendars = calendars_for(tickers)
+
+        if any(calendar.is_open(now) for calendar in calendars):
+            interval = self.interval(base_interval, volatility_ratio)
+            # Grid alignment lets strategies with the same interval share a tick
+            return (now_ts // interval + 1) * interval
+
+        wake_times = [calendar.next_open(now).timestamp() for calendar in calendars]
+        for calendar in calendars:
+            settled = calendar.last_close(now).timestamp() + self.post_close_delay
+            if last_run is None or last_run < settled:
+                # One refresh after the close picks up the final daily bar
+                wake_times.append(max(settled, now_ts))
+        return min(wake_times)
+
+
+def realized_volatility_ratio(latest_returns, weights, cov):
+    """
+    Largest |latest portfolio return| / daily portfolio volatility across
+    a stack of weight vectors
+    """
+    weights = np.atleast_2d(np.asarray(weights, dtype=float))
+    moves = np.abs(weights @ np.asarray(latest_returns, dtype=float))
+    volatility = np.sqrt(np.einsum('ij,jk,ik->i', weights, cov, weights))
+    ratios = np.divide(moves, volatility, out=np.zeros_like(moves), where=volatility > 0)
+    return float(ratios.max())
@@ -1,170 +1,207 @@
-import yfinance as yf
-import time
+import os
+import sqlite3
 import logging
+import numpy as np
 import pandas as pd
-from functools import wraps
-from datetime import datetime, timedelta
-from .cache_manager import cached
-from .rate_limiter import rate_limited, yfinance_limiter
-from .async_handler import run_async, timing
+from datetime import datetime
+from .cache_manager import cache
+from .market_data import MarketDataRequest, TickerDemand, market_data_gateway
+from .async_handler import timing
+from .price_store import PriceStore, normalize_download
+from .price_panel import PricePanel
 
 logger = logging.getLogger(__name__)
 
 class YFinanceWrapper:
     def __init__(self):
-        self._last_request_time = 0
-        self._min_request_interval = 0.5  # Minimum seconds between requests
-        self._cache = {}  # Simple in-memory cache
-        self._cache_ttl = {}  # Time-to-live for cache entries
+        # Every yfinance call goes through one cache lookup and one limiter slot
+        self.gateway = market_data_gateway
+        # Recent request frequency, used to pick tickers worth prefetching
+        self.demand = TickerDemand(half_life=float(os.getenv('TICKER_DEMAND_HALF_LIFE', '3600')))
+        # Adjusted daily bars persisted across restarts and worker processes
+        self.price_store = PriceStore(os.getenv('PRICE_STORE_PATH', 'instance/price_store.db'))
         
-    def _rate_limit(self):
-        """Implement rate limiting"""
-        current_time = time.time()
-        time_since_last_request = current_time - self._last_request_time
-        
-        if time_since_last_request < self._min_request_interval:
-            time.sleep(self._min_request_interval - time_since_last_request)
-        
-        self._last_request_time = time.time()
+    def _fetch(self, kind, tickers, allow_stale=True, ttl=None, acquire=None, **kwargs):
+        """Route a call through the gateway: one cache entry and one limiter slot"""
+        with timing(f"market data {kind}"):
+            try:
+                request = MarketDataRequest.build(kind, tickers, **kwargs)
+            except ValueError as e:
+                logger.error(f"Invalid {kind} request for {tickers}: {str(e)}")
+                return {} if kind == 'info' else pd.DataFrame()
+            return self.gateway.fetch(request, ttl=ttl, allow_stale=allow_stale, acquire=acquire)
     
-    @cached(ttl=300)  # Cache results for 5 minutes
-    @rate_limited(yfinance_limiter)
     def download(self, tickers, **kwargs):
-        """Wrapper for yf.download with caching, rate limiting and error handling"""
-        with timing("yfinance download"):
-            try:
-                # Explicitly set parameters to avoid conflicts
-                params = {
-                    'progress': False,
-                    'threads': False,  # Disable threading to avoid rate limit issues
-                }
-                
-                # Add kwargs to params without overwriting our explicit settings
-                for key, value in kwargs.items():
-                    if key not in params:
-                        params[key] = value
-                
-                # Let yfinance handle the session internally
-                data = yf.download(tickers, **params)
-                
-                return data
-                
-            except Exception as e:
-                logger.error(f"Error downloading data for {tickers}: {str(e)}")
-                # Return empty DataFrame instead of raising
-                return pd.DataFrame()
+        """yf.download through the market data gateway"""
+        return self._fetch('download', tickers, **kwargs)
     
-    @cached(ttl=300)  # Cache results for 5 minutes
-    @rate_limited(yfinance_limiter)
     def get_ticker_info(self, ticker):
-        """Get ticker info with caching and rate limiting"""
-        with timing(f"get_ticker_info {ticker}"):
-            try:
-                stock = yf.Ticker(ticker)
-                return stock.info
-            except Exception as e:
-                logger.error(f"Error getting info for {ticker}: {str(e)}")
-                return {}
+        """Ticker info through the market data gateway"""
+        return self._fetch('info', ticker)
     
-    @cached(ttl=300)  # Cache results for 5 minutes
-    @rate_limited(yfinance_limiter)
     def get_ticker_history(self, ticker, **kwargs):
-        """Get ticker history with caching and rate limiting"""
-        with timing(f"get_ticker_history {ticker}"):
-            try:
-                stock = yf.Ticker(ticker)
-                history = stock.history(**kwargs)
-                return history
-            except Exception as e:
-                logger.error(f"Error getting history for {ticker}: {str(e)}")
-                return pd.DataFrame()
+        """Ticker history through the market data gateway"""
+        return self._fetch('history', ticker, **kwargs)
     
-    @cached(ttl=300)  # Cache results for 5 minutes
-    @rate_limited(yfinance_limiter)
     def get_history(self, ticker, **kwargs):
         """Alias for get_ticker_history for compatibility"""
         return self.get_ticker_history(ticker, **kwargs)
     
-    @cached(ttl=300)  # Cache results for 5 minutes
-    @rate_limited(yfinance_limiter)
     def download_data(self, tickers, **kwargs):
-        """Clean wrapper for download method to avoid duplicate parameters"""
-        # Remove parameters that are already set in the download method
-        if 'progress' in kwargs:
-            del kwargs['progress']
-        if 'threads' in kwargs:
-            del kwargs['threads']
-            
-        # Call the download method with the cleaned kwargs
+        """Alias for download; progress/threads are always set by the gateway"""
         return self.download(tickers, **kwargs)
     
-    @cached(ttl=300)  # Cache results for 5 minutes
-    @rate_limited(yfinance_limiter)
-    def get_multiple_tickers_last_day(self, tickers):
-        """Get last day's data for multiple tickers with caching and rate limiting"""
-        with timing(f"get_multiple_tickers_last_day"):
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=7)  # Get a bit more data for stability
-            
-            try:
-                # Use our download method to ensure consistent behavior
-                data = self.download(
-                    tickers,
-                    start=start_date.strftime('%Y-%m-%d'),
-                    end=end_date.strftime('%Y-%m-%d')
-                )
-                
-                # Handle single ticker case
-                if isinstance(data, pd.Series) or (isinstance(data, pd.DataFrame) and 'Close' in data.columns):
-                    if 'Close' in data.columns:
-                        last_prices = data['Close'].iloc[-1]
-                    else:
-                        last_prices = data.iloc[-1]
-                    return last_prices
-                
-                # Handle multiple tickers case
-                if 'Close' in data.columns.get_level_values(0):
-                    last_prices = data['Close'].iloc[-1]
-                    return last_prices
-                
-                return pd.Series()
-                
-            except Exception as e:
-                logger.error(f"Error getting last day data for {tickers}: {str(e)}")
-                return pd.Series()
+    def sync_daily_history(self, tickers, start='2012-01-01', acquire=None):
+        """
+        Bring the price store up to date for tickers without reading bars back
+
+        acquire is called before every upstream call the sync makes (see get_quotes).
+        """
+        def fetch(symbols, fetch_start):
+            return self._store_fetch(symbols, fetch_start, acquire=acquire)
+        
+        try:
+            self.price_store.sync(tickers, start, fetch)
+        except sqlite3.Error as e:
+            logger.error(f"Price store unavailable, nothing synced: {str(e)}")
     
-    @cached(ttl=60)  # Cache results for 1 minute only for quotes
-    @rate_limited(yfinance_limiter)
-    def get_quotes(self, tickers):
-        """Get current quotes for tickers with short caching period"""
-        with timing(f"get_quotes for {len(tickers) if isinstance(tickers, list) else 1} tickers"):
-            if isinstance(tickers, str):
-                tickers = [tickers]
-                
+    def _store_fetch(self, symbols, fetch_start, acquire=None):
+        """Download for the price store: never stale, and not kept in memory since the store keeps it"""
+        return self._fetch('download', symbols, allow_stale=False, ttl=0, acquire=acquire,
+                           start=fetch_start, interval='1d', auto_adjust=True)
+    
+    def get_price_panel(self, tickers, start='2012-01-01', field='Close', track=True):
+        """
+        One price field for tickers as a float32 PricePanel, in request order
+
+        Only that field is read from the price store, and the panel for the
+        sorted ticker set is cached, so every ordering of a basket shares one
+        entry. Tickers without data come back as all-NaN columns.
+        """
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        tickers = list(dict.fromkeys(tickers))
+        if track:
+            self.demand.record(tickers)
+        symbols = sorted(tickers)
+        
+        def load():
             try:
-                data = {}
-                for ticker in tickers:
-                    stock = yf.Ticker(ticker)
-                    try:
-                        data[ticker] = {
-                            'price': stock.info.get('currentPrice') or stock.info.get('regularMarketPrice'),
-                            'change': stock.info.get('regularMarketChange'),
-                            'changePercent': stock.info.get('regularMarketChangePercent'),
-                            'volume': stock.info.get('regularMarketVolume'),
-                            'timestamp': datetime.now().isoformat()
-                        }
-                    except Exception as e:
-                        logger.warning(f"Error getting quote for {ticker}: {str(e)}")
-                        data[ticker] = {'error': str(e)}
-                
-                return data
+                panel = self.price_store.panel(symbols, start, self._store_fetch, field)
+            except sqlite3.Error as e:
+                logger.error(f"Price store unavailable, downloading directly: {str(e)}")
+                data = normalize_download(self._store_fetch(symbols, start), symbols)
+                if data.empty:
+                    return None
+                panel = PricePanel.from_frame(data[field].reindex(columns=symbols))
+            # An empty panel is not cached, so the next request retries
+            return panel if len(panel) else None
+        
+        key = f"panel:{field}:{start}:{','.join(symbols)}"
+        panel = cache.get_or_load(key, load, self.price_store.refresh_ttl)
+        if panel is None:
+            return PricePanel(np.empty((0, len(tickers))), pd.DatetimeIndex([], name='Date'), tickers)
+        return panel.select(tickers)
+    
+    def get_quotes(self, tickers, ttl=60, track=True, acquire=None):
+        """
+        Current quotes for many tickers from one multi-ticker download
+
+        Per-ticker quotes are cached for ttl seconds, so only tickers missing
+        from the cache are downloaded, together, in a single rate-limited call.
+        Price, change and change percent are computed across all tickers at once,
+        each from that ticker's own last two bars.
+        Background callers pass track=False and an acquire callable that takes
+        the download's slot from their own limiter.
+        """
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        symbols = list(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))
+        if track:
+            self.demand.record(symbols)
+        
+        quotes = {}
+        missing = []
+        for symbol in symbols:
+            quote = cache.get(f"quote:{symbol}")
+            if quote is None:
+                missing.append(symbol)
+            else:
+                quotes[symbol] = quote
+        
+        if missing:
+            with timing(f"get_quotes for {len(missing)} tickers"):
+                # Per-ticker quotes are the cache: never build one from a stale frame,
+                # and keep no frame-level entry (ttl=0) next to them
+                data = self._fetch('download', missing, allow_stale=False, ttl=0, acquire=acquire,
+                                   period='5d', interval='1d', auto_adjust=False)
+            
+            if data is None or data.empty:
+                logger.warning(f"No quote data for {missing}")
+            else:
+                if not isinstance(data.columns, pd.MultiIndex):
+                    data = pd.concat({missing[0]: data}, axis=1).swaplevel(axis=1)
+                closes = data['Close'].reindex(columns=missing).to_numpy(dtype=float)
+                # Mixed exchanges share one date index, so each ticker's last two
+                # bars are its own last two non-NaN rows, not the frame's last rows
+                rows = np.where(np.isnan(closes), -1, np.arange(len(closes))[:, None])
+                last_row = rows.max(axis=0)
+                previous_row = np.where(rows < last_row, rows, -1).max(axis=0)
+                previous_row = np.where(previous_row < 0, last_row, previous_row)
+                columns = np.arange(len(missing))
                 
-            except Exception as e:
-                logger.error(f"Error getting quotes: {str(e)}")
-                return {}
+                last = np.where(last_row >= 0, closes[last_row, columns], np.nan)
+                previous = np.where(previous_row >= 0, closes[previous_row, columns], np.nan)
+                change = last - previous
+                change_percent = np.divide(change * 100, previous, out=np.zeros_like(change),
+                                           where=previous > 0)
+                if 'Volume' in data:
+                    volumes = data['Volume'].reindex(columns=missing).to_numpy(dtype=float)
+                    volume = volumes[last_row, columns]
+                else:
+                    volume = np.full(len(missing), np.nan)
+                timestamp = datetime.now().isoformat()
                 
-    @cached(ttl=300)  # Cache results for 5 minutes
-    @rate_limited(yfinance_limiter)
+                for i, symbol in enumerate(missing):
+                    if np.isnan(last[i]):
+                        continue
+                    quote = {
+                        'price': float(last[i]),
+                        'change': float(change[i]),
+                        'changePercent': float(change_percent[i]),
+                        'previousClose': float(previous[i]),
+                        'volume': None if np.isnan(volume[i]) else int(volume[i]),
+                        'timestamp': timestamp
+                    }
+                    cache.set(f"quote:{symbol}", quote, ttl)
+                    quotes[symbol] = quote
+        
+        for symbol in symbols:
+            if symbol not in quotes:
+                quotes[symbol] = {'error': 'No quote data available'}
+        
+        return quotes
+    
+    def get_price_rows(self, tickers):
+        """Quotes shaped as the /api/stock-prices response rows, in request order"""
+        quotes = self.get_quotes(tickers)
+        rows = []
+        for ticker in tickers:
+            ticker = ticker.strip()
+            if not ticker:
+                continue
+            quote = quotes.get(ticker.upper(), {})
+            row = {
+                'ticker': ticker,
+                'price': quote.get('price'),
+                'change': quote.get('change'),
+                'change_percent': quote.get('changePercent')
+            }
+            if 'error' in quote:
+                row['error'] = quote['error']
+            rows.append(row)
+        return rows
+    
     def get_stock_info(self, ticker):
         """Get stock info with enhanced error handling"""
         try: